@@ -0,0 +1 @@
+# Este archivo hace que la carpeta backend sea un paquete Python
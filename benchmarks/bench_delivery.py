@@ -0,0 +1,127 @@
+"""Benchmark del envío de archivos: os.sendfile frente a lectura con búfer.
+
+Envía un archivo temporal (ya en el page cache) por un socketpair a un proceso
+hijo que solo lee y descarta, y mide para cada camino el rendimiento y la CPU
+del proceso que envía por GB servido:
+
+- `os.sendfile` directo, como referencia de lo que daría un servidor con envío
+  sin copia (uvicorn, el de todos los despliegues, no lo ofrece)
+- `pread` + `sendall` con búferes de 64 KiB (Starlette) y DELIVERY_CHUNK_SIZE
+- las respuestas ASGI completas: FileResponse de Starlette y DeliveryFileResponse
+
+Uso: python benchmarks/bench_delivery.py [tamaño_mb] [repeticiones]
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fastapi.responses import FileResponse  # noqa: E402
+
+from downloader.delivery import DELIVERY_CHUNK_SIZE, DeliveryFileResponse  # noqa: E402
+
+DRAIN_BUFFER = 4 * 1024 * 1024
+
+
+def start_drain() -> tuple:
+    """Socket de envío y pid de un hijo que lee del otro extremo hasta EOF"""
+    sender, receiver = socket.socketpair()
+    pid = os.fork()
+    if pid == 0:
+        sender.close()
+        buffer = bytearray(DRAIN_BUFFER)
+        while receiver.recv_into(buffer):
+            pass
+        os._exit(0)
+    receiver.close()
+    return sender, pid
+
+
+def send_sendfile(sock, path: str, size: int):
+    with open(path, "rb") as file:
+        offset = 0
+        while offset < size:
+            offset += os.sendfile(sock.fileno(), file.fileno(), offset, size - offset)
+
+
+def buffered_sender(chunk_size: int):
+    def send(sock, path: str, size: int):
+        with open(path, "rb", buffering=0) as file:
+            offset = 0
+            while offset < size:
+                chunk = os.pread(file.fileno(), chunk_size, offset)
+                sock.sendall(chunk)
+                offset += len(chunk)
+    return send
+
+
+def asgi_sender(response_class):
+    """Ejecuta la respuesta ASGI con un `send` que escribe en el socket como lo haría el servidor"""
+    def send_file(sock, path: str, size: int):
+        scope = {"type": "http", "method": "GET", "headers": []}
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                sock.sendall(message["body"])
+
+        asyncio.run(response_class(path)(scope, receive, send))
+    return send_file
+
+
+def measure(sender, path: str, size: int, rounds: int) -> tuple:
+    best_wall = best_cpu = None
+    for _ in range(rounds):
+        sock, pid = start_drain()
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        sender(sock, path, size)
+        wall, cpu = time.perf_counter() - wall_started, time.process_time() - cpu_started
+        sock.close()
+        os.waitpid(pid, 0)
+        best_wall = wall if best_wall is None else min(best_wall, wall)
+        best_cpu = cpu if best_cpu is None else min(best_cpu, cpu)
+    return best_wall, best_cpu
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    size = size_mb * 1024 * 1024
+
+    methods = (
+        ("os.sendfile", send_sendfile),
+        ("pread+sendall 64 KiB", buffered_sender(64 * 1024)),
+        (f"pread+sendall {DELIVERY_CHUNK_SIZE // 1024} KiB", buffered_sender(DELIVERY_CHUNK_SIZE)),
+        ("ASGI FileResponse (Starlette)", asgi_sender(FileResponse)),
+        ("ASGI DeliveryFileResponse", asgi_sender(DeliveryFileResponse)),
+    )
+
+    with tempfile.NamedTemporaryFile(prefix="bench-delivery-") as file:
+        block = os.urandom(1024 * 1024)
+        for _ in range(size_mb):
+            file.write(block)
+        file.flush()
+        # Calienta el page cache para medir solo el envío
+        with open(file.name, "rb") as warm:
+            while warm.read(DRAIN_BUFFER):
+                pass
+
+        print(f"archivo de {size_mb} MB, mejor de {rounds} repeticiones")
+        print(f"{'camino':34} {'MB/s':>8} {'CPU s/GB':>9}")
+        gigabytes = size / (1024 ** 3)
+        for name, sender in methods:
+            wall, cpu = measure(sender, file.name, size, rounds)
+            print(f"{name:34} {size_mb / wall:8.0f} {cpu / gigabytes:9.3f}")
+
+
+if __name__ == '__main__':
+    main()
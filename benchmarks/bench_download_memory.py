@@ -0,0 +1,126 @@
+"""Benchmark de memoria de download_video contra el origen falso.
+
+A diferencia de bench_info_memory.py (que simula los registros retenidos),
+aquí corre el camino real: yt-dlp extrae el video a través del extractor de
+`loadtest/yt_dlp_plugins/`, selecciona formato y descarga. El origen añade
+formatos DASH de relleno con miles de fragmentos para que el info dict pese
+como el de un directo grabado largo.
+
+Los trabajos arrancan escalonados y el ancho de banda del origen está limitado
+para que las descargas se solapen. Cada modo corre en un proceso nuevo:
+
+- `completo`: yt-dlp procesa y retiene el info dict entero (comportamiento anterior)
+- `recortado`: solo los formatos de la cadena (records.download_info)
+
+Uso: python benchmarks/bench_download_memory.py [trabajos] [formatos] [fragmentos]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+LOADTEST_DIR = ROOT / 'loadtest'
+sys.path[:0] = [str(ROOT), str(LOADTEST_DIR)]
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+SAMPLE_INTERVAL = 0.02
+STAGGER = 0.5
+BANDWIDTH = 256 * 1024
+DURATION = 120
+
+
+def current_rss() -> int:
+    with open('/proc/self/statm') as handle:
+        return int(handle.read().split()[1]) * PAGE_SIZE
+
+
+def run_worker(mode: str, jobs: int):
+    """Proceso hijo: lanza `jobs` descargas escalonadas y devuelve el RSS en JSON"""
+    from downloader import engine
+
+    if mode == 'completo':
+        engine.download_info = lambda info, format_ids: info
+
+    output_root = Path(tempfile.mkdtemp(prefix='bench-download-'))
+
+    def download(index: int):
+        output = output_root / str(index)
+        output.mkdir()
+        engine.download_video(f"https://www.youtube.com/watch?v=bench{index:06d}", 'audio', 'high', str(output))
+
+    # Calentamiento: importa yt-dlp y carga el extractor antes de tomar la referencia
+    download(999999)
+    baseline = current_rss()
+
+    samples = []
+    running = threading.Event()
+    running.set()
+
+    def sampler():
+        while running.is_set():
+            samples.append(current_rss() - baseline)
+            time.sleep(SAMPLE_INTERVAL)
+
+    threading.Thread(target=sampler, daemon=True).start()
+    threads = []
+    for index in range(jobs):
+        thread = threading.Thread(target=download, args=(index,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(STAGGER)
+    for thread in threads:
+        thread.join()
+    running.clear()
+
+    print(json.dumps({'peak': max(samples), 'median': statistics.median(samples)}))
+
+
+def measure(mode: str, jobs: int, origin: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix='bench-cache-') as cache_dir:
+        env = {
+            **os.environ,
+            'PYTHONPATH': os.pathsep.join([str(LOADTEST_DIR), str(ROOT), os.environ.get('PYTHONPATH', '')]),
+            'FAKE_ORIGIN_URL': origin,
+            'CACHE_DIR': cache_dir,
+            'SOURCE_CACHE_MAX_MB': '0',
+        }
+        result = subprocess.run(
+            [sys.executable, __file__, '--worker', mode, str(jobs)],
+            capture_output=True, text=True, check=True, env=env,
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    if sys.argv[1:2] == ['--worker']:
+        return run_worker(sys.argv[2], int(sys.argv[3]))
+
+    from fake_origin import start_origin
+
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    n_formats = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    n_fragments = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+
+    server, origin, _ = start_origin(bandwidth=BANDWIDTH, duration=DURATION, use_ffmpeg=False,
+                                     extra_formats=n_formats, fragments=n_fragments)
+    try:
+        print(f"{jobs} descargas de audio escalonadas {STAGGER}s; {n_formats} formatos de relleno x {n_fragments} fragmentos")
+        print(f"{'modo':>10} {'pico MB':>9} {'mediana MB':>11} {'pico MB/trabajo':>16}")
+        for mode in ('completo', 'recortado'):
+            sample = measure(mode, jobs, origin)
+            peak, median = sample['peak'] / (1024 * 1024), sample['median'] / (1024 * 1024)
+            print(f"{mode:>10} {peak:>9.1f} {median:>11.1f} {peak / jobs:>16.2f}")
+    finally:
+        server.shutdown()
+        server.store.cleanup()
+
+
+if __name__ == '__main__':
+    main()
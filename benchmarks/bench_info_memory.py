@@ -0,0 +1,150 @@
+"""Benchmark de memoria: info dict completo frente a registro compacto.
+
+Genera info dicts sintéticos con la forma de los de yt-dlp para un directo
+grabado largo (muchos formatos DASH, cada uno con URL firmada, cabeceras y
+miles de fragmentos) y simula N descargas simultáneas que retienen sus
+metadatos mientras dura la descarga:
+
+- `full`: cada trabajo conserva el info dict entero (comportamiento anterior)
+- `compact`: cada trabajo conserva solo el VideoRecord (records.py)
+
+Cada modo corre en un proceso nuevo y se informa del pico de RSS por trabajo.
+
+Uso: python benchmarks/bench_info_memory.py [trabajos,...] [formatos] [fragmentos]
+"""
+
+import json
+import resource
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from downloader.records import compact_info  # noqa: E402
+
+PAGE_SIZE = resource.getpagesize()
+
+
+def synthetic_info(video_id: str, n_formats: int, n_fragments: int) -> dict:
+    """Info dict con el tamaño y la forma de un VOD largo (los textos son únicos, como en yt-dlp)"""
+    formats = []
+    for index in range(n_formats):
+        is_audio = index % 4 == 0
+        height = None if is_audio else (144, 240, 360, 480, 720, 1080, 1440, 2160)[index % 8]
+        base_url = f"https://rr{index}---sn-fake.googlevideo.com/videoplayback/id/{video_id}/itag/{index}/source/yt_live_broadcast"
+        formats.append({
+            'format_id': str(100 + index),
+            'format_note': 'DASH audio' if is_audio else f'{height}p',
+            'ext': 'm4a' if is_audio else 'mp4',
+            'protocol': 'http_dash_segments',
+            'url': f"{base_url}/expire/1700000000/sig/{'A' * 200}{index}",
+            'manifest_url': f"https://manifest.googlevideo.com/api/manifest/dash/id/{video_id}/{'B' * 300}",
+            'fragment_base_url': base_url + '/',
+            'fragments': [
+                {'path': f'sq/{sequence}/lmt/{1700000000000 + sequence}', 'duration': 5.0}
+                for sequence in range(n_fragments)
+            ],
+            'vcodec': 'none' if is_audio else 'avc1.640028',
+            'acodec': 'mp4a.40.2' if is_audio else 'none',
+            'width': None if is_audio else height * 16 // 9,
+            'height': height,
+            'fps': None if is_audio else 30,
+            'tbr': 128.0 if is_audio else height * 4.0,
+            'abr': 128.0 if is_audio else None,
+            'vbr': None if is_audio else height * 4.0,
+            'asr': 44100 if is_audio else None,
+            'filesize_approx': int(n_fragments * 5 * (128 if is_audio else height * 4) * 125),
+            'http_headers': {
+                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'en-us,en;q=0.5',
+                'Sec-Fetch-Mode': 'navigate',
+            },
+            'downloader_options': {'http_chunk_size': 10485760},
+        })
+
+    return {
+        'id': video_id,
+        'title': f"Directo de 12 horas {video_id}",
+        'duration': n_fragments * 5,
+        'webpage_url': f"https://www.youtube.com/watch?v={video_id}",
+        'description': 'x' * 5000,
+        'formats': formats,
+        'thumbnails': [{'url': f"https://i.ytimg.com/vi/{video_id}/{n}.jpg", 'id': str(n)} for n in range(40)],
+        'automatic_captions': {
+            lang: [{'ext': 'json3', 'url': f"https://www.youtube.com/api/timedtext?v={video_id}&lang={lang}&{'C' * 200}"}]
+            for lang in ('en', 'es', 'fr', 'de', 'it', 'pt', 'ja', 'ko', 'ru', 'zh-Hans')
+        },
+    }
+
+
+def current_rss() -> int:
+    with open('/proc/self/statm') as handle:
+        return int(handle.read().split()[1]) * PAGE_SIZE
+
+
+def run_worker(mode: str, jobs: int, n_formats: int, n_fragments: int):
+    """Proceso hijo: retiene `jobs` trabajos y devuelve el pico de RSS en JSON"""
+    baseline = current_rss()
+    retained = []
+    for job in range(jobs):
+        # Como extract_info: el dict completo existe siempre, al menos un momento
+        info = synthetic_info(f"vid{job:08d}", n_formats, n_fragments)
+        retained.append(info if mode == 'full' else compact_info(info))
+        del info
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Linux informa en KiB
+    print(json.dumps({'baseline': baseline, 'peak': peak, 'retained': current_rss()}))
+
+
+def measure(mode: str, jobs: int, n_formats: int, n_fragments: int) -> dict:
+    result = subprocess.run(
+        [sys.executable, __file__, '--worker', mode, str(jobs), str(n_formats), str(n_fragments)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def object_sizes(n_formats: int, n_fragments: int) -> tuple:
+    """Bytes asignados (tracemalloc) por un info dict y por su registro compacto"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    info = synthetic_info('vid00000000', n_formats, n_fragments)
+    full = tracemalloc.get_traced_memory()[0] - before
+
+    before = tracemalloc.get_traced_memory()[0]
+    record = compact_info(info)
+    compact = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del info, record
+    return full, compact
+
+
+def main():
+    if sys.argv[1:2] == ['--worker']:
+        mode, jobs, n_formats, n_fragments = sys.argv[2], *map(int, sys.argv[3:6])
+        return run_worker(mode, jobs, n_formats, n_fragments)
+
+    job_levels = [int(value) for value in (sys.argv[1] if len(sys.argv) > 1 else '1,8,32').split(',')]
+    n_formats = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    n_fragments = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+
+    full, compact = object_sizes(n_formats, n_fragments)
+    print(f"{n_formats} formatos x {n_fragments} fragmentos")
+    print(f"info dict completo: {full / (1024 * 1024):.1f} MB; registro compacto: {compact / 1024:.1f} KB "
+          f"({full / max(compact, 1):.0f}x menos)")
+    print()
+    print(f"{'trabajos':>8} {'modo':>8} {'pico RSS MB':>12} {'MB/trabajo':>11} {'retenido MB':>12}")
+    for jobs in job_levels:
+        for mode in ('full', 'compact'):
+            sample = measure(mode, jobs, n_formats, n_fragments)
+            peak = (sample['peak'] - sample['baseline']) / (1024 * 1024)
+            retained = (sample['retained'] - sample['baseline']) / (1024 * 1024)
+            print(f"{jobs:>8} {mode:>8} {peak:>12.1f} {peak / jobs:>11.2f} {retained:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
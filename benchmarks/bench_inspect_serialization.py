@@ -0,0 +1,105 @@
+"""Benchmark del coste de construir y serializar la respuesta de /inspect.
+
+Compara el camino anterior (un dict por formato, ordenar y json.dumps en cada
+llamada) con el índice precalculado + proyección + orjson.
+
+Uso: python benchmarks/bench_inspect_serialization.py [num_formatos]
+"""
+
+import json
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from downloader.format_index import build_format_index, query_audio_formats, query_video_formats  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def synthetic_info(num_formats: int) -> dict:
+    rng = random.Random(42)
+    heights = [144, 240, 360, 480, 720, 1080, 1440, 2160]
+    formats = []
+    for i in range(num_formats):
+        if i % 5 == 0:
+            formats.append({
+                'format_id': str(200 + i), 'ext': rng.choice(['m4a', 'webm']), 'vcodec': 'none',
+                'acodec': rng.choice(['mp4a.40.2', 'opus']), 'abr': rng.uniform(48, 160),
+                'asr': 48000, 'filesize': rng.randint(10**6, 10**7),
+            })
+        else:
+            height = rng.choice(heights)
+            formats.append({
+                'format_id': str(100 + i), 'ext': rng.choice(['mp4', 'webm']), 'vcodec': rng.choice(['avc1.640028', 'vp9', 'av01.0.08M.08']),
+                'acodec': 'none', 'width': height * 16 // 9, 'height': height, 'fps': rng.choice([25, 30, 60]),
+                'filesize': rng.randint(10**6, 10**9), 'tbr': rng.uniform(100, 20000), 'vbr': rng.uniform(100, 20000),
+            })
+    return {'id': 'bench', 'title': 'bench', 'duration': 3600, 'formats': formats}
+
+
+def legacy_response(info: dict) -> bytes:
+    formats = []
+    for fmt in info['formats']:
+        if fmt.get('vcodec') != 'none':
+            formats.append({
+                'format_id': fmt.get('format_id'),
+                'ext': fmt.get('ext'),
+                'resolution': f"{fmt.get('width', '?')}x{fmt.get('height', '?')}",
+                'height': fmt.get('height'),
+                'fps': fmt.get('fps'),
+                'filesize': fmt.get('filesize'),
+                'tbr': fmt.get('tbr'),
+                'vbr': fmt.get('vbr'),
+            })
+    response = {
+        'title': info['title'],
+        'duration': info['duration'],
+        'formats': sorted(formats, key=lambda x: x.get('height', 0) or 0, reverse=True),
+    }
+    return json.dumps(response, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def indexed_response(index: dict, compact: bool, fields=('format_id', 'height', 'ext')) -> bytes:
+    formats, total = query_video_formats(index, fields, min_height=720, limit=20, compact=compact)
+    response = {
+        'title': 'bench',
+        'duration': 3600,
+        'formats': formats,
+        'audio_formats': query_audio_formats(index, compact=compact),
+        'total_formats': total,
+    }
+    if orjson is not None:
+        return orjson.dumps(response)
+    return json.dumps(response, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def main():
+    num_formats = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    info = synthetic_info(num_formats)
+    index = build_format_index(info)
+    number = 2000
+
+    cases = {
+        'anterior (dicts + sort + json)': lambda: legacy_response(info),
+        'índice + proyección': lambda: indexed_response(index, compact=False),
+        'índice + compacto': lambda: indexed_response(index, compact=True),
+    }
+
+    print(f"{num_formats} formatos, {number} iteraciones, encoder: {'orjson' if orjson else 'json'}")
+    print(f"{'caso':34} {'µs/llamada':>12} {'bytes':>8}")
+    for name, func in cases.items():
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print(f"{name:34} {seconds / number * 1e6:12.1f} {len(func()):8d}")
+
+    build = min(timeit.repeat(lambda: build_format_index(info), number=number, repeat=3))
+    print(f"{'construir índice (una vez por video)':34} {build / number * 1e6:12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark del tiempo de arranque de la API.
+
+Importa `main` en un proceso nuevo con `python -X importtime` y muestra el
+tiempo acumulado de cada módulo, además del coste de yt-dlp si se importara
+en el arranque. Los tiempos son de importación, no incluyen el pre-calentamiento.
+
+Uso: python benchmarks/bench_startup.py [top_n] [modulo]
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_times(module: str) -> tuple:
+    """Devuelve (segundos de pared, [(acumulado_us, propio_us, módulo)]) para importar `module`"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise SystemExit(f"No se pudo importar {module}:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return wall, rows
+
+
+def main():
+    top_n = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    module = sys.argv[2] if len(sys.argv) > 2 else 'main'
+
+    wall, rows = import_times(module)
+    top_level = [row for row in rows if not row[2].startswith('  ')]
+    total_us = sum(row[0] for row in top_level)
+
+    print(f"import {module}: {total_us / 1000:.1f} ms de importación, {wall * 1000:.0f} ms de proceso completo")
+    print(f"{'módulo':40} {'acumulado ms':>13} {'propio ms':>10}")
+    for cumulative, own, name in sorted(rows, reverse=True)[:top_n]:
+        print(f"{name.strip():40} {cumulative / 1000:13.1f} {own / 1000:10.1f}")
+
+    loaded = {name.strip() for _, _, name in rows}
+    print()
+    print(f"yt_dlp importado al arrancar: {'sí' if 'yt_dlp' in loaded else 'no'}")
+    _, ytdlp_rows = import_times('yt_dlp')
+    ytdlp_us = max((row[0] for row in ytdlp_rows if row[2].strip() == 'yt_dlp'), default=0)
+    print(f"coste de importar yt_dlp (diferido al primer uso o al pre-calentamiento): {ytdlp_us / 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Micro-benchmark de la normalización de URLs.
+
+Compara la limpieza anterior (urlparse + parse_qs + urlencode) con el
+canonicalizador de urls.py sobre una mezcla de formas de URL. Las propiedades
+(formas equivalentes, URLs no válidas) se comprueban en tests/test_urls.py.
+
+Uso: python benchmarks/bench_url_canonicalize.py [n_urls] [semilla]
+"""
+
+import random
+import string
+import sys
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from downloader.urls import canonical_video_id  # noqa: E402
+
+ID_ALPHABET = string.ascii_letters + string.digits + '-_'
+
+# Formas equivalentes de la misma URL de video
+URL_FORMS = (
+    "https://www.youtube.com/watch?v={id}",
+    "https://youtube.com/watch?v={id}&list=PL{junk}&index=3",
+    "http://m.youtube.com/watch?feature=share&v={id}",
+    "https://music.youtube.com/watch?v={id}&si={junk}",
+    "www.youtube.com/watch?v={id}#t=42",
+    "youtube.com/watch/?v={id}",
+    "https://www.youtube.com/shorts/{id}?feature=share",
+    "https://www.youtube.com/embed/{id}?start=10",
+    "https://www.youtube.com/live/{id}?si={junk}",
+    "https://www.youtube.com/v/{id}",
+    "https://www.youtube-nocookie.com/embed/{id}",
+    "https://youtu.be/{id}",
+    "https://youtu.be/{id}?si={junk}&t=30",
+    "  HTTPS://WWW.YOUTUBE.COM/watch?v={id}  ",
+)
+
+
+def legacy_clean_youtube_url(url: str) -> str:
+    """Implementación anterior de clean_youtube_url, como referencia"""
+    try:
+        parsed = urlparse(url)
+        query_params = parse_qs(parsed.query)
+        if 'youtube.com' in parsed.netloc or 'youtu.be' in parsed.netloc:
+            clean_params = {}
+            if 'v' in query_params:
+                clean_params['v'] = query_params['v']
+            if 'youtu.be' in parsed.netloc:
+                return f"https://www.youtube.com/watch?v={parsed.path[1:]}"
+            clean_query = urlencode(clean_params, doseq=True)
+            return urlunparse((parsed.scheme, parsed.netloc, parsed.path, parsed.params, clean_query, None))
+        return url
+    except Exception:
+        return url
+
+
+def random_id(rng) -> str:
+    return ''.join(rng.choice(ID_ALPHABET) for _ in range(11))
+
+
+def random_junk(rng) -> str:
+    return ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(rng.randint(4, 30)))
+
+
+def build_inputs(rng, n_urls: int) -> list:
+    # Con repeticiones, como una lista real de entrada: ~1 de cada 4 URLs repite un video
+    ids = [random_id(rng) for _ in range(max(1, n_urls * 3 // 4))]
+    return [rng.choice(URL_FORMS).format(id=rng.choice(ids), junk=random_junk(rng)) for _ in range(n_urls)]
+
+
+def timed(function, *args) -> tuple:
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    n_urls = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(int(sys.argv[2]) if len(sys.argv) > 2 else 0)
+
+    urls = build_inputs(rng, n_urls)
+    legacy_time, legacy = timed(lambda: [legacy_clean_youtube_url(url) for url in urls])
+    single_time, single = timed(lambda: [canonical_video_id(url) for url in urls])
+
+    print(f"{n_urls} URLs ({len(set(single))} videos distintos)")
+    print(f"{'método':32} {'total ms':>9} {'µs/URL':>8}")
+    for name, elapsed in (
+        ('urlparse (anterior)', legacy_time),
+        ('canonical_video_id', single_time),
+    ):
+        print(f"{name:32} {elapsed * 1000:9.1f} {elapsed / n_urls * 1e6:8.2f}")
+
+    print()
+    print(f"claves distintas con la limpieza anterior: {len(set(legacy))}; con el id canónico: {len(set(single))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""YouTube Downloader: motor de descargas (engine) y API HTTP (app).
+
+El motor se puede usar como librería sin levantar el servidor:
+
+    from downloader import download_video
+    filepath, filename, selection = download_video(url, 'mp4', '1080p', 'salida/')
+"""
+
+from .cancel import CancelToken
+from .engine import DownloadCancelledError, DownloadError, clean_filename, clean_youtube_url, download_video
+from .formats import AUDIO_QUALITY_KBPS, VIDEO_QUALITY_HEIGHTS
+
+__all__ = [
+    'AUDIO_QUALITY_KBPS',
+    'VIDEO_QUALITY_HEIGHTS',
+    'CancelToken',
+    'DownloadCancelledError',
+    'DownloadError',
+    'clean_filename',
+    'clean_youtube_url',
+    'download_video',
+]
@@ -0,0 +1,587 @@
+"""Capa HTTP (FastAPI) de la API de descargas.
+
+Todos los despliegues importan `app` desde aquí: Render/Docker a través de
+`main.py`, Vercel desde `api/index.py` y el desarrollo local desde
+`backend/main.py`. Lo que antes variaba entre copias se configura por entorno.
+"""
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+import os
+import uuid
+from pathlib import Path
+import asyncio
+import functools
+import secrets
+import shutil
+import time
+
+from . import metrics, negcache, outputs, prefetch
+from .cancel import CancelToken
+from .delivery import DeliveryFileResponse
+from .engine import DownloadCancelledError, DownloadError, clean_youtube_url, download_video
+from .estimate import estimate_download, model_snapshot
+from .format_index import (
+    AUDIO_FIELDS,
+    DEFAULT_AUDIO_FIELDS,
+    DEFAULT_VIDEO_FIELDS,
+    VIDEO_FIELDS,
+    parse_fields,
+    parse_text_filter,
+    query_audio_formats,
+    query_video_formats,
+)
+from .formats import (
+    AUDIO_CONTENT_TYPES,
+    AUDIO_QUALITY_KBPS,
+    VIDEO_QUALITY_HEIGHTS,
+    negotiate_audio_exts,
+    select_video_format,
+)
+from .limiter import download_limiter
+from .metadata import get_inspection
+from .preflight import ERROR_STATUS, PreflightError, preflight
+from .retry import classify_error
+from .startup import PREWARM_MODE, PREWARM_STATE, prewarm
+from .thumbnails import THUMBNAIL_MAX_AGE, THUMBNAIL_SIZES, ThumbnailNotFound, get_thumbnail
+from .urls import canonical_video_id, is_video_id
+from .watchdog import WATCHDOG_STATE, start_watchdog
+
+try:
+    # orjson serializa bastante más rápido las respuestas grandes de /inspect
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+    import orjson  # noqa: F401
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+DEFAULT_CORS_ORIGINS = [
+    "http://localhost:3000", 
+    "http://127.0.0.1:3000",
+    "http://localhost:3001", 
+    "http://127.0.0.1:3001",
+    "https://*.vercel.app",
+    "https://vercel.app",
+    "https://*.onrender.com",
+    "https://youtube-downloader-vercel.app",
+    "https://youtube-downloader-a-mer-two.vercel.app",
+    "https://rieljefe-youtube-downloader.vercel.app",
+    "*"  # Temporal para debugging - remover en producción
+]
+
+# CORS_ORIGINS="https://a.app,https://b.app" sustituye la lista por defecto
+CORS_ORIGINS = [origin.strip() for origin in os.environ.get("CORS_ORIGINS", "").split(",") if origin.strip()] or DEFAULT_CORS_ORIGINS
+
+# LOG_REQUESTS=1 activa el log de origen/método/cabeceras de cada petición
+LOG_REQUESTS = os.environ.get("LOG_REQUESTS", "0") == "1"
+
+def check_url_cleaning():
+    """Comprobación sin red de la limpieza de URLs para el auto-test de arranque"""
+    cleaned = clean_youtube_url("https://youtu.be/dQw4w9WgXcQ")
+    assert cleaned == "https://www.youtube.com/watch?v=dQw4w9WgXcQ", cleaned
+    cleaned = clean_youtube_url("https://m.youtube.com/shorts/dQw4w9WgXcQ?feature=share")
+    assert cleaned == "https://www.youtube.com/watch?v=dQw4w9WgXcQ", cleaned
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # yt-dlp se importa bajo demanda; el pre-calentamiento lo carga sin retrasar /health
+    if PREWARM_MODE == "blocking":
+        await asyncio.to_thread(prewarm, [check_url_cleaning])
+    elif PREWARM_MODE != "off":
+        asyncio.create_task(asyncio.to_thread(prewarm, [check_url_cleaning]))
+    watchdog = start_watchdog(download_limiter, TEMP_DIR)
+    prefetcher = prefetch.start_prefetcher(download_limiter, TEMP_DIR)
+    yield
+    prefetch.stop_prefetcher(prefetcher)
+    if watchdog:
+        watchdog.cancel()
+
+app = FastAPI(title="YouTube Downloader API", version="1.0.0", lifespan=lifespan)
+
+if LOG_REQUESTS:
+    @app.middleware("http")
+    async def cors_logging_middleware(request: Request, call_next):
+        origin = request.headers.get("origin")
+        print(f"Request from origin: {origin}")
+        print(f"Request method: {request.method}")
+        print(f"Request URL: {request.url}")
+        
+        response = await call_next(request)
+        
+        print(f"Response headers: {response.headers}")
+        return response
+
+# Configurar CORS para permitir requests desde el frontend
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["*"],
+    expose_headers=["Content-Disposition", "ETag", "X-Format-Selected", "X-Format-Chain", "X-Download-Attempts", "X-Error-Class", "X-Negative-Cache", "X-Output-Cache", "Retry-After"],
+)
+
+# Crear directorio temporal para descargas
+TEMP_DIR = Path(os.environ.get("TEMP_DIR", "temp_downloads"))
+TEMP_DIR.mkdir(parents=True, exist_ok=True)
+
+# Cada cuántos segundos /download comprueba si el cliente sigue conectado
+DISCONNECT_POLL_INTERVAL = float(os.environ.get("DISCONNECT_POLL_INTERVAL", 0.5))
+
+# Máximo de formatos de vídeo por página en /inspect
+INSPECT_MAX_LIMIT = int(os.environ.get("INSPECT_MAX_LIMIT", 100))
+
+class DownloadRequest(BaseModel):
+    url: str
+    format: str  # 'mp3', 'mp4' o 'audio' (audio original m4a/webm sin recodificar)
+    quality: str = "high"
+    start: float | None = None  # segundos; con start/end solo se descarga ese tramo
+    end: float | None = None
+
+class PrefetchTarget(BaseModel):
+    format: str
+    quality: str = "high"
+
+class PrefetchRequest(BaseModel):
+    urls: list[str]
+    targets: list[PrefetchTarget] = []  # vacío: solo se calientan los metadatos
+    run_now: bool = False  # procesar ya, sin esperar a PREFETCH_WINDOW
+
+# Manejar solicitudes OPTIONS para CORS
+@app.options("/{path:path}")
+async def options_handler(request: Request, path: str):
+    """Maneja las solicitudes OPTIONS para CORS preflight"""
+    return Response(
+        status_code=200,
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+            "Access-Control-Allow-Headers": "*",
+            "Access-Control-Max-Age": "86400"
+        }
+    )
+
+@app.get("/")
+async def root():
+    return {"message": "YouTube Downloader API funcionando correctamente"}
+
+@app.get("/cors-test")
+async def cors_test():
+    """Endpoint para probar CORS"""
+    return {
+        "message": "CORS funcionando correctamente",
+        "status": "success"
+    }
+
+@app.get("/qualities")
+async def get_available_qualities():
+    """Endpoint para obtener las calidades disponibles por formato"""
+    return {
+        "mp3": {
+            "low": "96 kbps",
+            "medium": "128 kbps", 
+            "high": "192 kbps",
+            "highest": "320 kbps"
+        },
+        "audio": {
+            "low": "≥ 96 kbps (m4a/webm original)",
+            "medium": "≥ 128 kbps (m4a/webm original)",
+            "high": "≥ 192 kbps (m4a/webm original)",
+            "highest": "≥ 320 kbps (m4a/webm original)"
+        },
+        "mp4": {
+            "720p": "HD 720p",
+            "1080p": "Full HD 1080p",
+            "1440p": "2K 1440p", 
+            "2160p": "4K 2160p"
+        }
+    }
+
+@app.post("/inspect")
+async def inspect_video_formats(request: dict):
+    """Endpoint para inspeccionar los formatos disponibles de un video"""
+    url = request.get('url')
+    if not url:
+        raise HTTPException(status_code=400, detail="URL es requerida")
+    
+    clean_url = clean_youtube_url(url)
+    print(f"Inspeccionando - URL original: {url}")
+    print(f"Inspeccionando - URL limpia: {clean_url}")
+    
+    # Un video que acaba de fallar (privado, eliminado...) falla igual sin consultar YouTube
+    video_id = canonical_video_id(url)
+    hit = negcache.lookup(video_id)
+    if hit:
+        raise HTTPException(status_code=hit['status_code'], detail=f"Error al inspeccionar video: {hit['detail']}",
+                            headers=negcache.headers(hit))
+    
+    try:
+        fields = parse_fields(request.get('fields'), VIDEO_FIELDS, DEFAULT_VIDEO_FIELDS)
+        audio_fields = parse_fields(request.get('audio_fields'), AUDIO_FIELDS, DEFAULT_AUDIO_FIELDS)
+        ext = parse_text_filter(request.get('ext'), 'ext')
+        vcodec = parse_text_filter(request.get('vcodec'), 'vcodec')
+        audio_ext = parse_text_filter(request.get('audio_ext'), 'audio_ext')
+        min_height = int(request.get('min_height') or 0)
+        offset = int(request.get('offset') or 0)
+        limit = int(request.get('limit') or INSPECT_MAX_LIMIT)
+        if offset < 0 or not 0 < limit <= INSPECT_MAX_LIMIT:
+            raise ValueError(f"offset debe ser >= 0 y limit estar entre 1 y {INSPECT_MAX_LIMIT}")
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Parámetros no válidos: {str(e)}")
+    
+    compact = bool(request.get('compact'))
+    
+    try:
+        info, index, sidecar = await asyncio.to_thread(get_inspection, clean_url)
+        
+        formats, total = query_video_formats(
+            index, fields, min_height=min_height, ext=ext, vcodec=vcodec,
+            offset=offset, limit=limit, compact=compact
+        )
+        
+        response = {
+            'id': sidecar['id'],
+            'title': sidecar['title'],
+            'duration': sidecar['duration'],
+            'thumbnails': sidecar['thumbnails'],
+            'preview': {
+                name: f"/thumbnail/{sidecar['id']}?size={name}" for name in THUMBNAIL_SIZES
+            } if sidecar['id'] else {},
+            'chapters': sidecar['chapters'],
+            'formats': formats,
+            'audio_formats': query_audio_formats(index, audio_fields, ext=audio_ext, compact=compact),
+            'total_formats': total,
+            'offset': offset,
+            'limit': limit,
+            'next_offset': offset + limit if offset + limit < total else None,
+        }
+        
+        # En modo compacto los formatos son listas y los nombres de columna van aparte
+        if compact:
+            response['format_fields'] = fields
+            response['audio_format_fields'] = audio_fields
+        
+        # Si se indica una calidad, explicar qué cadena de formatos se usaría
+        quality = request.get('quality')
+        if quality in VIDEO_QUALITY_HEIGHTS:
+            response['selection'] = select_video_format(info, quality)
+        
+        return FastJSONResponse(response)
+        
+    except Exception as e:
+        error_class = classify_error(e)
+        status_code = ERROR_STATUS.get(error_class, 400)
+        negcache.remember(video_id, error_class, status_code, str(e))
+        raise HTTPException(status_code=status_code, detail=f"Error al inspeccionar video: {str(e)}",
+                            headers={"X-Error-Class": error_class})
+
+@app.get("/thumbnail/{video_id}")
+async def get_video_thumbnail(video_id: str, request: Request, size: str = "medium"):
+    """Endpoint para obtener la miniatura de un video en un tamaño estándar"""
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"Tamaño no válido. Usa: {', '.join(THUMBNAIL_SIZES)}")
+    
+    # El id acaba en una ruta de la caché: solo se aceptan ids de 11 caracteres
+    if not is_video_id(video_id):
+        raise HTTPException(status_code=400, detail="Id de video no válido")
+    
+    hit = negcache.lookup(video_id)
+    if hit:
+        raise HTTPException(status_code=hit['status_code'], detail=f"Error al obtener la miniatura: {hit['detail']}",
+                            headers=negcache.headers(hit))
+    
+    try:
+        path, etag = await asyncio.to_thread(get_thumbnail, video_id, size)
+    except ThumbnailNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        error_class = classify_error(e)
+        # Un fallo sin clasificar (imagen corrupta, Pillow) es del servidor, no de la petición
+        status_code = 502 if error_class == 'unknown' else ERROR_STATUS[error_class]
+        negcache.remember(video_id, error_class, status_code, str(e))
+        raise HTTPException(status_code=status_code, detail=f"Error al obtener la miniatura: {str(e)}",
+                            headers={"X-Error-Class": error_class})
+    
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={THUMBNAIL_MAX_AGE}",
+    }
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+def validate_download_request(request: DownloadRequest, http_request: Request) -> list | None:
+    """Valida formato, calidad y clip; devuelve los contenedores de audio aceptados (solo en 'audio')"""
+    if request.format not in ['mp3', 'mp4', 'audio']:
+        raise HTTPException(status_code=400, detail="Formato no válido. Usa 'mp3', 'mp4' o 'audio'")
+    
+    if request.format in ('mp3', 'audio') and request.quality not in AUDIO_QUALITY_KBPS:
+        raise HTTPException(status_code=400, detail="Calidad de audio no válida. Usa: 'low', 'medium', 'high', 'highest'")
+    
+    if request.format == 'mp4' and request.quality not in VIDEO_QUALITY_HEIGHTS:
+        raise HTTPException(status_code=400, detail="Calidad de video no válida. Usa: '720p', '1080p', '1440p', '2160p'")
+    
+    if request.start is not None and request.start < 0:
+        raise HTTPException(status_code=400, detail="El inicio del clip no puede ser negativo")
+    
+    if request.end is not None and request.end <= (request.start or 0):
+        raise HTTPException(status_code=400, detail="El final del clip debe ser posterior al inicio")
+    
+    audio_exts = None
+    if request.format == 'audio':
+        audio_exts = negotiate_audio_exts(http_request.headers.get("accept"))
+        if not audio_exts:
+            raise HTTPException(status_code=406, detail="El cliente no acepta ningún audio nativo (audio/mp4 o audio/webm)")
+    
+    return audio_exts
+
+@app.post("/estimate")
+async def estimate_download_cost(request: DownloadRequest, http_request: Request):
+    """Endpoint para estimar tamaño, tiempo y CPU de una descarga antes de pedirla"""
+    audio_exts = validate_download_request(request, http_request)
+    
+    try:
+        checked = await asyncio.to_thread(
+            preflight, request.url, request.format, request.quality, audio_exts,
+            start=request.start, end=request.end, enforce=False
+        )
+    except PreflightError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error al estimar la descarga: {str(e)}")
+    
+    estimate = estimate_download(
+        checked['info'], request.format, checked['selection'], start=request.start, end=request.end,
+        queue_wait=download_limiter.expected_wait()
+    )
+    estimate['format'] = request.format
+    estimate['queue'] = download_limiter.snapshot()
+    # Motivos por los que /download rechazaría esta petición (límites de duración/tamaño)
+    estimate['violations'] = checked['violations']
+    return estimate
+
+async def cancel_on_disconnect(http_request: Request, cancel: CancelToken):
+    """Cancela la descarga en cuanto el cliente cierra la conexión"""
+    while not cancel.cancelled:
+        if await http_request.is_disconnected():
+            # Cancelar recorre /proc para matar ffmpeg: fuera del event loop
+            await asyncio.to_thread(cancel.cancel, "el cliente se desconectó")
+            return
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+def file_download_response(filepath: str, filename: str, selection: dict, format: str, cache_status: str,
+                           on_close=None) -> DeliveryFileResponse:
+    if format == 'audio':
+        content_type = AUDIO_CONTENT_TYPES.get(Path(filepath).suffix[1:], "application/octet-stream")
+    else:
+        content_type = "audio/mpeg" if format == 'mp3' else "video/mp4"
+    
+    headers = {"Content-Disposition": f"attachment; filename=\"{filename}\""}
+    headers["X-Format-Selected"] = selection['chain'][0]['format_id'] if selection['chain'] else selection['fallback']
+    headers["X-Format-Chain"] = " > ".join(entry['format_id'] for entry in selection['chain']) or selection['fallback']
+    headers["X-Output-Cache"] = cache_status
+    if format == 'audio':
+        headers["Vary"] = "Accept"
+    
+    return DeliveryFileResponse(
+        filepath,
+        media_type=content_type,
+        filename=filename,
+        headers=headers,
+        on_close=on_close
+    )
+
+async def acquire_slot_unless_disconnected(watcher: asyncio.Task) -> bool:
+    """Espera un hueco del limitador; False (sin hueco ocupado) si el cliente se fue antes.
+
+    `watcher` es la tarea de cancel_on_disconnect: solo termina cuando el
+    cliente se desconecta.
+    """
+    acquire = asyncio.create_task(download_limiter.acquire())
+    done, _ = await asyncio.wait({acquire, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    if acquire in done:
+        acquire.result()
+        return True
+    
+    acquire.cancel()
+    try:
+        await acquire
+    except asyncio.CancelledError:
+        return False
+    # El hueco llegó a la vez que la desconexión: se devuelve sin usarlo
+    await download_limiter.release()
+    return False
+
+@app.post("/download")
+async def download_youtube_video(request: DownloadRequest, http_request: Request):
+    """Endpoint para descargar videos de YouTube"""
+    
+    audio_exts = validate_download_request(request, http_request)
+    
+    # Archivo ya generado (por otra petición o por el pre-cargado): basta el id canónico,
+    # sin pedir metadatos a YouTube, ni directorio temporal, ni hueco del limitador
+    video_id = canonical_video_id(request.url)
+    if video_id:
+        hit = negcache.lookup(video_id)
+        if hit:
+            raise HTTPException(status_code=hit['status_code'], detail=f"Video no disponible: {hit['detail']}",
+                                headers=negcache.headers(hit))
+        cache_key = outputs.output_key(video_id, request.format, request.quality, audio_exts,
+                                       start=request.start, end=request.end)
+        cached = await asyncio.to_thread(outputs.lookup, cache_key)
+        if cached:
+            # La entrada queda fijada (no se expulsa) hasta terminar de enviarla
+            return file_download_response(cached['path'], cached['filename'], cached['selection'], request.format, "hit",
+                                          on_close=functools.partial(outputs.release, cache_key))
+    
+    # Comprobaciones baratas antes de reservar directorio, hueco del limitador o ffmpeg
+    try:
+        checked = await asyncio.to_thread(
+            preflight, request.url, request.format, request.quality, audio_exts,
+            start=request.start, end=request.end
+        )
+    except PreflightError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error al descargar: {str(e)}")
+    
+    download_id = str(uuid.uuid4())
+    temp_path = TEMP_DIR / download_id
+    
+    try:
+        # El motor bloquea mientras trabajan yt-dlp y ffmpeg: se ejecuta fuera del
+        # event loop y como mucho MAX_CONCURRENT_DOWNLOADS a la vez.
+        # Si el cliente se va (pestaña cerrada), se aborta la descarga en vez de
+        # terminarla para nadie, también mientras espera turno en la cola
+        cancel = CancelToken()
+        watcher = asyncio.create_task(cancel_on_disconnect(http_request, cancel))
+        try:
+            if not await acquire_slot_unless_disconnected(watcher):
+                metrics.incr('downloads_cancelled_total', stage='queued')
+                raise DownloadCancelledError(f"Descarga cancelada en la cola: {cancel.reason}")
+            started = time.monotonic()
+            try:
+                # El directorio solo se crea con el hueco ya ocupado
+                temp_path.mkdir(exist_ok=True)
+                filepath, filename, selection = await asyncio.to_thread(
+                    download_video, checked['clean_url'], request.format, request.quality, str(temp_path), audio_exts,
+                    start=request.start, end=request.end, cancel=cancel, source_cache=True
+                )
+            finally:
+                await download_limiter.release(started)
+        finally:
+            watcher.cancel()
+        
+        if not os.path.exists(filepath):
+            raise HTTPException(status_code=500, detail="Error: el archivo no se generó correctamente")
+        
+        cached_path = await asyncio.to_thread(outputs.store, cache_key, filepath, filename, selection, checked['video_id'],
+                                              pin=True)
+        # Si se quedó en el directorio temporal (sin caché o no cabe) no hay nada fijado
+        on_close = functools.partial(outputs.release, cache_key) if cached_path != filepath else None
+        
+        async def cleanup():
+            await asyncio.sleep(5)
+            try:
+                shutil.rmtree(temp_path)
+            except:
+                pass
+        
+        asyncio.create_task(cleanup())
+        
+        response = file_download_response(cached_path, filename, selection, request.format, "miss", on_close=on_close)
+        response.headers["X-Download-Attempts"] = str(selection['attempts'])
+        return response
+        
+    except DownloadCancelledError as e:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        # 499: el cliente cerró la conexión (nadie leerá esta respuesta)
+        raise HTTPException(status_code=499, detail=str(e))
+    except DownloadError as e:
+        try:
+            shutil.rmtree(temp_path)
+        except:
+            pass
+        # Mismo código que preflight para cada clase: un acierto posterior de la caché negativa coincide
+        status_code = ERROR_STATUS.get(e.error_class, 400)
+        negcache.remember(checked['video_id'], e.error_class, status_code, str(e))
+        raise HTTPException(status_code=status_code, detail=f"Error al descargar: {str(e)}",
+                            headers={"X-Error-Class": e.error_class})
+    except HTTPException:
+        try:
+            shutil.rmtree(temp_path)
+        except:
+            pass
+        raise
+    except Exception as e:
+        try:
+            shutil.rmtree(temp_path)
+        except:
+            pass
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+def require_admin(http_request: Request):
+    if not prefetch.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Administración desactivada (falta ADMIN_TOKEN)")
+    token = http_request.headers.get("x-admin-token", "")
+    if not secrets.compare_digest(token.encode(), prefetch.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Token de administración no válido")
+
+@app.post("/admin/prefetch")
+async def enqueue_prefetch(request: PrefetchRequest, http_request: Request):
+    """Encola videos para generarlos en horas valle y servirlos luego desde caché"""
+    require_admin(http_request)
+    try:
+        return prefetch.enqueue(request.urls, [target.model_dump() for target in request.targets], request.run_now)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OverflowError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get("/admin/prefetch")
+async def get_prefetch_status(http_request: Request):
+    """Estado de la cola de pre-cargado y de la caché de salida"""
+    require_admin(http_request)
+    return prefetch.snapshot()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Contadores de intentos, reintentos y fallos en formato de texto de Prometheus"""
+    return metrics.render_prometheus()
+
+@app.get("/health")
+async def health_check():
+    """Endpoint para verificar el estado del servidor"""
+    return {
+        "status": "healthy",
+        "message": "El servidor está funcionando correctamente",
+        "prewarm": PREWARM_STATE['status'],
+        "ready": is_ready(),
+        "watchdog": WATCHDOG_STATE,
+        "downloads": download_limiter.snapshot(),
+        "estimate_model": model_snapshot(),
+    }
+
+def is_ready() -> bool:
+    return WATCHDOG_STATE['status'] != 'overloaded' and PREWARM_STATE['status'] != 'failed'
+
+@app.get("/health/live")
+async def liveness_check():
+    """Responde mientras el proceso y su event loop estén vivos"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """503 si la instancia está sobrecargada o no pudo cargar yt-dlp: el balanceador deja de enviarle tráfico"""
+    body = {
+        "ready": is_ready(),
+        "watchdog": WATCHDOG_STATE['status'],
+        "reasons": WATCHDOG_STATE['reasons'],
+        "prewarm": PREWARM_STATE['status'],
+        "downloads": download_limiter.snapshot(),
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
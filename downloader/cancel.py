@@ -0,0 +1,80 @@
+"""Cancelación cooperativa de descargas.
+
+Un CancelToken se comparte entre la capa HTTP y el motor. Al cancelarlo:
+
+- el hook de progreso de yt-dlp lanza DownloadCancelled en el siguiente bloque
+- los callbacks registrados se ejecutan (el motor registra uno que mata los
+  procesos ffmpeg que escriben en su directorio temporal)
+- los reintentos pendientes se abandonan
+"""
+
+import os
+import signal
+import threading
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelada"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks)
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error al cancelar ({reason}): {e}")
+
+    def add_callback(self, callback):
+        """Registra una acción para cuando se cancele (se ejecuta ya si lo estaba)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def wait(self, timeout: float) -> bool:
+        """Duerme hasta `timeout` segundos; devuelve True si se canceló mientras tanto"""
+        return self._event.wait(timeout)
+
+
+def kill_child_processes(marker: str) -> int:
+    """Mata los procesos hijos (ffmpeg) cuya línea de comandos contiene `marker`"""
+    if not os.path.isdir('/proc'):
+        return 0
+
+    pid = os.getpid()
+    killed = 0
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as handle:
+                parent = int(handle.read().rpartition(') ')[2].split()[1])
+            if parent != pid:
+                continue
+            with open(f'/proc/{entry}/cmdline', 'rb') as handle:
+                cmdline = handle.read().replace(b'\0', b' ').decode(errors='replace')
+        except (OSError, ValueError, IndexError):
+            continue
+
+        if marker in cmdline:
+            try:
+                os.kill(int(entry), signal.SIGKILL)
+                killed += 1
+            except OSError:
+                pass
+    return killed
@@ -0,0 +1,195 @@
+"""CLI para descargas masivas sin pasar por la API HTTP.
+
+Uso:
+    python -m downloader -i urls.txt -o descargas/ -f mp4 -q 1080p -j 4
+    cat urls.txt | python -m downloader -o descargas/ -f mp3
+
+Cada URL se descarga en `<salida>/.partial/<clave>/` (yt-dlp reanuda los
+`.part` si el trabajo se interrumpe) y el resultado se mueve a `<salida>/`.
+Cada resultado se añade como una línea JSON al manifiesto; al relanzar, las
+URLs que ya constan como descargadas y cuyo archivo sigue existiendo se saltan.
+
+La caché de streams de origen (sources.py) está desactivada salvo con
+`--source-cache`, que la guarda en `<salida>/.sources/` y no en ./cache.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from . import sources
+from .engine import DownloadError, clean_youtube_url, download_video
+from .formats import AUDIO_QUALITY_KBPS, VIDEO_QUALITY_HEIGHTS
+from .urls import canonical_video_id
+
+FORMATS = ('mp3', 'mp4', 'audio')
+
+
+def read_urls(source) -> list:
+    """Lee URLs de un archivo o de stdin ('-'), ignorando líneas vacías y comentarios"""
+    handle = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        return [line.strip() for line in handle if line.strip() and not line.lstrip().startswith('#')]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def dedupe_urls(urls: list) -> list:
+    """Quita las URLs que apuntan a un video ya presente en la lista (youtu.be, shorts, m., ...)"""
+    seen = set()
+    unique = []
+    for url in urls:
+        key = canonical_video_id(url) or url
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
+
+
+def job_key(url: str, format: str, quality: str) -> str:
+    # clean_youtube_url da la URL canónica: todas las formas de un video comparten clave
+    return hashlib.sha1(f"{clean_youtube_url(url)}|{format}|{quality}".encode()).hexdigest()[:16]
+
+
+def load_manifest(path: Path) -> dict:
+    """Devuelve las entradas correctas del manifiesto por clave de trabajo"""
+    done = {}
+    if not path.exists():
+        return done
+
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('status') in ('ok', 'skipped') and entry.get('path'):
+                done[entry['key']] = entry
+    return done
+
+
+def unique_destination(output_dir: Path, filename: str, key: str) -> Path:
+    """Evita pisar el resultado de otra URL cuyo título limpio coincide"""
+    destination = output_dir / filename
+    if destination.exists():
+        destination = output_dir / f"{destination.stem}-{key[:8]}{destination.suffix}"
+    return destination
+
+
+class BatchRunner:
+    def __init__(self, output_dir: Path, format: str, quality: str, manifest_path: Path, skip_existing: bool = True,
+                 source_cache: bool = False):
+        self.output_dir = output_dir
+        self.source_cache = source_cache
+        self.format = format
+        self.quality = quality
+        self.manifest_path = manifest_path
+        self.done = load_manifest(manifest_path) if skip_existing else {}
+        self._manifest_lock = threading.Lock()
+        self._move_lock = threading.Lock()
+
+    def record(self, entry: dict):
+        entry['finished_at'] = int(time.time())
+        with self._manifest_lock:
+            with open(self.manifest_path, 'a', encoding='utf-8') as handle:
+                handle.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        print(f"[{entry['status']}] {entry['url']} {entry.get('path') or entry.get('error', '')}")
+
+    def run_one(self, url: str) -> dict:
+        key = job_key(url, self.format, self.quality)
+        entry = {'url': url, 'key': key, 'format': self.format, 'quality': self.quality}
+
+        previous = self.done.get(key)
+        if previous and Path(previous['path']).exists():
+            entry.update(status='skipped', path=previous['path'], bytes=os.path.getsize(previous['path']))
+            self.record(entry)
+            return entry
+
+        work_dir = self.output_dir / '.partial' / key
+        work_dir.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+
+        try:
+            filepath, filename, selection = download_video(
+                url, self.format, self.quality, str(work_dir), source_cache=self.source_cache
+            )
+            with self._move_lock:
+                destination = unique_destination(self.output_dir, filename, key)
+                shutil.move(filepath, destination)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            entry.update(
+                status='ok',
+                path=str(destination),
+                bytes=destination.stat().st_size,
+                selected_format=selection['chain'][0]['format_id'] if selection['chain'] else selection['fallback'],
+            )
+        except DownloadError as e:
+            # Se conserva work_dir: los .part permiten reanudar en la siguiente ejecución
+            entry.update(status='error', error=str(e), error_class=e.error_class)
+        except Exception as e:
+            # Disco lleno, permisos, un fallo propio...: un trabajo no debe tumbar el lote
+            entry.update(status='error', error=f"{type(e).__name__}: {e}", error_class='unknown')
+
+        entry['seconds'] = round(time.perf_counter() - started, 2)
+        self.record(entry)
+        return entry
+
+    def run(self, urls: list, workers: int) -> list:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self.run_one, urls))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m downloader', description="Descarga masiva de videos de YouTube")
+    parser.add_argument('-i', '--input', default='-', help="archivo con una URL por línea ('-' para stdin)")
+    parser.add_argument('-o', '--output', required=True, help="directorio de destino")
+    parser.add_argument('-f', '--format', default='mp4', choices=FORMATS)
+    parser.add_argument('-q', '--quality', help="calidad (por defecto 1080p para mp4 y high para audio)")
+    parser.add_argument('-j', '--workers', type=int, default=2, help="descargas en paralelo")
+    parser.add_argument('--manifest', help="manifiesto JSON-lines (por defecto <salida>/manifest.jsonl)")
+    parser.add_argument('--no-skip', action='store_true', help="no saltar las URLs ya descargadas")
+    parser.add_argument('--source-cache', action='store_true',
+                        help="reutilizar los streams de origen entre variantes (en <salida>/.sources)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    quality = args.quality or ('1080p' if args.format == 'mp4' else 'high')
+    valid = VIDEO_QUALITY_HEIGHTS if args.format == 'mp4' else AUDIO_QUALITY_KBPS
+    if quality not in valid:
+        print(f"Calidad no válida para {args.format}. Usa: {', '.join(valid)}", file=sys.stderr)
+        return 2
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = Path(args.manifest) if args.manifest else output_dir / 'manifest.jsonl'
+
+    urls = read_urls(args.input)
+    if not urls:
+        print("No hay URLs que descargar", file=sys.stderr)
+        return 2
+
+    unique_urls = dedupe_urls(urls)
+    if len(unique_urls) < len(urls):
+        print(f"Se ignoran {len(urls) - len(unique_urls)} URLs repetidas del mismo video")
+    urls = unique_urls
+
+    if args.source_cache:
+        sources.configure(output_dir / '.sources')
+    runner = BatchRunner(output_dir, args.format, quality, manifest_path, skip_existing=not args.no_skip,
+                         source_cache=args.source_cache)
+    results = runner.run(urls, max(1, args.workers))
+
+    summary = {status: sum(1 for entry in results if entry['status'] == status) for status in ('ok', 'skipped', 'error')}
+    print(f"Terminado: {summary['ok']} descargadas, {summary['skipped']} saltadas, {summary['error']} con error")
+    return 1 if summary['error'] else 0
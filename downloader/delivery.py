@@ -0,0 +1,77 @@
+"""Envío de archivos generados al cliente.
+
+`DeliveryFileResponse` sustituye a `FileResponse` (mismas cabeceras, ETag,
+Range y HEAD) y solo cambia cómo se leen los bytes: búferes de
+DELIVERY_CHUNK_SIZE (1 MiB frente a los 64 KiB de Starlette) y lectura
+adelantada, es decir, el siguiente bloque se lee en un hilo mientras se envía
+el actual.
+
+Todos los puntos de entrada del repositorio sirven la app con uvicorn, que no
+ofrece las extensiones ASGI de envío sin copia (zerocopysend, pathsend), así
+que no hay camino para ellas. La clase sobrescribe `_handle_simple` y
+`_handle_single_range`, que son internos de Starlette: la versión está fijada
+en requirements.txt y tests/test_delivery.py cubre respuestas completas,
+rangos y HEAD. benchmarks/bench_delivery.py mide el rendimiento y la CPU por GB.
+
+`on_close` se llama al terminar la respuesta pase lo que pase (enviada, 416,
+cliente desconectado); el `background` de Starlette no corre si el envío
+falla, así que no sirve para soltar una entrada fijada de la caché de salida.
+"""
+
+import asyncio
+import os
+
+from fastapi.responses import FileResponse
+
+DELIVERY_CHUNK_SIZE = int(os.environ.get("DELIVERY_CHUNK_SIZE", str(1024 * 1024)))
+
+
+class DeliveryFileResponse(FileResponse):
+    chunk_size = DELIVERY_CHUNK_SIZE
+
+    def __init__(self, *args, on_close=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+    async def _handle_simple(self, send, send_header_only, send_pathsend):
+        if send_header_only:
+            return await super()._handle_simple(send, send_header_only, send_pathsend)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await self._send_range(send, 0, int(self.headers["content-length"]))
+
+    async def _handle_single_range(self, send, start, end, file_size, send_header_only):
+        if send_header_only:
+            return await super()._handle_single_range(send, start, end, file_size, send_header_only)
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        await self._send_range(send, start, end)
+
+    async def _send_range(self, send, start: int, end: int):
+        with open(self.path, "rb", buffering=0) as file:
+            def read(offset: int) -> bytes:
+                return os.pread(file.fileno(), min(self.chunk_size, end - offset), offset)
+
+            offset = start
+            pending = asyncio.create_task(asyncio.to_thread(read, offset)) if offset < end else None
+            try:
+                while pending is not None:
+                    chunk = await pending
+                    offset += len(chunk)
+                    # Archivo truncado mientras se enviaba: se corta aquí en vez de quedarse en bucle
+                    more_body = offset < end and len(chunk) > 0
+                    pending = asyncio.create_task(asyncio.to_thread(read, offset)) if more_body else None
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                if start == end:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+            finally:
+                if pending is not None:
+                    # El hilo sigue usando el descriptor aunque se cancele la tarea: se espera antes de cerrarlo
+                    await asyncio.gather(pending, return_exceptions=True)
@@ -0,0 +1,365 @@
+"""Motor de descargas: limpieza de URLs, selección de formato y ejecución de yt-dlp.
+
+No depende de FastAPI. Las funciones son síncronas (bloquean mientras
+yt-dlp y ffmpeg trabajan); la capa HTTP las ejecuta en un hilo.
+"""
+
+import copy
+import os
+import re
+import time
+import traceback
+import unicodedata
+from contextlib import ExitStack
+
+from . import metrics, sources
+from .cancel import kill_child_processes
+from .estimate import clip_seconds, postprocess_profile, record_postprocess, record_throughput
+from .formats import (
+    AUDIO_QUALITY_KBPS,
+    DEFAULT_AUDIO_QUALITY,
+    NATIVE_AUDIO_EXTS,
+    select_audio_format,
+    select_video_format,
+)
+from .metadata import get_video_info
+from .records import download_info
+from .retry import RETRY_POLICIES, SOURCE_RETRY_POLICIES, RetryError, classify_error, run_with_retry
+from .urls import canonical_url, canonical_video_id
+
+
+class DownloadError(Exception):
+    """Error de descarga que se puede mostrar al usuario"""
+
+    def __init__(self, message: str, error_class: str = 'unknown'):
+        super().__init__(message)
+        self.error_class = error_class
+
+
+class DownloadCancelledError(DownloadError):
+    """La descarga se abortó porque nadie espera ya el resultado"""
+
+    def __init__(self, message: str, bytes_saved: int = 0):
+        super().__init__(message, 'cancelled')
+        self.bytes_saved = bytes_saved
+
+
+def clean_filename(filename: str) -> str:
+    """Limpia el nombre del archivo para evitar caracteres problemáticos"""
+    filename = unicodedata.normalize('NFKD', filename)
+    cleaned = re.sub(r'[^\x00-\x7F]+', '', filename)
+    cleaned = re.sub(r'[<>:"/\\|?*]', '', cleaned)
+    cleaned = cleaned.replace(' ', '_')
+    cleaned = re.sub(r'[_]{2,}', '_', cleaned)
+    cleaned = cleaned.strip('_-.')
+
+    if not cleaned:
+        cleaned = 'video'
+
+    return cleaned[:100]
+
+
+def clean_youtube_url(url: str) -> str:
+    """Limpia una URL de YouTube para extraer solo el video específico.
+
+    Cualquier forma soportada (ver urls.py) se convierte en la URL canónica
+    `https://www.youtube.com/watch?v=<id>`; el resto se devuelve sin cambios.
+    """
+    video_id = canonical_video_id(url)
+    if video_id:
+        return canonical_url(video_id)
+    return url.strip() if isinstance(url, str) else url
+
+
+def format_seconds(seconds: float) -> str:
+    """Formatea segundos para el nombre de un clip (90 -> '90', 12.5 -> '12.5')"""
+    return f"{seconds:g}"
+
+
+def output_template(output_path: str, clean_title: str) -> str:
+    """Plantilla de yt-dlp para el título ya limpio (ver clean_filename)"""
+    # '%' es especial en las plantillas de yt-dlp ("100%_real" rompería el outtmpl)
+    return os.path.join(output_path, f"{clean_title.replace('%', '%%')}.%(ext)s")
+
+
+def resolve_output_path(result: dict | None, final_paths: list) -> str | None:
+    """Ruta final del archivo según yt-dlp, sin recorrer el directorio de salida.
+
+    `requested_downloads` lleva la ruta tras todos los postprocesadores; los
+    hooks de postprocesado sirven de respaldo si no está disponible.
+    """
+    for download in reversed((result or {}).get('requested_downloads') or []):
+        filepath = download.get('filepath')
+        if filepath and os.path.exists(filepath):
+            return filepath
+
+    for filepath in reversed(final_paths):
+        if os.path.exists(filepath):
+            return filepath
+
+    return None
+
+
+def extract_for_download(ydl, url: str, format_ids: list) -> dict:
+    """extract_info + descarga reteniendo solo los formatos de la cadena (records.download_info)"""
+    raw = ydl.extract_info(url, download=False, process=False)
+    info = download_info(raw, format_ids)
+    del raw
+    return ydl.process_ie_result(info, download=True)
+
+
+def download_video(url: str, format: str, quality: str, output_path: str, audio_exts: list | None = None,
+                   start: float | None = None, end: float | None = None, cancel=None,
+                   source_cache: bool = False) -> tuple[str, str, dict]:
+    """Descarga el video usando yt-dlp con calidad especificada.
+
+    Con `cancel` (un CancelToken) la descarga se aborta en cuanto se cancela:
+    el hook de progreso corta yt-dlp, se matan los ffmpeg que escriben en
+    `output_path` y se lanza DownloadCancelledError.
+
+    Con `source_cache` (y la caché de origen activa, ver sources.py) y sin clip,
+    cada stream de la alternativa elegida se baja una sola vez para todas las
+    variantes del video y el archivo final se genera en local. Por defecto está
+    desactivada: quien use la librería no llena una caché que no ha pedido.
+    """
+    import yt_dlp
+    from yt_dlp.utils import DownloadCancelled, download_range_func
+
+    clean_url = clean_youtube_url(url)
+    print(f"URL original: {url}")
+    print(f"URL limpia: {clean_url}")
+
+    base_opts = {
+        'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s'),
+        'noplaylist': True,
+        'no_warnings': False,
+        'extractaudio': format == 'mp3',
+        'nocheckcertificate': False,
+        'ignoreerrors': False,
+    }
+
+    if format == 'mp3':
+        audio_quality = str(AUDIO_QUALITY_KBPS.get(quality, AUDIO_QUALITY_KBPS[DEFAULT_AUDIO_QUALITY]))
+
+        ydl_opts = {
+            **base_opts,
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': audio_quality,
+            }],
+        }
+    elif format == 'audio':
+        # Audio nativo: el stream original sin recodificar (yt-dlp solo remuxea si hace falta)
+        ydl_opts = {**base_opts}
+    else:
+        ydl_opts = {
+            **base_opts,
+            'merge_output_format': 'mp4',
+            'postprocessors': [{
+                'key': 'FFmpegVideoConvertor',
+                'preferedformat': 'mp4',
+            }],
+        }
+
+    try:
+        print(f"Intentando descargar en calidad: {quality}")
+
+        info = get_video_info(clean_url)
+        title = info.get('title', 'video')
+        duration = info.get('duration')
+        clean_title = clean_filename(title)
+
+        # El formato concreto se decide con los metadatos (ver formats.py)
+        if format == 'mp3':
+            selection = select_audio_format(info, quality)
+        elif format == 'audio':
+            selection = select_audio_format(info, quality, audio_exts or list(NATIVE_AUDIO_EXTS))
+        else:
+            selection = select_video_format(info, quality)
+
+        ydl_opts['format'] = selection['format']
+        print("Cadena de formatos:")
+        for step in selection['explanation']:
+            print(f"  {step}")
+
+        if start is not None or end is not None:
+            clip_start = start or 0
+            clip_end = end if end is not None else duration
+            if duration and clip_start >= duration:
+                raise DownloadError(f"El inicio del clip ({format_seconds(clip_start)}s) supera la duración del video ({duration}s)")
+            if duration and clip_end > duration:
+                clip_end = duration
+
+            # yt-dlp solo pide los fragmentos/rangos de bytes del tramo. Si el
+            # resultado se copia sin recodificar el corte cae en keyframes; si ya
+            # hay que recodificar, se fuerza un corte exacto.
+            ydl_opts['download_ranges'] = download_range_func(None, [(clip_start, clip_end or float('inf'))])
+            ydl_opts['force_keyframes_at_cuts'] = (
+                format == 'mp4' and bool(selection['chain']) and selection['chain'][0]['cost'] == 'transcode'
+            )
+            clip_suffix = f"{format_seconds(clip_start)}-{format_seconds(clip_end) if clip_end else 'fin'}"
+            clean_title = f"{clean_title}_{clip_suffix}"
+            print(f"Descargando solo el tramo {clip_suffix}")
+
+        if info.get('formats'):
+            print("Formatos disponibles:")
+            video_formats = [fmt for fmt in info.get('formats') if fmt.get('vcodec') != 'none' and fmt.get('height')]
+            for fmt in video_formats[:10]:
+                height = fmt.get('height', 'N/A')
+                format_id = fmt.get('format_id', 'N/A')
+                ext = fmt.get('ext', 'N/A')
+                filesize = fmt.get('filesize', 'N/A')
+                print(f"  ID: {format_id}, Ext: {ext}, Height: {height}, Size: {filesize}")
+
+        video_id = canonical_video_id(clean_url)
+        use_sources = source_cache and bool(video_id) and start is None and end is None and sources.enabled()
+        if use_sources:
+            selection = {**selection, 'chain': sources.prefer_cached(video_id, selection['chain'])}
+
+        # Con el formato elegido ya no hacen falta los metadatos durante la descarga
+        del info
+
+        ydl_opts['outtmpl'] = output_template(output_path, clean_title)
+
+        # yt-dlp informa de la ruta final tras cada postprocesador (merge, conversión,
+        # extracción de audio); así no hay que adivinarla buscando en el directorio
+        final_paths = []
+        # Bytes y segundos de red, y segundos de postprocesado, para calibrar /estimate
+        transfer = {'bytes': 0, 'current': 0, 'seconds': 0.0, 'postprocess': 0.0, 'pp_started': None}
+
+        def check_cancelled():
+            if cancel is not None and cancel.cancelled:
+                raise DownloadCancelled(cancel.reason)
+
+        def progress_hook(d):
+            if d['status'] == 'finished':
+                transfer['bytes'] += d.get('total_bytes') or d.get('downloaded_bytes') or 0
+                transfer['current'] = 0
+                transfer['seconds'] += d.get('elapsed') or 0
+            else:
+                transfer['current'] = d.get('downloaded_bytes') or 0
+            check_cancelled()
+
+        def postprocessor_hook(d):
+            if d['status'] == 'started':
+                check_cancelled()
+                transfer['pp_started'] = time.monotonic()
+            elif d['status'] == 'finished':
+                if transfer['pp_started'] is not None:
+                    transfer['postprocess'] += time.monotonic() - transfer['pp_started']
+                    transfer['pp_started'] = None
+                if d['info_dict'].get('filepath'):
+                    final_paths.append(d['info_dict']['filepath'])
+
+        ydl_opts['progress_hooks'] = [progress_hook]
+        ydl_opts['postprocessor_hooks'] = [postprocessor_hook]
+
+        # Cada reintento usa el mismo outtmpl, así yt-dlp reanuda los .part ya
+        # descargados. Si falla el formato en sí (403, no disponible) se pasa al
+        # siguiente de la cadena.
+        chain = list(selection['chain'])
+
+        def fetch_stream(stream_id, extracted):
+            # Solo el stream, sin postprocesado: las variantes se generan después desde la caché
+            def fetch(directory):
+                fetch_opts = {
+                    **base_opts,
+                    'extractaudio': False,
+                    'format': stream_id,
+                    'outtmpl': os.path.join(directory, 'source.%(ext)s'),
+                    'progress_hooks': [progress_hook],
+                }
+                with yt_dlp.YoutubeDL(fetch_opts) as ydl_fetch:
+                    print(f"Descargando el stream {stream_id} a la caché de origen")
+                    if 'info' not in extracted:
+                        # Una sola extracción para todos los streams de la alternativa
+                        raw = ydl_fetch.extract_info(clean_url, download=False, process=False)
+                        extracted['info'] = download_info(raw, [extracted['format_id']])
+                        del raw
+                    # process_ie_result modifica el dict: cada stream procesa su copia
+                    result = ydl_fetch.process_ie_result(copy.deepcopy(extracted['info']), download=True)
+                filepath = resolve_output_path(result, [])
+                if not filepath:
+                    raise DownloadError(f"yt-dlp no informó del stream {stream_id} descargado")
+                return filepath
+            return fetch
+
+        def derive_from_sources(entry):
+            extracted = {'format_id': entry['format_id']}
+            with ExitStack() as stack:
+                paths = [
+                    stack.enter_context(sources.open_source(video_id, stream_id, fetch_stream(stream_id, extracted)))
+                    for stream_id in entry['format_id'].split('+')
+                ]
+                check_cancelled()
+                transfer['pp_started'] = time.monotonic()
+                filepath = sources.derive(format, quality, entry, paths, os.path.join(output_path, clean_title))
+                transfer['postprocess'] += time.monotonic() - transfer['pp_started']
+                transfer['pp_started'] = None
+            return filepath
+
+        def attempt_download(attempt):
+            ydl_opts['format'] = '/'.join([entry['format_id'] for entry in chain] + [selection['fallback']])
+            final_paths.clear()
+            transfer.update(bytes=0, current=0, seconds=0.0, postprocess=0.0, pp_started=None)
+            if use_sources and chain:
+                return derive_from_sources(chain[0]), attempt
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl_download:
+                print(f"Intentando descargar con formato: {ydl_opts['format']} (intento {attempt})")
+                result = extract_for_download(ydl_download, clean_url, [entry['format_id'] for entry in chain])
+
+            filepath = resolve_output_path(result, final_paths)
+            del result
+            if not filepath:
+                raise DownloadError(f"yt-dlp no informó del archivo descargado en {output_path}")
+            return filepath, attempt
+
+        def next_format(error_class, policy):
+            if policy.next_format and chain:
+                dropped = chain.pop(0)
+                metrics.incr('download_format_fallbacks_total')
+                print(f"Descartando el formato {dropped['format_id']} tras un error {error_class}")
+
+        if cancel is not None:
+            # ffmpeg (merge, conversión, clips) no pasa por los hooks: se mata por su ruta de salida
+            marker = os.path.basename(os.path.normpath(output_path))
+            cancel.add_callback(lambda: kill_child_processes(marker))
+            if cancel.cancelled:
+                raise DownloadCancelledError(f"Descarga cancelada: {cancel.reason}")
+
+        try:
+            filepath, attempts = run_with_retry(
+                attempt_download, on_retry=next_format, cancel=cancel,
+                policies=SOURCE_RETRY_POLICIES if use_sources else RETRY_POLICIES,
+            )
+        except RetryError as e:
+            if e.error_class == 'cancelled':
+                stage = 'postprocess' if transfer['pp_started'] is not None else 'download'
+                expected = chain[0]['filesize'] if chain and chain[0].get('filesize') else 0
+                bytes_saved = max(0, expected - transfer['bytes'] - transfer['current'])
+                metrics.incr('downloads_cancelled_total', stage=stage)
+                metrics.incr('download_bytes_saved_total', bytes_saved)
+                print(f"Descarga cancelada durante {stage} ({cancel.reason}); ~{bytes_saved} bytes sin descargar")
+                raise DownloadCancelledError(f"Descarga cancelada: {cancel.reason}", bytes_saved) from e.error
+            raise DownloadError(str(e), e.error_class) from e.error
+
+        selection = {**selection, 'chain': chain, 'attempts': attempts}
+        record_throughput(transfer['bytes'], transfer['seconds'])
+        record_postprocess(
+            postprocess_profile(format, selection),
+            transfer['postprocess'],
+            clip_seconds(duration, start, end),
+            chain[0].get('height') if chain else None,
+        )
+
+        filename = os.path.basename(filepath)
+        print(f"Archivo final: {filepath}")
+        return filepath, filename, selection
+
+    except DownloadError:
+        raise
+    except Exception as e:
+        print(f"Error en download_video: {str(e)}")
+        traceback.print_exc()
+        raise DownloadError(str(e), classify_error(e)) from e
@@ -0,0 +1,154 @@
+"""Estimación previa del coste de una descarga.
+
+A partir de los metadatos en caché y de la cadena de formatos que se
+elegiría, predice los bytes del resultado, el tiempo de descarga con el
+rendimiento medido en las últimas descargas, los segundos de CPU del
+postprocesado y la espera en cola.
+
+El modelo se calibra solo: el motor informa del rendimiento de cada descarga
+y de la duración de cada postprocesado, y ambas cifras se suavizan con una
+media móvil exponencial.
+"""
+
+import os
+import threading
+
+from .formats import AUDIO_QUALITY_KBPS, estimate_filesize
+
+# Rendimiento supuesto hasta que se mida la primera descarga (bytes/s)
+DEFAULT_THROUGHPUT = float(os.environ.get("ESTIMATE_DEFAULT_THROUGHPUT", str(5 * 1024 * 1024)))
+ESTIMATE_ALPHA = 0.2
+
+# Segundos de CPU por segundo de contenido para cada perfil de postprocesado.
+# 'transcode' está referido a 1080p y se escala por el número de píxeles.
+DEFAULT_TRANSCODE_FACTORS = {
+    'native': 0.0,
+    'remux': 0.01,
+    'mp3': 0.05,
+    'transcode': 0.6,
+}
+REFERENCE_PIXELS = 1920 * 1080
+
+# Las respuestas más grandes llevan un aviso para que el cliente lo confirme
+LARGE_DOWNLOAD_BYTES = int(os.environ.get("LARGE_DOWNLOAD_MB", "1024")) * 1024 * 1024
+
+_state = {
+    'throughput': DEFAULT_THROUGHPUT,
+    'throughput_samples': 0,
+    'factors': dict(DEFAULT_TRANSCODE_FACTORS),
+    'factor_samples': {profile: 0 for profile in DEFAULT_TRANSCODE_FACTORS},
+}
+_lock = threading.Lock()
+
+
+def record_throughput(nbytes: int, seconds: float):
+    """Registra el rendimiento de una descarga terminada"""
+    if not nbytes or not seconds or seconds <= 0:
+        return
+    with _lock:
+        _state['throughput'] += ESTIMATE_ALPHA * (nbytes / seconds - _state['throughput'])
+        _state['throughput_samples'] += 1
+
+
+def transcode_scale(profile: str, height) -> float:
+    if profile == 'transcode' and height:
+        return (height * height * 16 / 9) / REFERENCE_PIXELS
+    return 1.0
+
+
+def record_postprocess(profile: str, seconds: float, media_seconds: float, height=None):
+    """Registra cuánto tardó un postprocesado para recalibrar su factor"""
+    if profile not in DEFAULT_TRANSCODE_FACTORS or not media_seconds or seconds < 0:
+        return
+    factor = seconds / media_seconds / transcode_scale(profile, height)
+    with _lock:
+        _state['factors'][profile] += ESTIMATE_ALPHA * (factor - _state['factors'][profile])
+        _state['factor_samples'][profile] += 1
+
+
+def postprocess_profile(format: str, selection: dict) -> str:
+    """Perfil de postprocesado de una descarga según su formato y la cadena elegida"""
+    if format == 'mp3':
+        return 'mp3'
+    if selection['chain']:
+        return selection['chain'][0]['cost']
+    # Solo queda el selector estático: en mp4 puede acabar en una recodificación
+    return 'transcode' if format == 'mp4' else 'native'
+
+
+def clip_seconds(duration, start=None, end=None):
+    """Segundos de contenido que se procesarán (el clip si se pidió uno)"""
+    if not duration:
+        return None
+    clip_start = min(start or 0, duration)
+    clip_end = min(end, duration) if end is not None else duration
+    return max(0.0, clip_end - clip_start)
+
+
+def estimate_download(info, format: str, selection: dict, start=None, end=None, queue_wait: float = 0.0) -> dict:
+    """Predice bytes, tiempo de descarga, CPU de postprocesado y espera en cola"""
+    duration = info.get('duration')
+    media_seconds = clip_seconds(duration, start, end)
+    fraction = media_seconds / duration if duration and media_seconds is not None else 1.0
+
+    entry = selection['chain'][0] if selection['chain'] else None
+    source_bytes = entry['filesize'] if entry else None
+    if source_bytes is None and entry:
+        formats = {str(fmt.get('format_id')): fmt for fmt in info.get('formats') or []}
+        parts = [formats.get(part) for part in entry['format_id'].split('+')]
+        sizes = [estimate_filesize(part, duration) for part in parts if part]
+        source_bytes = sum(sizes) if sizes and None not in sizes else None
+    download_bytes = int(source_bytes * fraction) if source_bytes else None
+
+    if format == 'mp3' and media_seconds:
+        output_bytes = int(AUDIO_QUALITY_KBPS[selection['quality']] * 125 * media_seconds)
+    else:
+        output_bytes = download_bytes
+
+    with _lock:
+        throughput = _state['throughput']
+        factors = dict(_state['factors'])
+        calibrated = _state['throughput_samples'] > 0
+
+    profile = postprocess_profile(format, selection)
+    height = entry.get('height') if entry else None
+    cpu_seconds = None
+    if media_seconds is not None:
+        cpu_seconds = factors[profile] * media_seconds * transcode_scale(profile, height)
+
+    download_seconds = download_bytes / throughput if download_bytes else None
+    total = None
+    if download_seconds is not None and cpu_seconds is not None:
+        total = queue_wait + download_seconds + cpu_seconds
+
+    warnings = []
+    if output_bytes and output_bytes >= LARGE_DOWNLOAD_BYTES:
+        warnings.append(f"El archivo resultante rondará los {output_bytes / (1024 * 1024):.0f} MB")
+    if download_bytes is None:
+        warnings.append("No se conoce el tamaño de los formatos: la estimación es incompleta")
+
+    return {
+        'quality': selection['quality'],
+        'format_id': entry['format_id'] if entry else selection['fallback'],
+        'profile': profile,
+        'media_seconds': media_seconds,
+        'download_bytes': download_bytes,
+        'output_bytes': output_bytes,
+        'throughput_bytes_per_second': round(throughput),
+        'throughput_measured': calibrated,
+        'download_seconds': round(download_seconds, 1) if download_seconds is not None else None,
+        'transcode_cpu_seconds': round(cpu_seconds, 1) if cpu_seconds is not None else None,
+        'queue_wait_seconds': round(queue_wait, 1),
+        'total_seconds': round(total, 1) if total is not None else None,
+        'warnings': warnings,
+    }
+
+
+def model_snapshot() -> dict:
+    with _lock:
+        return {
+            'throughput_bytes_per_second': round(_state['throughput']),
+            'throughput_samples': _state['throughput_samples'],
+            'transcode_factors': {profile: round(value, 4) for profile, value in _state['factors'].items()},
+            'factor_samples': dict(_state['factor_samples']),
+        }
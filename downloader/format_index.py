@@ -0,0 +1,107 @@
+"""Índice compacto de formatos por video.
+
+El índice se calcula una sola vez al guardar el info dict en la caché de
+metadatos: filas como tuplas ya ordenadas (vídeo por altura, audio por
+bitrate). Cada /inspect solo filtra, proyecta y pagina esas filas.
+"""
+
+VIDEO_FIELDS = ('format_id', 'ext', 'resolution', 'height', 'width', 'fps', 'vcodec', 'filesize', 'tbr', 'vbr')
+AUDIO_FIELDS = ('format_id', 'ext', 'acodec', 'abr', 'asr', 'filesize')
+
+# Campos que devuelve /inspect si no se pide una proyección
+DEFAULT_VIDEO_FIELDS = ('format_id', 'ext', 'resolution', 'height', 'fps', 'filesize', 'tbr', 'vbr')
+DEFAULT_AUDIO_FIELDS = AUDIO_FIELDS
+
+_VIDEO_POS = {name: position for position, name in enumerate(VIDEO_FIELDS)}
+_AUDIO_POS = {name: position for position, name in enumerate(AUDIO_FIELDS)}
+
+
+def build_format_index(info: dict) -> dict:
+    video = []
+    audio = []
+    for fmt in info.get('formats') or []:
+        if fmt.get('vcodec') != 'none':
+            video.append((
+                fmt.get('format_id'),
+                fmt.get('ext'),
+                f"{fmt.get('width', '?')}x{fmt.get('height', '?')}",
+                fmt.get('height'),
+                fmt.get('width'),
+                fmt.get('fps'),
+                fmt.get('vcodec'),
+                fmt.get('filesize'),
+                fmt.get('tbr'),
+                fmt.get('vbr'),
+            ))
+        elif fmt.get('acodec') != 'none':
+            audio.append((
+                fmt.get('format_id'),
+                fmt.get('ext'),
+                fmt.get('acodec'),
+                fmt.get('abr'),
+                fmt.get('asr'),
+                fmt.get('filesize'),
+            ))
+
+    video.sort(key=lambda row: row[_VIDEO_POS['height']] or 0, reverse=True)
+    audio.sort(key=lambda row: row[_AUDIO_POS['abr']] or 0, reverse=True)
+    return {'video': tuple(video), 'audio': tuple(audio)}
+
+
+def parse_fields(value, allowed, default) -> tuple:
+    """Acepta una lista o un texto separado por comas; lanza ValueError si hay campos desconocidos"""
+    if not value:
+        return default
+
+    if not isinstance(value, (str, list, tuple)) or not all(isinstance(field, str) for field in value):
+        raise ValueError("los campos deben ser un texto separado por comas o una lista de textos")
+    fields = value.split(',') if isinstance(value, str) else list(value)
+    fields = tuple(field.strip() for field in fields if field and field.strip())
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Campos no válidos: {', '.join(unknown)}. Disponibles: {', '.join(allowed)}")
+    return fields or default
+
+
+def parse_text_filter(value, name: str) -> str | None:
+    """Filtro de texto opcional (ext, vcodec...); lanza ValueError si no es un texto"""
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{name} debe ser un texto")
+    return value
+
+
+def _project(rows, positions, fields, compact):
+    if compact:
+        return [[row[position] for position in positions] for row in rows]
+    return [dict(zip(fields, [row[position] for position in positions])) for row in rows]
+
+
+def query_video_formats(index: dict, fields=DEFAULT_VIDEO_FIELDS, min_height=None, ext=None, vcodec=None,
+                        offset: int = 0, limit: int | None = None, compact: bool = False) -> tuple:
+    """Filtra, pagina y proyecta los formatos de vídeo. Devuelve (filas, total tras filtrar)"""
+    rows = index['video']
+    if min_height:
+        height = _VIDEO_POS['height']
+        rows = [row for row in rows if (row[height] or 0) >= min_height]
+    if ext:
+        position = _VIDEO_POS['ext']
+        rows = [row for row in rows if row[position] == ext]
+    if vcodec:
+        # Coincidencia por prefijo: 'avc1' encaja con 'avc1.640028'
+        position = _VIDEO_POS['vcodec']
+        prefix = vcodec.lower()
+        rows = [row for row in rows if (row[position] or '').lower().startswith(prefix)]
+
+    total = len(rows)
+    page = rows[offset:offset + limit if limit is not None else None]
+    return _project(page, [_VIDEO_POS[field] for field in fields], fields, compact), total
+
+
+def query_audio_formats(index: dict, fields=DEFAULT_AUDIO_FIELDS, ext=None, compact: bool = False) -> list:
+    rows = index['audio']
+    if ext:
+        position = _AUDIO_POS['ext']
+        rows = [row for row in rows if row[position] == ext]
+    return _project(rows, [_AUDIO_POS[field] for field in fields], fields, compact)
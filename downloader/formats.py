@@ -0,0 +1,370 @@
+"""Motor de selección de formatos a partir de los metadatos de yt-dlp.
+
+En lugar de selectores estáticos (`137/271/400/...`) se puntúan las entradas de
+`info['formats']` para elegir, dentro de la calidad pedida, la opción que menos
+bytes descarga y menos CPU gasta en ffmpeg. Todas las funciones trabajan sobre
+diccionarios planos, así que se pueden probar con info dicts grabados
+(tests/fixtures/formats/).
+
+VIDEO_CODEC_PREFERENCE ordena los códecs de vídeo entre alternativas de igual
+altura y coste: por defecto H.264 primero porque lo reproduce cualquier
+cliente, aunque AV1 o VP9 pesen menos. "av01,vp09,avc1" prima los bytes para
+clientes modernos; vacío deja solo el criterio de tamaño.
+"""
+
+import os
+
+VIDEO_QUALITY_HEIGHTS = {
+    '720p': 720,
+    '1080p': 1080,
+    '1440p': 1440,
+    '2160p': 2160,
+}
+
+DEFAULT_VIDEO_QUALITY = '1080p'
+
+AUDIO_QUALITY_KBPS = {
+    'low': 96,
+    'medium': 128,
+    'high': 192,
+    'highest': 320,
+}
+
+DEFAULT_AUDIO_QUALITY = 'high'
+
+# Contenedores de audio que se sirven tal cual los entrega YouTube
+AUDIO_CONTENT_TYPES = {
+    'm4a': 'audio/mp4',
+    'webm': 'audio/webm',
+    'mp3': 'audio/mpeg',
+}
+
+# Orden por defecto del modo de audio nativo: m4a es el que más clientes reproducen
+NATIVE_AUDIO_EXTS = ('m4a', 'webm')
+
+# Tipos MIME del cabecero Accept que acepta cada contenedor nativo
+ACCEPT_AUDIO_TYPES = {
+    'audio/mp4': 'm4a',
+    'audio/m4a': 'm4a',
+    'audio/x-m4a': 'm4a',
+    'audio/aac': 'm4a',
+    'audio/webm': 'webm',
+}
+
+AUDIO_FALLBACK_SELECTOR = 'bestaudio/best'
+
+# Selectores estáticos anteriores: se mantienen como último eslabón de la cadena
+LEGACY_VIDEO_SELECTORS = {
+    '720p': 'best[height<=720][ext=mp4]/136/best[height<=720]',
+    '1080p': 'best[height<=1080][height>=720][ext=mp4]/137/best[height<=1080]',
+    '1440p': 'best[height<=1440][height>=1080][ext=mp4]/271/400/best[height<=1440]',
+    '2160p': 'best[height<=2160][height>=1440][ext=mp4]/313/401/best[height<=2160]',
+}
+
+# Códecs que ffmpeg puede unir en un contenedor MP4 copiando streams
+MP4_VIDEO_CODECS = ('avc1', 'h264', 'hev1', 'hvc1', 'av01', 'vp09', 'vp9')
+MP4_AUDIO_CODECS = ('mp4a', 'aac')
+
+# De más a menos compatible; los códecs que no aparecen van después de todos los listados
+VIDEO_CODEC_PREFERENCE = tuple(
+    codec.strip().lower()
+    for codec in os.environ.get("VIDEO_CODEC_PREFERENCE", "avc1,h264,hvc1,hev1,vp09,vp9,av01").split(',')
+    if codec.strip()
+)
+
+# Coste relativo de CPU de cada forma de obtener el MP4 final
+COST_NATIVE = 0      # el stream ya es un MP4 listo para servir
+COST_REMUX = 1       # unir/remuxear copiando streams
+COST_TRANSCODE = 10  # recodificar con ffmpeg
+
+COST_LABELS = {
+    COST_NATIVE: 'native',
+    COST_REMUX: 'remux',
+    COST_TRANSCODE: 'transcode',
+}
+
+# Bitrate mínimo del audio que acompaña a un stream de solo vídeo
+MIN_VIDEO_AUDIO_KBPS = 128
+
+# Margen aceptado al comparar bitrates declarados (140 anuncia ~129 kbps, no 128)
+ABR_TOLERANCE = 0.9
+
+# Número de alternativas que se prueban antes de caer al selector estático
+MAX_CHAIN = 3
+
+
+def codec_name(value) -> str:
+    """Devuelve el nombre base del códec ('avc1.640028' -> 'avc1')"""
+    return (value or 'none').split('.')[0].lower()
+
+
+def has_video(fmt) -> bool:
+    return codec_name(fmt.get('vcodec')) != 'none' and bool(fmt.get('height'))
+
+
+def has_audio(fmt) -> bool:
+    return codec_name(fmt.get('acodec')) != 'none'
+
+
+def is_audio_only(fmt) -> bool:
+    return codec_name(fmt.get('vcodec')) == 'none' and has_audio(fmt)
+
+
+def audio_bitrate(fmt) -> float:
+    return fmt.get('abr') or fmt.get('tbr') or 0
+
+
+def estimate_filesize(fmt, duration=None):
+    """Estima los bytes de un formato: filesize, filesize_approx o tbr * duración"""
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if size:
+        return int(size)
+
+    tbr = fmt.get('tbr') or ((fmt.get('vbr') or 0) + (fmt.get('abr') or 0))
+    if tbr and duration:
+        # tbr viene en kbit/s: 1000 / 8 = 125 bytes por segundo y kbit
+        return int(tbr * 125 * duration)
+
+    return None
+
+
+def _size_key(size):
+    return size if size is not None else float('inf')
+
+
+def codec_rank(codec: str, preference=None) -> int:
+    """Posición del códec en VIDEO_CODEC_PREFERENCE (los no listados, al final)"""
+    preference = VIDEO_CODEC_PREFERENCE if preference is None else preference
+    return preference.index(codec) if codec in preference else len(preference)
+
+
+def pick_audio(formats, duration=None, min_abr=0, codecs=None):
+    """Elige el stream de audio más ligero que cumple `min_abr`.
+
+    Si se indican `codecs` se prefieren esos códecs; si ningún stream llega al
+    bitrate pedido se devuelve el de mayor bitrate disponible.
+    """
+    audio = [fmt for fmt in formats if is_audio_only(fmt)]
+    if codecs:
+        preferred = [fmt for fmt in audio if codec_name(fmt.get('acodec')) in codecs]
+        audio = preferred or audio
+
+    if not audio:
+        return None
+
+    good_enough = [fmt for fmt in audio if audio_bitrate(fmt) >= min_abr * ABR_TOLERANCE]
+    if good_enough:
+        return min(good_enough, key=lambda fmt: (
+            audio_bitrate(fmt),
+            _size_key(estimate_filesize(fmt, duration)),
+        ))
+
+    return max(audio, key=audio_bitrate)
+
+
+def _progressive_cost(fmt) -> int:
+    # FFmpegVideoConvertor solo se salta la conversión si el archivo ya es MP4
+    return COST_NATIVE if fmt.get('ext') == 'mp4' else COST_TRANSCODE
+
+
+def _candidates(formats, duration, max_height):
+    """Genera las combinaciones posibles (progresivo o vídeo + audio) hasta `max_height`"""
+    audio = pick_audio(formats, duration, MIN_VIDEO_AUDIO_KBPS, MP4_AUDIO_CODECS)
+    audio_size = estimate_filesize(audio, duration) if audio else None
+
+    for fmt in formats:
+        if not has_video(fmt) or fmt.get('height') > max_height:
+            continue
+
+        size = estimate_filesize(fmt, duration)
+
+        if has_audio(fmt):
+            yield {
+                'format_id': str(fmt.get('format_id')),
+                'height': fmt.get('height'),
+                'ext': fmt.get('ext'),
+                'vcodec': codec_name(fmt.get('vcodec')),
+                'acodec': codec_name(fmt.get('acodec')),
+                'filesize': size,
+                'cost': _progressive_cost(fmt),
+            }
+        elif audio is not None:
+            compatible = (
+                codec_name(fmt.get('vcodec')) in MP4_VIDEO_CODECS
+                and codec_name(audio.get('acodec')) in MP4_AUDIO_CODECS
+            )
+            yield {
+                'format_id': f"{fmt.get('format_id')}+{audio.get('format_id')}",
+                'height': fmt.get('height'),
+                'ext': 'mp4',
+                'vcodec': codec_name(fmt.get('vcodec')),
+                'acodec': codec_name(audio.get('acodec')),
+                'filesize': size + audio_size if size is not None and audio_size is not None else None,
+                'cost': COST_REMUX if compatible else COST_TRANSCODE,
+            }
+
+
+def describe_candidate(candidate) -> str:
+    """Texto legible de por qué una alternativa ocupa su posición en la cadena"""
+    size = candidate['filesize']
+    size_text = f"~{size / (1024 * 1024):.1f} MB" if size else "tamaño desconocido"
+    work = {
+        COST_NATIVE: "MP4 nativo, sin procesar",
+        COST_REMUX: "copia de streams a MP4, sin recodificar",
+        COST_TRANSCODE: "requiere recodificar a MP4",
+    }[candidate['cost']]
+    return (
+        f"{candidate['format_id']}: {candidate['height']}p "
+        f"{candidate['vcodec']}+{candidate['acodec']}, {size_text}, {work}"
+    )
+
+
+def select_video_format(info, quality: str, codec_preference=None) -> dict:
+    """Construye la cadena de formatos para una calidad de vídeo.
+
+    Orden: mayor altura que no supere la calidad pedida, después menor coste
+    de CPU (nativo < remux < recodificar), después el códec más compatible
+    (`codec_preference`, por defecto VIDEO_CODEC_PREFERENCE) y por último
+    menos bytes estimados. El selector estático de siempre cierra la cadena
+    como último recurso.
+    """
+    if quality not in VIDEO_QUALITY_HEIGHTS:
+        quality = DEFAULT_VIDEO_QUALITY
+
+    max_height = VIDEO_QUALITY_HEIGHTS[quality]
+    duration = info.get('duration')
+    formats = info.get('formats') or []
+
+    ranked = sorted(
+        _candidates(formats, duration, max_height),
+        key=lambda c: (
+            -c['height'], c['cost'], codec_rank(c['vcodec'], codec_preference), _size_key(c['filesize'])
+        ),
+    )
+
+    chain = []
+    seen = set()
+    for candidate in ranked:
+        if candidate['format_id'] in seen:
+            continue
+        seen.add(candidate['format_id'])
+        chain.append({
+            **candidate,
+            'cost': COST_LABELS[candidate['cost']],
+            'reason': describe_candidate(candidate),
+        })
+        if len(chain) == MAX_CHAIN:
+            break
+
+    legacy = LEGACY_VIDEO_SELECTORS[quality]
+    explanation = [entry['reason'] for entry in chain]
+    explanation.append(f"selector estático de respaldo: {legacy}")
+
+    return {
+        'quality': quality,
+        'format': '/'.join([entry['format_id'] for entry in chain] + [legacy]),
+        'chain': chain,
+        'fallback': legacy,
+        'explanation': explanation,
+    }
+
+
+def negotiate_audio_exts(accept) -> list:
+    """Traduce el cabecero Accept a la lista ordenada de contenedores nativos aceptables.
+
+    Sin cabecero (o con `audio/*`, `*/*`) se usa el orden por defecto; una lista
+    vacía significa que el cliente no acepta ningún audio nativo.
+    """
+    if not accept:
+        return list(NATIVE_AUDIO_EXTS)
+
+    weighted = []
+    for position, part in enumerate(accept.split(',')):
+        media_type, _, params = part.strip().partition(';')
+        media_type = media_type.strip().lower()
+        weight = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+
+        if weight <= 0:
+            continue
+
+        if media_type in ('*/*', 'audio/*'):
+            exts = NATIVE_AUDIO_EXTS
+        elif media_type in ACCEPT_AUDIO_TYPES:
+            exts = (ACCEPT_AUDIO_TYPES[media_type],)
+        else:
+            continue
+
+        for ext in exts:
+            weighted.append((-weight, position, ext))
+
+    result = []
+    for _, _, ext in sorted(weighted):
+        if ext not in result:
+            result.append(ext)
+    return result
+
+
+def select_audio_format(info, quality: str, exts=None) -> dict:
+    """Construye la cadena de streams de audio para una calidad.
+
+    Sin `exts` (salida MP3) cualquier stream vale porque se recodifica igual y se
+    elige el de menor bitrate que alcanza la calidad pedida. Con `exts` (modo
+    nativo) solo entran esos contenedores, en el orden indicado, y el stream se
+    entrega sin recodificar.
+    """
+    if quality not in AUDIO_QUALITY_KBPS:
+        quality = DEFAULT_AUDIO_QUALITY
+
+    min_abr = AUDIO_QUALITY_KBPS[quality]
+    duration = info.get('duration')
+    audio = [fmt for fmt in info.get('formats') or [] if is_audio_only(fmt)]
+    if exts:
+        audio = [fmt for fmt in audio if fmt.get('ext') in exts]
+
+    def rank(fmt):
+        preference = exts.index(fmt.get('ext')) if exts else 0
+        size = _size_key(estimate_filesize(fmt, duration))
+        # Los que cumplen van primero, del más ligero al más pesado; el resto, del mejor al peor
+        if audio_bitrate(fmt) >= min_abr * ABR_TOLERANCE:
+            return (0, preference, audio_bitrate(fmt), size)
+        return (1, -audio_bitrate(fmt), preference, size)
+
+    chain = []
+    for fmt in sorted(audio, key=rank)[:MAX_CHAIN]:
+        size = estimate_filesize(fmt, duration)
+        size_text = f"~{size / (1024 * 1024):.1f} MB" if size else "tamaño desconocido"
+        chain.append({
+            'format_id': str(fmt.get('format_id')),
+            'ext': fmt.get('ext'),
+            'acodec': codec_name(fmt.get('acodec')),
+            'abr': audio_bitrate(fmt),
+            'filesize': size,
+            'cost': 'native' if exts else 'transcode',
+            'reason': (
+                f"{fmt.get('format_id')}: {fmt.get('ext')} {codec_name(fmt.get('acodec'))} "
+                f"{audio_bitrate(fmt):.0f} kbps, {size_text}"
+            ),
+        })
+
+    if exts:
+        fallback = '/'.join(f'bestaudio[ext={ext}]' for ext in exts)
+    else:
+        fallback = AUDIO_FALLBACK_SELECTOR
+
+    explanation = [entry['reason'] for entry in chain]
+    explanation.append(f"selector estático de respaldo: {fallback}")
+
+    return {
+        'quality': quality,
+        'format': '/'.join([entry['format_id'] for entry in chain] + [fallback]),
+        'chain': chain,
+        'fallback': fallback,
+        'explanation': explanation,
+    }
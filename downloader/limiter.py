@@ -0,0 +1,100 @@
+"""Límite de descargas simultáneas con cola de espera.
+
+Cada descarga ocupa un hueco mientras trabajan yt-dlp y ffmpeg. El límite se
+puede cambiar en caliente y el limitador mide cuánto tarda de media cada
+trabajo, lo que permite estimar la espera de uno nuevo.
+"""
+
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+
+MAX_CONCURRENT_DOWNLOADS = int(os.environ.get("MAX_CONCURRENT_DOWNLOADS", "4"))
+
+# Peso de cada nueva muestra en la media móvil exponencial del tiempo de servicio
+SERVICE_TIME_ALPHA = 0.2
+DEFAULT_SERVICE_TIME = 30.0
+
+
+class DownloadLimiter:
+    def __init__(self, limit: int = MAX_CONCURRENT_DOWNLOADS):
+        self.limit = max(1, limit)
+        self.active = 0
+        self.waiting = 0
+        self.service_time = DEFAULT_SERVICE_TIME
+        self.completed = 0
+        self._condition = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Se crea dentro del event loop que la usa, no al importar el módulo
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def set_limit(self, limit: int):
+        """Cambia el número de huecos; las descargas en curso no se interrumpen"""
+        condition = self._get_condition()
+        async with condition:
+            self.limit = max(1, limit)
+            condition.notify_all()
+
+    def free_slots(self) -> int:
+        return max(0, self.limit - self.active)
+
+    def expected_wait(self) -> float:
+        """Segundos que esperaría un trabajo que llegase ahora a la cola"""
+        ahead = self.active + self.waiting - self.limit + 1
+        if ahead <= 0:
+            return 0.0
+        # Cada tanda de `limit` trabajos por delante tarda un tiempo de servicio medio
+        return math.ceil(ahead / self.limit) * self.service_time
+
+    def record_service_time(self, seconds: float):
+        self.completed += 1
+        self.service_time += SERVICE_TIME_ALPHA * (seconds - self.service_time)
+
+    async def acquire(self):
+        """Espera un hueco libre. Si se cancela mientras espera no ocupa ninguno"""
+        condition = self._get_condition()
+        async with condition:
+            self.waiting += 1
+            try:
+                await condition.wait_for(lambda: self.active < self.limit)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+
+    async def release(self, started: float | None = None):
+        """Libera un hueco; con `started` (time.monotonic al ocuparlo) cuenta su tiempo de servicio"""
+        if started is not None:
+            self.record_service_time(time.monotonic() - started)
+        condition = self._get_condition()
+        async with condition:
+            self.active -= 1
+            # notify() despertaría a uno solo: si su cliente se va antes de que corra, en
+            # Python < 3.13 el aviso se pierde y el hueco queda libre con gente esperando.
+            # wait_for vuelve a comprobar el predicado, así que solo entra uno
+            condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            await self.release(started)
+
+    def snapshot(self) -> dict:
+        return {
+            'limit': self.limit,
+            'active': self.active,
+            'waiting': self.waiting,
+            'service_time': round(self.service_time, 2),
+            'completed': self.completed,
+        }
+
+
+download_limiter = DownloadLimiter()
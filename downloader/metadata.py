@@ -0,0 +1,254 @@
+"""Caché de metadatos de videos y sidecars en disco.
+
+`get_video_info` evita repetir `extract_info` entre /inspect y /download, y cada
+info dict deja en disco un sidecar compacto (título, duración, miniaturas,
+capítulos) que usan las miniaturas sin volver a consultar YouTube.
+
+El info dict completo solo vive mientras se construyen el sidecar, el índice
+de formatos y el registro compacto (records.py); la caché guarda esos tres.
+Varias peticiones a la vez por la misma URL hacen una sola extracción.
+
+Los directorios `CACHE_DIR/videos/<id>/` (sidecar y miniaturas) ocupan como
+mucho METADATA_DISK_MAX_MB: al pasarse se borran los que hace más tiempo que
+no se usan (LRU por mtime del directorio, que sobrevive a los reinicios).
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import metrics
+from .format_index import build_format_index
+from .records import compact_info
+
+CACHE_DIR = Path(os.environ.get("CACHE_DIR", "cache"))
+METADATA_TTL = int(os.environ.get("METADATA_TTL", 1800))
+METADATA_CACHE_SIZE = int(os.environ.get("METADATA_CACHE_SIZE", 256))
+METADATA_DISK_MAX_MB = int(os.environ.get("METADATA_DISK_MAX_MB", 256))
+
+INFO_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'nocheckcertificate': False,
+    'noplaylist': True,
+}
+
+_cache = OrderedDict()  # url -> (expira, VideoRecord, índice de formatos, sidecar)
+_key_locks = {}  # url -> [Lock, hilos que la extraen o esperan]; se borra al quedar libre
+_lock = threading.Lock()
+
+_disk_index = None  # id seguro -> bytes del directorio, del menos al más recientemente usado
+_disk_lock = threading.Lock()
+
+
+def safe_video_id(video_id: str) -> str:
+    """Convierte un id de video en un nombre de directorio seguro"""
+    return re.sub(r'[^A-Za-z0-9_-]', '_', str(video_id))[:64] or 'video'
+
+
+def video_dir(video_id: str) -> Path:
+    return CACHE_DIR / 'videos' / safe_video_id(video_id)
+
+
+def _cached(clean_url: str) -> tuple | None:
+    with _lock:
+        entry = _cache.get(clean_url)
+        if entry and entry[0] > time.monotonic():
+            _cache.move_to_end(clean_url)
+            return entry
+    return None
+
+
+@contextmanager
+def _key_lock(clean_url: str):
+    with _lock:
+        entry = _key_locks.setdefault(clean_url, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _key_locks[clean_url]
+
+
+def _get_entry(clean_url: str) -> tuple:
+    entry = _cached(clean_url)
+    if entry:
+        return entry
+
+    with _key_lock(clean_url):
+        # Quien esperaba el lock encuentra la extracción del que lo tenía
+        entry = _cached(clean_url)
+        if entry:
+            return entry
+
+        import yt_dlp
+
+        with yt_dlp.YoutubeDL(INFO_OPTS) as ydl:
+            info = ydl.extract_info(clean_url, download=False)
+
+        try:
+            sidecar = write_sidecar(info)
+        except OSError as e:
+            print(f"No se pudo escribir el sidecar de {info.get('id')}: {e}")
+            sidecar = build_sidecar(info)
+
+        entry = (time.monotonic() + METADATA_TTL, compact_info(info), build_format_index(info), sidecar)
+        del info
+        with _lock:
+            _cache[clean_url] = entry
+            _cache.move_to_end(clean_url)
+            while len(_cache) > METADATA_CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    return entry
+
+
+def get_video_info(clean_url: str):
+    """Devuelve el registro compacto de un video, usando la caché en memoria si sigue vigente"""
+    return _get_entry(clean_url)[1]
+
+
+def get_inspection(clean_url: str) -> tuple:
+    """Devuelve (registro del video, índice compacto de formatos, sidecar) de la misma entrada de caché"""
+    return _get_entry(clean_url)[1:]
+
+
+def build_sidecar(info: dict) -> dict:
+    """Extrae del info dict los metadatos que necesita la vista previa"""
+    thumbnails = [
+        {
+            'id': str(thumb.get('id')),
+            'url': thumb['url'],
+            'width': thumb.get('width'),
+            'height': thumb.get('height'),
+        }
+        for thumb in info.get('thumbnails') or []
+        if thumb.get('url')
+    ]
+
+    chapters = [
+        {
+            'title': chapter.get('title'),
+            'start_time': chapter.get('start_time'),
+            'end_time': chapter.get('end_time'),
+        }
+        for chapter in info.get('chapters') or []
+    ]
+
+    return {
+        'id': info.get('id'),
+        'title': info.get('title', ''),
+        'duration': info.get('duration', 0),
+        'uploader': info.get('uploader'),
+        'webpage_url': info.get('webpage_url'),
+        'thumbnail': info.get('thumbnail'),
+        'thumbnails': thumbnails,
+        'chapters': chapters,
+        'fetched_at': int(time.time()),
+    }
+
+
+def write_sidecar(info: dict) -> dict:
+    sidecar = build_sidecar(info)
+    if not sidecar['id']:
+        return sidecar
+
+    directory = video_dir(sidecar['id'])
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = directory / 'info.json.tmp'
+    tmp_path.write_text(json.dumps(sidecar, ensure_ascii=False))
+    os.replace(tmp_path, directory / 'info.json')
+    record_video_dir(sidecar['id'])
+    return sidecar
+
+
+def read_sidecar(video_id: str) -> dict | None:
+    try:
+        return json.loads((video_dir(video_id) / 'info.json').read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _directory_size(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.iterdir() if path.is_file())
+
+
+def _load_disk_index() -> OrderedDict:
+    """Reconstruye el índice de directorios de video desde disco la primera vez"""
+    global _disk_index
+    if _disk_index is not None:
+        return _disk_index
+
+    entries = []
+    root = CACHE_DIR / 'videos'
+    if root.exists():
+        for directory in root.iterdir():
+            try:
+                entries.append((directory.stat().st_mtime, directory.name, _directory_size(directory)))
+            except OSError:
+                continue
+
+    _disk_index = OrderedDict((name, size) for _, name, size in sorted(entries))
+    return _disk_index
+
+
+def touch_video(video_id: str):
+    """Marca el directorio del video como recién usado para que no sea el próximo en expulsarse"""
+    name = safe_video_id(video_id)
+    with _disk_lock:
+        index = _load_disk_index()
+        if name in index:
+            index.move_to_end(name)
+    try:
+        os.utime(video_dir(video_id))
+    except OSError:
+        pass
+
+
+def record_video_dir(video_id: str):
+    """Anota el tamaño del directorio tras escribir en él y expulsa los menos usados si se pasa del límite"""
+    name = safe_video_id(video_id)
+    try:
+        size = _directory_size(video_dir(video_id))
+    except OSError:
+        return
+
+    limit = METADATA_DISK_MAX_MB * 1024 * 1024
+    evicted = []
+    with _disk_lock:
+        index = _load_disk_index()
+        index[name] = size
+        index.move_to_end(name)
+        total = sum(index.values())
+        for old_name in list(index):
+            if total <= limit:
+                break
+            if old_name == name:
+                continue
+            total -= index.pop(old_name)
+            evicted.append(old_name)
+
+    for old_name in evicted:
+        shutil.rmtree(CACHE_DIR / 'videos' / old_name, ignore_errors=True)
+    if evicted:
+        metrics.incr('metadata_disk_evictions_total', len(evicted))
+
+
+def disk_snapshot() -> dict:
+    with _disk_lock:
+        index = _load_disk_index()
+        return {
+            'videos': len(index),
+            'size_mb': round(sum(index.values()) / (1024 * 1024), 1),
+            'max_mb': METADATA_DISK_MAX_MB,
+        }
@@ -0,0 +1,40 @@
+"""Contadores del proceso, expuestos en /metrics con formato de texto de Prometheus"""
+
+import threading
+from collections import defaultdict
+
+_counters = defaultdict(float)
+_lock = threading.Lock()
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+def incr(name: str, amount: float = 1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += amount
+
+
+def get(name: str, **labels) -> float:
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+def snapshot() -> dict:
+    """Copia de los contadores como {'nombre{etiqueta="valor"}': valor}"""
+    with _lock:
+        items = list(_counters.items())
+
+    result = {}
+    for (name, labels), value in sorted(items):
+        label_text = ','.join(f'{key}="{val}"' for key, val in labels)
+        result[f"{name}{{{label_text}}}" if label_text else name] = value
+    return result
+
+
+def render_prometheus() -> str:
+    lines = []
+    for series, value in snapshot().items():
+        lines.append(f"{series} {value:g}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,89 @@
+"""Caché de resultados negativos por id de video.
+
+Cuando un video falla por una causa que no va a cambiar en segundos (privado,
+eliminado, bloqueado por región) o el origen nos está limitando, se recuerda
+el fallo durante un TTL que depende de la clase de error (retry.py). Mientras
+dure, /inspect y /download devuelven el mismo error sin llamar a YouTube.
+
+Las clases 'format' y 'unknown' no se guardan: dependen del formato pedido o
+pueden ser un fallo propio.
+
+Cada video guarda una entrada por clase de error, así un fallo de red de 15 s
+no pisa un 'unavailable' de 15 minutos. Si hay varias vigentes, `lookup`
+devuelve la de la clase más grave (el orden de NEGATIVE_TTLS).
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from . import metrics
+
+NEGATIVE_CACHE_ENABLED = os.environ.get("NEGATIVE_CACHE", "1") == "1"
+NEGATIVE_CACHE_SIZE = int(os.environ.get("NEGATIVE_CACHE_SIZE", "4096"))
+
+# Segundos que se recuerda cada clase de error, de la más grave a la menos
+NEGATIVE_TTLS = {
+    'unavailable': int(os.environ.get("NEGATIVE_TTL_UNAVAILABLE", "900")),
+    'throttled': int(os.environ.get("NEGATIVE_TTL_THROTTLED", "60")),
+    'forbidden': int(os.environ.get("NEGATIVE_TTL_FORBIDDEN", "60")),
+    'network': int(os.environ.get("NEGATIVE_TTL_NETWORK", "15")),
+}
+
+_entries = OrderedDict()  # (id de video, clase de error) -> (expira, código HTTP, mensaje del error)
+_lock = threading.Lock()
+
+
+def lookup(video_id: str) -> dict | None:
+    """Fallo vigente de un video, o None. Cada acierto es una llamada a YouTube que se evita"""
+    if not NEGATIVE_CACHE_ENABLED or not video_id:
+        return None
+
+    now = time.monotonic()
+    with _lock:
+        for error_class in NEGATIVE_TTLS:
+            key = (video_id, error_class)
+            entry = _entries.get(key)
+            if entry is None:
+                continue
+            if entry[0] <= now:
+                del _entries[key]
+                continue
+            _entries.move_to_end(key)
+            break
+        else:
+            return None
+
+    expires, status_code, detail = entry
+    metrics.incr('negative_cache_hits_total', error_class=error_class)
+    return {
+        'error_class': error_class,
+        'status_code': status_code,
+        'detail': detail,
+        'retry_after': max(1, math.ceil(expires - now)),
+    }
+
+
+def remember(video_id: str, error_class: str, status_code: int, detail: str):
+    ttl = NEGATIVE_TTLS.get(error_class)
+    if not NEGATIVE_CACHE_ENABLED or not video_id or not ttl:
+        return
+
+    with _lock:
+        key = (video_id, error_class)
+        _entries[key] = (time.monotonic() + ttl, status_code, detail)
+        _entries.move_to_end(key)
+        while len(_entries) > NEGATIVE_CACHE_SIZE:
+            _entries.popitem(last=False)
+    metrics.incr('negative_cache_stores_total', error_class=error_class)
+
+
+def headers(hit: dict) -> dict:
+    """Cabeceras de una respuesta servida desde la caché negativa"""
+    return {
+        "Retry-After": str(hit['retry_after']),
+        "X-Negative-Cache": "hit",
+        "X-Error-Class": hit['error_class'],
+    }
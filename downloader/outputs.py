@@ -0,0 +1,210 @@
+"""Caché en disco de archivos ya generados.
+
+Cada resultado de /download (o del pre-cargado) se guarda en
+`CACHE_DIR/outputs/<clave>/` junto a un `meta.json` con el nombre de archivo y
+la cadena de formatos usada. La clave sale del id canónico del video y de todo
+lo que cambia el resultado: formato, calidad, contenedores de audio aceptados
+y tramo del clip.
+
+El tamaño total se limita a OUTPUT_CACHE_MAX_MB expulsando primero los
+archivos que hace más tiempo que no se sirven (LRU; el orden sobrevive a los
+reinicios porque cada acierto actualiza el mtime de `meta.json`).
+OUTPUT_CACHE_MAX_MB=0 desactiva la caché. Los streams de origen (sources.py)
+siguen a sus archivos: un acierto los refresca y, al expulsar el último
+archivo de un video, se borran.
+
+Como en sources.py, `lookup` (y `store` con `pin=True`) fijan la entrada
+hasta `release`: mientras se envía el archivo ningún `store` concurrente lo
+expulsa.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+from . import metrics, sources
+from .metadata import CACHE_DIR
+
+OUTPUT_CACHE_DIR = CACHE_DIR / 'outputs'
+OUTPUT_CACHE_MAX_MB = int(os.environ.get("OUTPUT_CACHE_MAX_MB", "2048"))
+
+_index = None  # clave -> (bytes, id de video), del menos al más recientemente usado
+_pins = {}  # clave -> respuestas enviando el archivo
+_lock = threading.Lock()
+
+
+def output_key(video_id: str, format: str, quality: str, audio_exts=None, start=None, end=None) -> str:
+    exts = ','.join(audio_exts) if format == 'audio' and audio_exts else ''
+    parts = [video_id, format, quality, exts, f"{start:g}" if start is not None else '', f"{end:g}" if end is not None else '']
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:20]
+
+
+def _load_index() -> OrderedDict:
+    """Reconstruye el índice desde disco la primera vez (ordenado por último uso)"""
+    global _index
+    if _index is not None:
+        return _index
+
+    entries = []
+    if OUTPUT_CACHE_DIR.exists():
+        for directory in OUTPUT_CACHE_DIR.iterdir():
+            meta_path = directory / 'meta.json'
+            if directory.name.startswith('.'):
+                # Directorio de preparación de una ejecución anterior
+                shutil.rmtree(directory, ignore_errors=True)
+                continue
+            try:
+                meta = json.loads(meta_path.read_text())
+                size = (directory / meta['filename']).stat().st_size
+                entries.append((meta_path.stat().st_mtime, directory.name, size, meta.get('video_id')))
+            except (OSError, ValueError, KeyError):
+                # Restos de una escritura a medias
+                shutil.rmtree(directory, ignore_errors=True)
+
+    _index = OrderedDict((key, (size, video_id)) for _, key, size, video_id in sorted(entries))
+    return _index
+
+
+def contains(key: str) -> bool:
+    """Como lookup pero sin contar acierto ni refrescar el LRU (para el pre-cargado)"""
+    if not OUTPUT_CACHE_MAX_MB:
+        return False
+    with _lock:
+        return key in _load_index()
+
+
+def lookup(key: str) -> dict | None:
+    """Archivo en caché para la clave: {'path', 'filename', 'selection'} o None.
+
+    Un acierto queda fijado: hay que llamar a `release(key)` al terminar de enviarlo.
+    """
+    if not OUTPUT_CACHE_MAX_MB:
+        return None
+
+    with _lock:
+        index = _load_index()
+        if key not in index:
+            metrics.incr('output_cache_misses_total')
+            return None
+        index.move_to_end(key)
+        _pins[key] = _pins.get(key, 0) + 1
+
+    directory = OUTPUT_CACHE_DIR / key
+    try:
+        meta = json.loads((directory / 'meta.json').read_text())
+        path = directory / meta['filename']
+        if not path.exists():
+            raise OSError(f"falta {path}")
+        os.utime(directory / 'meta.json')
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Entrada de caché de salida rota ({key}): {e}")
+        release(key)
+        with _lock:
+            _load_index().pop(key, None)
+        shutil.rmtree(directory, ignore_errors=True)
+        metrics.incr('output_cache_misses_total')
+        return None
+
+    metrics.incr('output_cache_hits_total')
+    if meta.get('video_id'):
+        sources.touch(meta['video_id'])
+    return {'path': str(path), 'filename': meta['filename'], 'selection': meta['selection']}
+
+
+def release(key: str):
+    """Suelta una entrada fijada por `lookup` o `store`"""
+    with _lock:
+        _pins[key] -= 1
+        if not _pins[key]:
+            del _pins[key]
+
+
+def store(key: str, filepath: str, filename: str, selection: dict, video_id: str | None = None,
+          pin: bool = False) -> str:
+    """Mueve un resultado recién generado a la caché y devuelve su nueva ruta.
+
+    Sin caché (o si el archivo no cabe) devuelve la ruta original sin tocarla.
+    Con `pin` la entrada devuelta queda fijada hasta `release(key)`; si se
+    devolvió la ruta original no hay nada que soltar.
+    """
+    size = os.path.getsize(filepath)
+    limit = OUTPUT_CACHE_MAX_MB * 1024 * 1024
+    if not limit or size > limit:
+        return filepath
+
+    with _lock:
+        # El índice se carga antes de crear el directorio de preparación, que no debe entrar en él
+        _load_index()
+
+    directory = OUTPUT_CACHE_DIR / key
+    staging = OUTPUT_CACHE_DIR / f".{key}.{os.getpid()}.{threading.get_ident()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    shutil.move(filepath, staging / filename)
+    meta = {
+        'filename': filename,
+        'video_id': video_id,
+        'selection': {
+            'chain': [{'format_id': entry['format_id']} for entry in selection['chain']],
+            'fallback': selection['fallback'],
+        },
+        'size': size,
+        'created_at': int(time.time()),
+    }
+    (staging / 'meta.json').write_text(json.dumps(meta, ensure_ascii=False))
+
+    with _lock:
+        index = _load_index()
+        if key in index:
+            # Otro trabajo generó lo mismo a la vez: se queda el que ya estaba
+            shutil.rmtree(staging, ignore_errors=True)
+            index.move_to_end(key)
+            if pin:
+                _pins[key] = _pins.get(key, 0) + 1
+            existing = json.loads((directory / 'meta.json').read_text())
+            return str(directory / existing['filename'])
+
+        os.replace(staging, directory)
+        index[key] = (size, video_id)
+        if pin:
+            _pins[key] = _pins.get(key, 0) + 1
+        evicted = _evict(index, limit, keep=key)
+        remaining = {entry[1] for entry in index.values()}
+
+    for old_key, old_video_id in evicted:
+        shutil.rmtree(OUTPUT_CACHE_DIR / old_key, ignore_errors=True)
+        if old_video_id and old_video_id not in remaining:
+            sources.drop_video(old_video_id)
+    metrics.incr('output_cache_stores_total')
+    return str(directory / filename)
+
+
+def _evict(index: OrderedDict, limit: int, keep: str) -> list:
+    evicted = []
+    total = sum(size for size, _ in index.values())
+    for old_key in list(index):
+        if total <= limit:
+            break
+        if old_key == keep or old_key in _pins:
+            continue
+        size, video_id = index.pop(old_key)
+        total -= size
+        evicted.append((old_key, video_id))
+    if evicted:
+        metrics.incr('output_cache_evictions_total', len(evicted))
+    return evicted
+
+
+def snapshot() -> dict:
+    with _lock:
+        index = _load_index() if OUTPUT_CACHE_MAX_MB else {}
+        return {
+            'entries': len(index),
+            'size_mb': round(sum(size for size, _ in index.values()) / (1024 * 1024), 1),
+            'max_mb': OUTPUT_CACHE_MAX_MB,
+            'in_use': len(_pins),
+        }
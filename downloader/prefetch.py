@@ -0,0 +1,230 @@
+"""Pre-cargado de videos que se sabe que se van a pedir mucho.
+
+Un administrador encola URLs con las combinaciones de formato y calidad que se
+esperan (POST /admin/prefetch). Una tarea en segundo plano las procesa solo:
+
+- dentro de la ventana PREFETCH_WINDOW ("HH:MM-HH:MM", hora local; vacía = siempre),
+  salvo que el lote se haya encolado con `run_now`
+- cuando el limitador tiene huecos libres y nadie esperando, y la instancia no
+  está sobrecargada; cada trabajo ocupa un hueco como una descarga normal
+- de uno en uno, en un hilo propio con prioridad PREFETCH_NICE (los ffmpeg que
+  lance la heredan), para no competir con las descargas de los usuarios
+
+Cada trabajo pasa por preflight (lo que deja los metadatos en caché) y, si se
+pidió un formato, genera el archivo y lo guarda en la caché de salida
+(outputs.py). En hora punta esas peticiones a /download son aciertos de caché.
+Un elemento sin formato solo calienta los metadatos.
+"""
+
+import asyncio
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from . import metadata, metrics, outputs, sources
+from .cancel import CancelToken
+from .engine import download_video
+from .formats import AUDIO_QUALITY_KBPS, VIDEO_QUALITY_HEIGHTS, negotiate_audio_exts
+from .preflight import preflight
+from .urls import canonical_video_id
+from .watchdog import WATCHDOG_STATE
+
+# Vacío: sin token los endpoints de administración están desactivados
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+PREFETCH_WINDOW = os.environ.get("PREFETCH_WINDOW", "")
+PREFETCH_NICE = int(os.environ.get("PREFETCH_NICE", "10"))
+PREFETCH_INTERVAL = float(os.environ.get("PREFETCH_INTERVAL", "5"))
+PREFETCH_QUEUE_SIZE = int(os.environ.get("PREFETCH_QUEUE_SIZE", "1000"))
+
+PREFETCH_STATE = {
+    'queued': 0,
+    'running': None,
+    'done': 0,
+    'cached': 0,
+    'failed': 0,
+    'last_error': None,
+    'window': PREFETCH_WINDOW or None,
+}
+
+_queue = deque()
+_queued_keys = set()
+_lock = threading.Lock()
+_wakeup = None
+_current_cancel = None
+
+
+def _lower_priority():
+    # En Linux la prioridad es por hilo: solo afecta a este worker y a sus procesos hijos
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICE)
+    except (AttributeError, OSError) as e:
+        print(f"No se pudo bajar la prioridad del pre-cargado: {e}")
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch", initializer=_lower_priority)
+
+
+def parse_window(window: str) -> tuple | None:
+    """'02:00-06:30' -> (120, 390) en minutos desde medianoche; vacío -> None"""
+    if not window:
+        return None
+    start, _, end = window.partition('-')
+    try:
+        start_h, start_m = (int(part) for part in start.strip().split(':'))
+        end_h, end_m = (int(part) for part in end.strip().split(':'))
+    except ValueError:
+        raise ValueError(f"PREFETCH_WINDOW no válida: {window!r} (usa HH:MM-HH:MM)")
+    return start_h * 60 + start_m, end_h * 60 + end_m
+
+
+_window = parse_window(PREFETCH_WINDOW)
+
+
+def in_window(now: datetime | None = None) -> bool:
+    if _window is None:
+        return True
+    now = now or datetime.now()
+    minute = now.hour * 60 + now.minute
+    start, end = _window
+    if start <= end:
+        return start <= minute < end
+    # La ventana cruza la medianoche (p. ej. 23:00-05:00)
+    return minute >= start or minute < end
+
+
+def validate_target(format: str | None, quality: str):
+    if format is None:
+        return
+    if format not in ('mp3', 'mp4', 'audio'):
+        raise ValueError(f"Formato no válido: {format}. Usa 'mp3', 'mp4' o 'audio'")
+    qualities = VIDEO_QUALITY_HEIGHTS if format == 'mp4' else AUDIO_QUALITY_KBPS
+    if quality not in qualities:
+        raise ValueError(f"Calidad no válida para {format}: {quality}")
+
+
+def enqueue(urls: list, targets: list, run_now: bool = False) -> dict:
+    """Encola cada URL con cada (formato, calidad); sin targets solo se calientan los metadatos"""
+    for target in targets:
+        validate_target(target['format'], target['quality'])
+
+    added = duplicates = 0
+    with _lock:
+        for url in urls:
+            for target in targets or [{'format': None, 'quality': ''}]:
+                key = (url.strip(), target['format'], target['quality'])
+                if key in _queued_keys:
+                    duplicates += 1
+                    continue
+                if len(_queue) >= PREFETCH_QUEUE_SIZE:
+                    raise OverflowError(f"Cola de pre-cargado llena ({PREFETCH_QUEUE_SIZE})")
+                _queued_keys.add(key)
+                _queue.append({'url': key[0], 'format': key[1], 'quality': key[2], 'run_now': run_now})
+                added += 1
+        PREFETCH_STATE['queued'] = len(_queue)
+
+    if _wakeup is not None:
+        _wakeup.set()
+    return {'added': added, 'duplicates': duplicates, 'queued': PREFETCH_STATE['queued']}
+
+
+def _next_item(force_only: bool) -> dict | None:
+    with _lock:
+        for item in _queue:
+            if not force_only or item['run_now']:
+                _queue.remove(item)
+                _queued_keys.discard((item['url'], item['format'], item['quality']))
+                PREFETCH_STATE['queued'] = len(_queue)
+                return item
+    return None
+
+
+def run_job(item: dict, temp_dir, cancel: CancelToken) -> str:
+    """Calienta metadatos y, si hay formato, la caché de salida. Devuelve 'done' o 'cached'"""
+    format, quality = item['format'], item['quality']
+    audio_exts = negotiate_audio_exts(None) if format == 'audio' else None
+    # Ya generado: ni siquiera hacen falta los metadatos (sin id válido, preflight lo rechaza)
+    video_id = canonical_video_id(item['url'])
+    if format is not None and video_id:
+        key = outputs.output_key(video_id, format, quality, audio_exts)
+        if outputs.contains(key):
+            return 'cached'
+
+    # preflight deja los metadatos en caché y aplica las mismas políticas que /download
+    checked = preflight(item['url'], format or 'mp4', quality if format else '1080p', audio_exts)
+    if format is None:
+        return 'done'
+
+    temp_path = temp_dir / f"prefetch-{uuid.uuid4()}"
+    temp_path.mkdir(parents=True, exist_ok=True)
+    try:
+        filepath, filename, selection = download_video(
+            checked['clean_url'], format, quality, str(temp_path), audio_exts, cancel=cancel, source_cache=True
+        )
+        outputs.store(key, filepath, filename, selection, checked['video_id'])
+    finally:
+        shutil.rmtree(temp_path, ignore_errors=True)
+    return 'done'
+
+
+async def run_prefetcher(limiter, temp_dir):
+    global _wakeup, _current_cancel
+    _wakeup = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), PREFETCH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+        # Los usuarios van primero: solo con huecos libres, sin cola y sin sobrecarga
+        while _queue and limiter.free_slots() and not limiter.waiting and WATCHDOG_STATE['status'] != 'overloaded':
+            item = _next_item(force_only=not in_window())
+            if item is None:
+                break
+
+            label = f"{item['url']} ({item['format'] or 'metadatos'} {item['quality']})".strip()
+            PREFETCH_STATE['running'] = label
+            _current_cancel = CancelToken()
+            started = time.monotonic()
+            try:
+                async with limiter.slot():
+                    result = await loop.run_in_executor(_executor, run_job, item, temp_dir, _current_cancel)
+                PREFETCH_STATE[result] += 1
+                metrics.incr('prefetch_jobs_total', result=result)
+                print(f"Pre-cargado {label}: {result} en {time.monotonic() - started:.1f}s")
+            except Exception as e:
+                PREFETCH_STATE['failed'] += 1
+                PREFETCH_STATE['last_error'] = f"{label}: {e}"
+                metrics.incr('prefetch_jobs_total', result='failed')
+                print(f"Error en el pre-cargado de {label}: {e}")
+            finally:
+                PREFETCH_STATE['running'] = None
+                _current_cancel = None
+
+
+def start_prefetcher(limiter, temp_dir) -> asyncio.Task:
+    return asyncio.create_task(run_prefetcher(limiter, temp_dir))
+
+
+def stop_prefetcher(task: asyncio.Task):
+    # Aborta el trabajo en curso (mata su ffmpeg) además de la tarea
+    if _current_cancel is not None:
+        _current_cancel.cancel("el servidor se está apagando")
+    task.cancel()
+
+
+def snapshot() -> dict:
+    with _lock:
+        pending = [
+            {'url': item['url'], 'format': item['format'], 'quality': item['quality']}
+            for item in list(_queue)[:20]
+        ]
+    return {**PREFETCH_STATE, 'in_window': in_window(), 'pending': pending, 'output_cache': outputs.snapshot(), 'source_cache': sources.snapshot(),
+            'metadata_cache': metadata.disk_snapshot()}
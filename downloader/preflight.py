@@ -0,0 +1,114 @@
+"""Comprobaciones previas a una descarga.
+
+Antes de crear el directorio temporal, ocupar un hueco del limitador o lanzar
+ffmpeg se comprueba, de más barato a más caro:
+
+1. que la URL es de un video de YouTube (urls.py, sin red)
+2. la caché negativa: un video que acaba de fallar falla igual sin consultar YouTube
+3. los metadatos, de la caché si están (si no, un extract_info que los deja en
+   caché para la selección de formato de la descarga; yt-dlp vuelve a extraer
+   al descargar porque las URLs firmadas caducan); aquí salen los videos
+   privados, eliminados o bloqueados por región
+4. que no es un directo en curso
+5. las políticas de duración y tamaño (MAX_DURATION_SECONDS, MAX_FILESIZE_MB);
+   con start/end cuenta la duración del clip
+"""
+
+import os
+
+from . import negcache
+from .estimate import clip_seconds, estimate_download
+from .formats import select_audio_format, select_video_format
+from .metadata import get_video_info
+from .retry import classify_error
+from .urls import canonical_url, canonical_video_id
+
+# 0 desactiva el límite
+MAX_DURATION_SECONDS = int(os.environ.get("MAX_DURATION_SECONDS", "0"))
+MAX_FILESIZE_MB = int(os.environ.get("MAX_FILESIZE_MB", "0"))
+
+# Código HTTP según la clase de error de retry.py al pedir los metadatos
+ERROR_STATUS = {
+    'unavailable': 404,
+    'throttled': 503,
+    'forbidden': 502,
+    'network': 502,
+    'format': 400,
+    'unknown': 400,
+}
+
+
+class PreflightError(Exception):
+    """La descarga se rechaza antes de reservar recursos"""
+
+    def __init__(self, status_code: int, detail: str, error_class: str, headers: dict | None = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.error_class = error_class
+        self.headers = headers or {"X-Error-Class": error_class}
+
+
+def policy_violations(media_seconds, estimate: dict) -> list:
+    """Incumplimientos de las políticas como (código HTTP, motivo)"""
+    violations = []
+    if MAX_DURATION_SECONDS and media_seconds and media_seconds > MAX_DURATION_SECONDS:
+        violations.append((422, f"La duración ({media_seconds:.0f}s) supera el máximo permitido ({MAX_DURATION_SECONDS}s)"))
+    size = estimate['output_bytes'] or estimate['download_bytes']
+    if MAX_FILESIZE_MB and size and size > MAX_FILESIZE_MB * 1024 * 1024:
+        violations.append((413, f"El archivo ({size / (1024 * 1024):.0f} MB) supera el máximo permitido ({MAX_FILESIZE_MB} MB)"))
+    return violations
+
+
+def preflight(url: str, format: str, quality: str, audio_exts: list | None = None,
+              start: float | None = None, end: float | None = None, enforce: bool = True) -> dict:
+    """Valida la petición con los metadatos del video; lanza PreflightError si no se puede servir.
+
+    Con `enforce=False` (para /estimate) las políticas no se aplican y sus
+    incumplimientos se devuelven en 'violations'.
+    """
+    video_id = canonical_video_id(url)
+    if not video_id:
+        raise PreflightError(400, "URL de YouTube no válida", 'invalid_url')
+    clean_url = canonical_url(video_id)
+
+    hit = negcache.lookup(video_id)
+    if hit:
+        raise PreflightError(hit['status_code'], f"Video no disponible: {hit['detail']}", hit['error_class'],
+                             negcache.headers(hit))
+
+    try:
+        info = get_video_info(clean_url)
+    except Exception as e:
+        error_class = classify_error(e)
+        status_code = ERROR_STATUS.get(error_class, 400)
+        negcache.remember(video_id, error_class, status_code, str(e))
+        raise PreflightError(status_code, f"Video no disponible: {str(e)}", error_class) from e
+
+    if info.get('live_status') in ('is_live', 'is_upcoming'):
+        raise PreflightError(422, "No se pueden descargar directos en curso ni programados", 'live')
+
+    duration = info.get('duration')
+    if start is not None and duration and start >= duration:
+        raise PreflightError(400, f"El inicio del clip supera la duración del video ({duration}s)", 'invalid_clip')
+
+    if format == 'mp4':
+        selection = select_video_format(info, quality)
+    else:
+        selection = select_audio_format(info, quality, audio_exts)
+
+    media_seconds = clip_seconds(duration, start, end)
+    estimate = estimate_download(info, format, selection, start=start, end=end)
+    violations = policy_violations(media_seconds, estimate)
+    if enforce and violations:
+        status_code, detail = violations[0]
+        raise PreflightError(status_code, detail, 'policy')
+
+    return {
+        'video_id': video_id,
+        'clean_url': clean_url,
+        'info': info,
+        'selection': selection,
+        'estimate': estimate,
+        'violations': [detail for _, detail in violations],
+    }
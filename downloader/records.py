@@ -0,0 +1,100 @@
+"""Registros compactos de los metadatos de un video.
+
+El info dict de yt-dlp trae, por cada formato, URLs firmadas, cabeceras HTTP y
+(en directos grabados y DASH) listas de miles de fragmentos. Para elegir formato
+y estimar costes basta con unos pocos campos, así que la caché de metadatos
+guarda estos registros con `__slots__` en lugar del dict completo.
+
+Los registros exponen `get()` como un dict, de modo que los selectores de
+formats.py funcionan igual con ambos.
+"""
+
+import sys
+from dataclasses import dataclass, fields
+
+
+def _intern(value):
+    # ext y códecs se repiten en cientos de formatos: una sola copia de cada texto
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True, frozen=True)
+class FormatRecord:
+    format_id: str
+    ext: str | None = None
+    vcodec: str | None = None
+    acodec: str | None = None
+    width: int | None = None
+    height: int | None = None
+    fps: float | None = None
+    tbr: float | None = None
+    vbr: float | None = None
+    abr: float | None = None
+    asr: int | None = None
+    filesize: int | None = None
+    filesize_approx: int | None = None
+
+    def get(self, name: str, default=None):
+        """Como dict.get: un campo sin valor se trata como ausente"""
+        value = getattr(self, name, None)
+        return default if value is None else value
+
+    @classmethod
+    def from_dict(cls, fmt: dict) -> 'FormatRecord':
+        return cls(**{
+            name: _intern(fmt.get(name)) for name in FORMAT_FIELDS if name != 'format_id'
+        }, format_id=str(fmt.get('format_id')))
+
+
+FORMAT_FIELDS = tuple(field.name for field in fields(FormatRecord))
+
+
+@dataclass(slots=True, frozen=True)
+class VideoRecord:
+    id: str | None
+    title: str
+    duration: float | None
+    webpage_url: str | None
+    formats: tuple
+    live_status: str | None = None
+
+    def get(self, name: str, default=None):
+        value = getattr(self, name, None)
+        return default if value is None else value
+
+
+def compact_info(info) -> VideoRecord:
+    """Reduce un info dict a lo necesario para seleccionar formato y descargar"""
+    if isinstance(info, VideoRecord):
+        return info
+    return VideoRecord(
+        id=info.get('id'),
+        title=info.get('title', 'video'),
+        duration=info.get('duration'),
+        webpage_url=info.get('webpage_url'),
+        formats=tuple(FormatRecord.from_dict(fmt) for fmt in info.get('formats') or []),
+        live_status=info.get('live_status'),
+    )
+
+
+# Campos grandes del info dict que la descarga no usa
+DOWNLOAD_DROP_FIELDS = ('automatic_captions', 'subtitles', 'thumbnails', 'heatmap', 'description')
+
+
+def download_info(info: dict, format_ids) -> dict:
+    """Copia del info dict sin procesar con solo los formatos que se van a intentar.
+
+    yt-dlp retiene el dict que procesa durante toda la descarga; recortado, lo
+    que queda en memoria son unos pocos formatos en vez de todos con sus URLs
+    firmadas y listas de fragmentos. Sin coincidencias (cadena vacía) se
+    conservan todos los formatos para el selector de respaldo.
+    """
+    if info.get('_type', 'video') != 'video':
+        return info
+
+    wanted = {part for format_id in format_ids for part in format_id.split('+')}
+    trimmed = {key: value for key, value in info.items() if key not in DOWNLOAD_DROP_FIELDS}
+    formats = [fmt for fmt in info.get('formats') or [] if str(fmt.get('format_id')) in wanted]
+    if formats:
+        trimmed['formats'] = formats
+    return trimmed
@@ -0,0 +1,122 @@
+"""Reintentos con backoff exponencial y jitter según la clase de error.
+
+Los fallos transitorios (429, 403 de una URL de formato, timeouts de
+fragmentos) se reintentan en el mismo directorio, así que yt-dlp reanuda
+los `.part` en vez de empezar de cero. Los permanentes (video privado,
+eliminado o bloqueado por región) fallan a la primera.
+"""
+
+import random
+import re
+import time
+from dataclasses import dataclass
+
+from . import metrics
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int          # intentos totales, incluido el primero
+    base_delay: float      # segundos antes del primer reintento
+    max_delay: float
+    next_format: bool = False  # pasar al siguiente formato de la cadena antes de reintentar
+
+
+# El orden importa: se aplica la primera clase cuyo patrón encaja con el mensaje
+ERROR_PATTERNS = (
+    ('unavailable', re.compile(
+        r'private video|video unavailable|has been removed|no longer available|account .* terminated|'
+        r'available in your country|geo.?restrict|copyright|members-only|sign in to confirm your age|'
+        r'is not a valid url|unsupported url|http error 404', re.I)),
+    ('throttled', re.compile(r'http error 429|too many requests|rate.?limit', re.I)),
+    ('forbidden', re.compile(r'http error 403|forbidden', re.I)),
+    ('format', re.compile(r'requested format is not available|no video formats found', re.I)),
+    ('network', re.compile(
+        r'timed? ?out|connection (reset|refused|aborted)|incompleteread|fragment|temporary failure|'
+        r'name resolution|name or service not known|remote end closed|http error 5\d\d|ssl|eof occurred|network is unreachable', re.I)),
+)
+
+RETRY_POLICIES = {
+    'unavailable': RetryPolicy(attempts=1, base_delay=0, max_delay=0),
+    'throttled': RetryPolicy(attempts=4, base_delay=5, max_delay=60),
+    'forbidden': RetryPolicy(attempts=3, base_delay=1, max_delay=10, next_format=True),
+    # El selector de yt-dlp ya prueba toda la cadena ("137/136/best"): repetirlo no cambia nada
+    'format': RetryPolicy(attempts=1, base_delay=0, max_delay=0),
+    'network': RetryPolicy(attempts=5, base_delay=1, max_delay=30),
+    'unknown': RetryPolicy(attempts=2, base_delay=2, max_delay=10),
+}
+
+# Con la caché de origen cada intento baja solo el primer formato de la cadena:
+# si no está disponible se reintenta con el siguiente
+SOURCE_RETRY_POLICIES = {
+    **RETRY_POLICIES,
+    'format': RetryPolicy(attempts=3, base_delay=0, max_delay=0, next_format=True),
+}
+
+
+def classify_error(error: BaseException) -> str:
+    """Clasifica un error de yt-dlp/ffmpeg por su mensaje (y el de su causa)"""
+    messages = [str(error)]
+    exc_info = getattr(error, 'exc_info', None)
+    if exc_info and exc_info[1] is not None:
+        messages.append(str(exc_info[1]))
+    if error.__cause__ is not None:
+        messages.append(str(error.__cause__))
+    text = ' | '.join(messages)
+
+    for error_class, pattern in ERROR_PATTERNS:
+        if pattern.search(text):
+            return error_class
+    return 'unknown'
+
+
+def backoff_delay(policy: RetryPolicy, attempt: int, rng=random) -> float:
+    """Backoff exponencial con jitter: la mitad fija y la otra mitad aleatoria"""
+    ceiling = min(policy.max_delay, policy.base_delay * (2 ** (attempt - 1)))
+    return ceiling / 2 + rng.uniform(0, ceiling / 2)
+
+
+class RetryError(Exception):
+    """Fallo definitivo tras agotar los reintentos de su clase de error"""
+
+    def __init__(self, error: BaseException, error_class: str, attempts: int):
+        super().__init__(str(error))
+        self.error = error
+        self.error_class = error_class
+        self.attempts = attempts
+
+
+def run_with_retry(operation, on_retry=None, sleep=time.sleep, policies=RETRY_POLICIES, cancel=None):
+    """Ejecuta `operation(intento)` reintentando según la política de cada clase de error.
+
+    `on_retry(clase, política)` se llama antes de cada reintento (por ejemplo
+    para avanzar en la cadena de formatos). Lanza RetryError al agotar intentos,
+    o con la clase 'cancelled' si `cancel` (un CancelToken) se cancela.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        metrics.incr('download_attempts_total')
+        try:
+            return operation(attempt)
+        except Exception as e:
+            # Tras cancelar, cualquier error (DownloadCancelled, ffmpeg muerto) es consecuencia
+            if cancel is not None and cancel.cancelled:
+                raise RetryError(e, 'cancelled', attempt) from e
+
+            error_class = classify_error(e)
+            policy = policies.get(error_class, policies['unknown'])
+            if attempt >= policy.attempts:
+                metrics.incr('download_failures_total', error_class=error_class)
+                raise RetryError(e, error_class, attempt) from e
+
+            delay = backoff_delay(policy, attempt)
+            metrics.incr('download_retries_total', error_class=error_class)
+            print(f"Intento {attempt} fallido ({error_class}): {e}. Reintentando en {delay:.1f}s")
+            if on_retry is not None:
+                on_retry(error_class, policy)
+            if cancel is not None:
+                if cancel.wait(delay):
+                    raise RetryError(e, 'cancelled', attempt) from e
+            else:
+                sleep(delay)
@@ -0,0 +1,318 @@
+"""Caché de streams de origen compartidos entre variantes.
+
+El MP3 a 128 kbps, el MP3 a 320 kbps y el MP4 1080p (137+140) de un mismo
+video usan a menudo el mismo stream de audio de YouTube. En vez de bajarlo una
+vez por variante, cada stream se guarda en `CACHE_DIR/sources/<id>/<format_id>.<ext>`
+y las variantes se generan en local: recodificación a MP3 o unión vídeo + audio
+con ffmpeg, o un enlace duro (copia si no se puede) cuando el stream ya es el
+archivo final (audio nativo, MP4 progresivo).
+
+- Clave: (id del video, format_id). Si dos trabajos piden a la vez el mismo
+  stream, el segundo espera a que termine el primero y reutiliza el archivo.
+- Tamaño total limitado por SOURCE_CACHE_MAX_MB (0 desactiva la caché; las
+  descargas vuelven a pasar enteras por yt-dlp). Los streams en uso no se expulsan.
+- La vida de los streams va ligada a la caché de salida (outputs.py): cada
+  acierto de un archivo generado refresca los streams de su video y, cuando
+  la caché de salida expulsa el último archivo de un video, sus streams se borran.
+- Los clips (start/end) no pasan por aquí: solo se descarga el tramo pedido.
+- Solo la usan quienes la piden (`download_video(..., source_cache=True)`: la API
+  y el pre-cargado). La CLI la activa con `--source-cache` dentro de su salida
+  (`configure`).
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import metrics
+from .formats import AUDIO_QUALITY_KBPS, DEFAULT_AUDIO_QUALITY
+from .metadata import CACHE_DIR
+
+SOURCE_CACHE_DIR = CACHE_DIR / 'sources'
+SOURCE_CACHE_MAX_MB = int(os.environ.get("SOURCE_CACHE_MAX_MB", "4096"))
+
+_index = None  # (id de video, format_id) -> (ruta, bytes), del menos al más recientemente usado
+_lock = threading.Lock()
+_key_locks = {}  # clave -> [Lock, trabajos que la usan]
+_pins = {}  # clave -> trabajos generando una variante a partir del stream
+
+
+def configure(directory):
+    """Cambia el directorio de la caché (antes de la primera descarga)"""
+    global SOURCE_CACHE_DIR, _index
+    with _lock:
+        SOURCE_CACHE_DIR = Path(directory)
+        _index = None
+
+
+def enabled() -> bool:
+    # Sin ffmpeg no se pueden generar las variantes en local
+    return SOURCE_CACHE_MAX_MB > 0 and shutil.which('ffmpeg') is not None
+
+
+def _safe(value: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_-]', '_', value)
+
+
+def _load_index() -> OrderedDict:
+    global _index
+    if _index is not None:
+        return _index
+
+    entries = []
+    if SOURCE_CACHE_DIR.exists():
+        for video_dir in SOURCE_CACHE_DIR.iterdir():
+            if video_dir.name.startswith('.'):
+                # Descarga a medias de una ejecución anterior
+                shutil.rmtree(video_dir, ignore_errors=True)
+                continue
+            for path in video_dir.iterdir():
+                stat = path.stat()
+                entries.append((stat.st_mtime, (video_dir.name, path.stem), str(path), stat.st_size))
+
+    _index = OrderedDict((key, (path, size)) for _, key, path, size in sorted(entries))
+    return _index
+
+
+def is_cached(video_id: str, format_id: str) -> bool:
+    with _lock:
+        return (_safe(video_id), _safe(format_id)) in _load_index()
+
+
+def _lookup(key: tuple) -> str | None:
+    with _lock:
+        entry = _load_index().get(key)
+        if entry is None:
+            return None
+        _index.move_to_end(key)
+        _pins[key] = _pins.get(key, 0) + 1
+        return entry
+
+
+def _release(key: tuple):
+    with _lock:
+        _pins[key] -= 1
+        if not _pins[key]:
+            del _pins[key]
+
+
+@contextmanager
+def _key_lock(key: tuple):
+    with _lock:
+        entry = _key_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _key_locks[key]
+
+
+@contextmanager
+def open_source(video_id: str, format_id: str, fetch):
+    """Ruta local del stream, descargándolo con `fetch(directorio)` si no está en caché.
+
+    `fetch` devuelve la ruta del archivo descargado dentro del directorio que
+    recibe. Mientras dure el `with` el stream no se expulsa.
+    """
+    key = (_safe(video_id), _safe(format_id))
+    leftover = None
+    entry = _lookup(key)
+    if entry is None:
+        with _key_lock(key):
+            entry = _lookup(key)
+            if entry is None:
+                metrics.incr('source_cache_misses_total')
+                path, leftover = _fetch(key, fetch)
+            else:
+                # Otro trabajo lo descargó mientras este esperaba
+                metrics.incr('source_cache_coalesced_total')
+    else:
+        metrics.incr('source_cache_hits_total')
+
+    if entry is not None:
+        path, size = entry
+        # Bytes que no se han vuelto a pedir a YouTube
+        metrics.incr('source_cache_bytes_saved_total', size)
+
+    try:
+        yield path
+    finally:
+        if leftover is not None:
+            shutil.rmtree(leftover, ignore_errors=True)
+        else:
+            _release(key)
+
+
+def _fetch(key: tuple, fetch) -> tuple:
+    """Descarga el stream y lo guarda; devuelve (ruta, directorio a borrar al terminar o None)"""
+    video_id, format_id = key
+    staging = SOURCE_CACHE_DIR / f".{video_id}.{format_id}.{uuid.uuid4().hex[:8]}"
+    staging.mkdir(parents=True)
+    try:
+        downloaded = fetch(str(staging))
+        size = os.path.getsize(downloaded)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if size > SOURCE_CACHE_MAX_MB * 1024 * 1024:
+        # No cabe en la caché: se usa desde su directorio y se borra al soltarlo
+        return downloaded, staging
+
+    target = SOURCE_CACHE_DIR / video_id / f"{format_id}{os.path.splitext(downloaded)[1]}"
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(downloaded, target)
+    shutil.rmtree(staging, ignore_errors=True)
+
+    with _lock:
+        index = _load_index()
+        index[key] = (str(target), size)
+        _pins[key] = _pins.get(key, 0) + 1
+        evicted = _evict(index)
+
+    for path in evicted:
+        _remove(path)
+    return str(target), None
+
+
+def _evict(index: OrderedDict) -> list:
+    limit = SOURCE_CACHE_MAX_MB * 1024 * 1024
+    total = sum(size for _, size in index.values())
+    evicted = []
+    for key in list(index):
+        if total <= limit:
+            break
+        if key in _pins:
+            continue
+        path, size = index.pop(key)
+        total -= size
+        evicted.append(path)
+    if evicted:
+        metrics.incr('source_cache_evictions_total', len(evicted))
+    return evicted
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))  # solo si ya no quedan streams del video
+    except OSError:
+        pass
+
+
+def touch(video_id: str):
+    """Marca como recientes los streams de un video cuyo archivo generado se acaba de servir"""
+    video_id = _safe(video_id)
+    with _lock:
+        index = _load_index()
+        for key in [key for key in index if key[0] == video_id]:
+            index.move_to_end(key)
+
+
+def drop_video(video_id: str):
+    """Borra los streams de un video que ya no tiene archivos en la caché de salida"""
+    video_id = _safe(video_id)
+    with _lock:
+        index = _load_index()
+        removed = [index.pop(key)[0] for key in list(index) if key[0] == video_id and key not in _pins]
+    for path in removed:
+        _remove(path)
+    if removed:
+        metrics.incr('source_cache_evictions_total', len(removed))
+
+
+def prefer_cached(video_id: str, chain: list) -> list:
+    """Adelanta en la cadena una alternativa equivalente cuyos streams ya están en caché.
+
+    Equivalente: misma altura en vídeo; en audio, al menos el bitrate de la
+    primera opción (un MP3 a 128 kbps sale igual de un stream de 129 que de uno de 160).
+    """
+    def cached(entry):
+        return all(is_cached(video_id, stream_id) for stream_id in entry['format_id'].split('+'))
+
+    if not chain or cached(chain[0]):
+        return chain
+
+    first = chain[0]
+    for entry in chain[1:]:
+        if 'height' in first and entry.get('height') != first['height']:
+            continue
+        if 'abr' in first and entry.get('abr', 0) < first['abr']:
+            continue
+        if cached(entry):
+            print(f"Usando {entry['format_id']} (ya descargado) en lugar de {first['format_id']}")
+            return [entry] + [other for other in chain if other is not entry]
+    return chain
+
+
+def derive_command(format: str, quality: str, entry: dict, sources: list, output_stem: str) -> tuple:
+    """(comando de ffmpeg, ruta de salida) para generar una variante desde sus streams.
+
+    El comando es None si el stream ya es el archivo final y basta con enlazarlo.
+    """
+    source_ext = os.path.splitext(sources[0])[1]
+    if format == 'audio':
+        # Audio nativo: yt-dlp ya corrigió el contenedor DASH de los m4a al bajar el stream
+        return None, f"{output_stem}{source_ext}"
+    if format == 'mp4' and len(sources) == 1 and source_ext == '.mp4':
+        # MP4 progresivo: un `-c copy` solo reescribiría el mismo archivo
+        return None, f"{output_stem}.mp4"
+
+    command = ['ffmpeg', '-y', '-nostdin', '-loglevel', 'error']
+    for path in sources:
+        command += ['-i', path]
+
+    if format == 'mp3':
+        kbps = AUDIO_QUALITY_KBPS.get(quality, AUDIO_QUALITY_KBPS[DEFAULT_AUDIO_QUALITY])
+        output = f"{output_stem}.mp3"
+        command += ['-vn', '-c:a', 'libmp3lame', '-b:a', f"{kbps}k"]
+    else:
+        output = f"{output_stem}.mp4"
+        if len(sources) > 1:
+            # Como FFmpegMergerPP de yt-dlp: la unión siempre copia los streams, también
+            # vp9/opus (el 'transcode' de formats.py), y FFmpegVideoConvertor se la salta
+            # porque el resultado ya es .mp4
+            command += ['-map', '0:v:0', '-map', '1:a:0', '-c', 'copy']
+        # Un progresivo que no es MP4 se recodifica, igual que con FFmpegVideoConvertor
+
+    return command + [output], output
+
+
+def derive(format: str, quality: str, entry: dict, sources: list, output_stem: str) -> str:
+    command, output = derive_command(format, quality, entry, sources, output_stem)
+    if command is None:
+        print(f"Enlazando {os.path.basename(output)} al stream en caché")
+        try:
+            # Los archivos generados no se modifican: comparten inodo con la caché sin riesgo
+            os.link(sources[0], output)
+        except OSError:
+            shutil.copyfile(sources[0], output)
+        return output
+
+    print(f"Generando {os.path.basename(output)} desde {len(sources)} stream(s) en caché")
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg terminó con código {result.returncode}: {result.stderr.strip()[-500:]}")
+    return output
+
+
+def snapshot() -> dict:
+    with _lock:
+        index = _load_index() if SOURCE_CACHE_MAX_MB else {}
+        return {
+            'streams': len(index),
+            'videos': len({key[0] for key in index}),
+            'size_mb': round(sum(size for _, size in index.values()) / (1024 * 1024), 1),
+            'max_mb': SOURCE_CACHE_MAX_MB,
+            'in_use': len(_pins),
+        }
@@ -0,0 +1,106 @@
+"""Arranque rápido: recursos compartidos que se crean una vez y fase de pre-calentamiento.
+
+yt-dlp, sus extractores y Pillow se importan bajo demanda para que el proceso
+responda a /health cuanto antes. `prewarm` hace ese trabajo por adelantado,
+en segundo plano por defecto, para que la primera descarga no lo pague.
+"""
+
+import functools
+import os
+import shutil
+import ssl
+import time
+
+# 'background' (por defecto), 'blocking' (el servidor no acepta tráfico hasta terminar) u 'off'
+PREWARM_MODE = os.environ.get("PREWARM", "background").lower()
+PREWARM_SELF_TEST = os.environ.get("PREWARM_SELF_TEST", "0") == "1"
+
+PREWARM_STATE = {
+    'status': 'pending',
+    'steps': {},
+    'errors': [],
+}
+
+# Info dict mínimo para probar la selección de formatos sin red
+SELF_TEST_INFO = {
+    'id': 'selftest',
+    'title': 'self test',
+    'duration': 60,
+    'formats': [
+        {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 129.5},
+        {'format_id': '251', 'ext': 'webm', 'vcodec': 'none', 'acodec': 'opus', 'abr': 135},
+        {'format_id': '136', 'ext': 'mp4', 'vcodec': 'avc1.4d401f', 'acodec': 'none', 'height': 720, 'tbr': 1500},
+        {'format_id': '137', 'ext': 'mp4', 'vcodec': 'avc1.640028', 'acodec': 'none', 'height': 1080, 'tbr': 4000},
+    ],
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_ssl_context() -> ssl.SSLContext:
+    """Contexto SSL con los certificados de certifi, creado una sola vez por proceso"""
+    import certifi
+
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def load_extractors():
+    """Importa yt-dlp y resuelve el extractor de YouTube (lo más caro del primer uso)"""
+    import yt_dlp
+
+    with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+        ydl.get_info_extractor('Youtube')
+
+
+def load_imaging():
+    try:
+        from PIL import Image  # noqa: F401
+    except ImportError:
+        PREWARM_STATE['errors'].append("Pillow no está instalado: /thumbnail no funcionará")
+
+
+def self_test(checks=()):
+    """Pruebas sin red de las piezas que usa cada petición"""
+    from .format_index import build_format_index, query_video_formats
+    from .formats import select_audio_format, select_video_format
+
+    selection = select_video_format(SELF_TEST_INFO, '1080p')
+    assert selection['chain'][0]['format_id'] == '137+140', selection['format']
+
+    selection = select_audio_format(SELF_TEST_INFO, 'medium')
+    assert selection['chain'][0]['format_id'] == '140', selection['format']
+
+    rows, total = query_video_formats(build_format_index(SELF_TEST_INFO), ('format_id',), min_height=1080)
+    assert total == 1 and rows[0]['format_id'] == '137', rows
+
+    if not shutil.which('ffmpeg'):
+        PREWARM_STATE['errors'].append("ffmpeg no está en el PATH: mp3/mp4 fallarán al postprocesar")
+
+    for check in checks:
+        check()
+
+
+def prewarm(checks=()):
+    """Ejecuta todas las fases de pre-calentamiento y deja el resultado en PREWARM_STATE"""
+    PREWARM_STATE['status'] = 'running'
+    steps = [
+        ('ssl_context', get_ssl_context),
+        ('extractors', load_extractors),
+        ('imaging', load_imaging),
+    ]
+    if PREWARM_SELF_TEST:
+        steps.append(('self_test', lambda: self_test(checks)))
+
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            PREWARM_STATE['errors'].append(f"{name}: {e}")
+        PREWARM_STATE['steps'][name] = round(time.perf_counter() - started, 3)
+
+    PREWARM_STATE['status'] = 'failed' if any(
+        error.startswith(('extractors', 'self_test')) for error in PREWARM_STATE['errors']
+    ) else 'done'
+    print(f"Pre-calentamiento {PREWARM_STATE['status']}: {PREWARM_STATE['steps']}")
+    for error in PREWARM_STATE['errors']:
+        print(f"  Aviso: {error}")
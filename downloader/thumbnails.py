@@ -0,0 +1,108 @@
+"""Miniaturas de videos: se descargan una vez, se redimensionan y se cachean en disco"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import urllib.request
+from contextlib import contextmanager
+
+from .metadata import get_inspection, read_sidecar, record_video_dir, touch_video, video_dir
+from .startup import get_ssl_context
+
+# Anchos estándar que sirve /thumbnail (el alto mantiene la proporción)
+THUMBNAIL_SIZES = {
+    'small': 160,
+    'medium': 320,
+    'large': 640,
+}
+
+THUMBNAIL_MAX_AGE = int(os.environ.get("THUMBNAIL_MAX_AGE", 86400))
+THUMBNAIL_TIMEOUT = int(os.environ.get("THUMBNAIL_TIMEOUT", 15))
+
+_locks = {}  # id de video -> [Lock, peticiones que lo usan]; se borra al quedar libre
+_locks_guard = threading.Lock()
+
+
+class ThumbnailNotFound(Exception):
+    pass
+
+
+@contextmanager
+def _video_lock(video_id: str):
+    with _locks_guard:
+        entry = _locks.setdefault(video_id, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _locks[video_id]
+
+
+def pick_thumbnail_url(sidecar: dict) -> str | None:
+    """La miniatura de mayor anchura; si no hay anchuras, la principal de yt-dlp"""
+    sized = [thumb for thumb in sidecar.get('thumbnails', []) if thumb.get('width')]
+    if sized:
+        return max(sized, key=lambda thumb: thumb['width'])['url']
+    return sidecar.get('thumbnail')
+
+
+def fetch_bytes(url: str) -> bytes:
+    request = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+    with urllib.request.urlopen(request, timeout=THUMBNAIL_TIMEOUT, context=get_ssl_context()) as response:
+        return response.read()
+
+
+def render_sizes(original: bytes) -> dict:
+    """Genera un JPEG por cada tamaño estándar a partir de la imagen original"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(original)) as image:
+        image = image.convert('RGB')
+        rendered = {}
+        for name, width in THUMBNAIL_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((width, width * 4))
+            buffer = io.BytesIO()
+            resized.save(buffer, format='JPEG', quality=85, optimize=True)
+            rendered[name] = buffer.getvalue()
+        return rendered
+
+
+def get_thumbnail(video_id: str, size: str) -> tuple:
+    """Devuelve (ruta, etag) de una miniatura, generándolas todas la primera vez"""
+    directory = video_dir(video_id)
+    index_path = directory / 'thumbnails.json'
+
+    with _video_lock(video_id):
+        # Recién usado: el límite de disco de metadata.py expulsa antes otros directorios
+        touch_video(video_id)
+        try:
+            etags = json.loads(index_path.read_text())
+        except (OSError, ValueError):
+            etags = None
+
+        if etags is None:
+            sidecar = read_sidecar(video_id)
+            if sidecar is None:
+                # El directorio pudo expulsarse con los metadatos aún en memoria: vale el sidecar de la caché
+                _, _, sidecar = get_inspection(f"https://www.youtube.com/watch?v={video_id}")
+
+            url = pick_thumbnail_url(sidecar)
+            if not url:
+                raise ThumbnailNotFound(f"El video {video_id} no tiene miniaturas")
+
+            directory.mkdir(parents=True, exist_ok=True)
+            etags = {}
+            for name, data in render_sizes(fetch_bytes(url)).items():
+                (directory / f'thumb_{name}.jpg').write_bytes(data)
+                etags[name] = f'"{hashlib.sha1(data).hexdigest()}"'
+            index_path.write_text(json.dumps(etags))
+            record_video_dir(video_id)
+
+    return directory / f'thumb_{size}.jpg', etags[size]
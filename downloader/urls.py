@@ -0,0 +1,64 @@
+"""Normalización de URLs de YouTube a un id de video canónico.
+
+Todas las formas equivalentes de una URL (watch, shorts, embed, live, /v/,
+youtu.be con o sin query, m., music., www., youtube-nocookie, sin esquema)
+se reducen al mismo id de 11 caracteres y a la misma URL canónica. Las claves
+de caché y de deduplicación se derivan de ese resultado, así que dos formas
+de la misma URL comparten caché.
+
+Las expresiones se compilan una vez al importar.
+"""
+
+import re
+
+VIDEO_ID_PATTERN = r'[A-Za-z0-9_-]{11}'
+
+# Host y ruta. Los ids de shorts/embed/live/v, nocookie y youtu.be salen de la ruta;
+# en /watch se busca `v=` aparte dentro de `query`.
+_URL_RE = re.compile(
+    r'^(?:https?:)?(?://)?'
+    r'(?:'
+    r'(?:(?:www|m|music)\.)?youtube\.com/(?:'
+    r'watch/?(?P<query>[?#].*)?'
+    r'|(?:shorts|embed|live|v|e)/(?P<path_id>' + VIDEO_ID_PATTERN + r')(?=$|[/?#&])'
+    r')'
+    r'|(?:www\.)?youtube-nocookie\.com/embed/(?P<nocookie_id>' + VIDEO_ID_PATTERN + r')(?=$|[/?#&])'
+    r'|youtu\.be/(?P<short_id>' + VIDEO_ID_PATTERN + r')(?=$|[/?#&])'
+    r')',
+    re.IGNORECASE,
+)
+# `v=` como parámetro completo (no `xv=`), en la query o en el fragmento
+_V_PARAM_RE = re.compile(r'[?&#]v=(' + VIDEO_ID_PATTERN + r')(?=$|[&#])')
+_VIDEO_ID_RE = re.compile(r'^' + VIDEO_ID_PATTERN + r'$')
+
+CANONICAL_URL_TEMPLATE = "https://www.youtube.com/watch?v={}"
+
+
+def canonical_video_id(url: str) -> str | None:
+    """Id de 11 caracteres del video, o None si la URL no es de un video de YouTube"""
+    if not url:
+        return None
+
+    match = _URL_RE.match(url.strip())
+    if match is None:
+        return None
+
+    video_id = match.group('path_id') or match.group('short_id') or match.group('nocookie_id')
+    if video_id:
+        return video_id
+
+    query = match.group('query')
+    if query:
+        param = _V_PARAM_RE.search(query)
+        if param:
+            return param.group(1)
+    return None
+
+
+def is_video_id(value: str) -> bool:
+    return bool(value) and _VIDEO_ID_RE.match(value) is not None
+
+
+def canonical_url(video_id: str) -> str:
+    return CANONICAL_URL_TEMPLATE.format(video_id)
+
@@ -0,0 +1,186 @@
+"""Vigilante de recursos y control adaptativo de la concurrencia.
+
+Una tarea en segundo plano mide cada WATCHDOG_INTERVAL segundos:
+
+- el lag del event loop (cuánto se retrasa un `asyncio.sleep`)
+- la CPU del proceso y de sus hijos: los terminados (os.times) y los que siguen
+  en marcha (/proc/<pid>/stat), que son los ffmpeg largos
+- la memoria residente (/proc/self/statm)
+- el espacio libre en el disco de TEMP_DIR
+- los procesos ffmpeg hijos en marcha
+
+Si algún valor supera su umbral la instancia se marca como sobrecargada
+(/health/ready responde 503 y el balanceador deja de enviarle tráfico) y el
+límite de descargas simultáneas se reduce a la mitad. Mientras todo va bien y
+hay trabajos esperando, el límite sube de uno en uno hasta el máximo (AIMD).
+"""
+
+import asyncio
+import os
+import shutil
+import time
+from pathlib import Path
+
+from . import metrics
+from .limiter import MAX_CONCURRENT_DOWNLOADS, DownloadLimiter
+
+WATCHDOG_ENABLED = os.environ.get("WATCHDOG", "1") == "1"
+WATCHDOG_INTERVAL = float(os.environ.get("WATCHDOG_INTERVAL", "1.0"))
+
+MAX_LOOP_LAG = float(os.environ.get("WATCHDOG_MAX_LOOP_LAG", "0.1"))
+# Fracción de todos los núcleos
+MAX_CPU = float(os.environ.get("WATCHDOG_MAX_CPU", "0.9"))
+# 0 desactiva el umbral
+MAX_RSS_MB = float(os.environ.get("WATCHDOG_MAX_RSS_MB", "0"))
+MIN_FREE_DISK_MB = float(os.environ.get("WATCHDOG_MIN_FREE_DISK_MB", "0"))
+MAX_FFMPEG = int(os.environ.get("WATCHDOG_MAX_FFMPEG", "0"))
+
+MIN_CONCURRENCY = int(os.environ.get("WATCHDOG_MIN_CONCURRENCY", "1"))
+MAX_CONCURRENCY = int(os.environ.get("WATCHDOG_MAX_CONCURRENCY", str(MAX_CONCURRENT_DOWNLOADS)))
+# Intervalos sin tocar el límite tras una reducción, para que se note su efecto
+DECREASE_COOLDOWN = int(os.environ.get("WATCHDOG_DECREASE_COOLDOWN", "5"))
+# Intervalos seguidos con sobrecarga antes de actuar (un pico aislado no cuenta)
+OVERLOAD_GRACE = int(os.environ.get("WATCHDOG_OVERLOAD_GRACE", "2"))
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+WATCHDOG_STATE = {
+    'status': 'starting' if WATCHDOG_ENABLED else 'off',
+    'reasons': [],
+    'loop_lag': None,
+    'cpu': None,
+    'rss_mb': None,
+    'disk_free_mb': None,
+    'ffmpeg': None,
+    'limit': None,
+    'updated_at': None,
+}
+
+
+def cpu_seconds(live_children: float = 0.0) -> float:
+    # os.times solo suma los hijos ya terminados; los vivos llegan de scan_children
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system + live_children
+
+
+def rss_mb() -> float | None:
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * PAGE_SIZE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def scan_children() -> dict | None:
+    """Hijos vivos de este proceso: cuántos son ffmpeg (los lanza yt-dlp) y su CPU en segundos"""
+    if not os.path.isdir('/proc'):
+        return None
+    pid = os.getpid()
+    ffmpeg = 0
+    cpu_ticks = 0
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as handle:
+                stat = handle.read()
+        except OSError:
+            continue
+        name, _, rest = stat.partition(' (')[2].rpartition(') ')
+        # Campos tras el nombre: estado, ppid, ... utime y stime son el 12.º y el 13.º
+        fields = rest.split()
+        if int(fields[1]) != pid:
+            continue
+        cpu_ticks += int(fields[11]) + int(fields[12])
+        if name.startswith('ffmpeg'):
+            ffmpeg += 1
+    return {'ffmpeg': ffmpeg, 'cpu': cpu_ticks / CLOCK_TICKS}
+
+
+def overload_reasons(sample: dict) -> list:
+    reasons = []
+    if sample['loop_lag'] > MAX_LOOP_LAG:
+        reasons.append(f"lag del event loop {sample['loop_lag'] * 1000:.0f} ms")
+    if sample['cpu'] > MAX_CPU:
+        reasons.append(f"CPU {sample['cpu']:.0%}")
+    if MAX_RSS_MB and sample['rss_mb'] and sample['rss_mb'] > MAX_RSS_MB:
+        reasons.append(f"memoria {sample['rss_mb']:.0f} MB")
+    if sample['disk_free_mb'] is not None and sample['disk_free_mb'] < MIN_FREE_DISK_MB:
+        reasons.append(f"disco libre {sample['disk_free_mb']:.0f} MB")
+    if MAX_FFMPEG and sample['ffmpeg'] and sample['ffmpeg'] > MAX_FFMPEG:
+        reasons.append(f"{sample['ffmpeg']} procesos ffmpeg")
+    return reasons
+
+
+async def run_watchdog(limiter: DownloadLimiter, temp_dir: Path):
+    cpus = os.cpu_count() or 1
+    children = await asyncio.to_thread(scan_children)
+    previous_cpu = cpu_seconds(children['cpu'] if children else 0.0)
+    previous_time = time.monotonic()
+    cooldown = 0
+    overloaded_intervals = 0
+
+    while True:
+        sleep_started = time.monotonic()
+        await asyncio.sleep(WATCHDOG_INTERVAL)
+        try:
+            # Recorrer /proc bloquearía el loop con muchos procesos: va a un hilo
+            children = await asyncio.to_thread(scan_children)
+            now = time.monotonic()
+            elapsed = now - previous_time
+            current_cpu = cpu_seconds(children['cpu'] if children else 0.0)
+
+            try:
+                disk_free_mb = shutil.disk_usage(temp_dir).free / (1024 * 1024)
+            except OSError:
+                disk_free_mb = None
+
+            sample = {
+                'loop_lag': max(0.0, now - sleep_started - WATCHDOG_INTERVAL),
+                'cpu': (current_cpu - previous_cpu) / elapsed / cpus,
+                'rss_mb': rss_mb(),
+                'disk_free_mb': disk_free_mb,
+                'ffmpeg': children['ffmpeg'] if children else None,
+            }
+            previous_cpu, previous_time = current_cpu, now
+
+            reasons = overload_reasons(sample)
+            overloaded_intervals = overloaded_intervals + 1 if reasons else 0
+
+            # AIMD: mitad al sobrecargarse, +1 mientras sobra capacidad y hay cola
+            limit = limiter.limit
+            if cooldown:
+                cooldown -= 1
+            elif overloaded_intervals >= OVERLOAD_GRACE and limit > MIN_CONCURRENCY:
+                limit = max(MIN_CONCURRENCY, limit // 2)
+                cooldown = DECREASE_COOLDOWN
+                metrics.incr('watchdog_limit_decreases_total')
+                print(f"Watchdog: sobrecarga ({', '.join(reasons)}); límite de descargas {limiter.limit} -> {limit}")
+            elif not reasons and limiter.waiting and limit < MAX_CONCURRENCY:
+                limit += 1
+                metrics.incr('watchdog_limit_increases_total')
+
+            if limit != limiter.limit:
+                await limiter.set_limit(limit)
+
+            WATCHDOG_STATE.update(
+                status='overloaded' if overloaded_intervals >= OVERLOAD_GRACE else 'ok',
+                reasons=reasons,
+                loop_lag=round(sample['loop_lag'], 4),
+                cpu=round(sample['cpu'], 3),
+                rss_mb=round(sample['rss_mb'], 1) if sample['rss_mb'] is not None else None,
+                disk_free_mb=round(sample['disk_free_mb']) if sample['disk_free_mb'] is not None else None,
+                ffmpeg=sample['ffmpeg'],
+                limit=limiter.limit,
+                updated_at=time.time(),
+            )
+
+        except Exception as e:
+            # Un fallo midiendo no debe dejar la instancia sin vigilante
+            print(f"Watchdog: error al medir recursos: {e}")
+
+def start_watchdog(limiter: DownloadLimiter, temp_dir: Path) -> asyncio.Task | None:
+    if not WATCHDOG_ENABLED:
+        return None
+    return asyncio.create_task(run_watchdog(limiter, temp_dir))
@@ -0,0 +1,317 @@
+"""Origen falso de YouTube para pruebas de carga.
+
+Sirve, para cualquier id de video:
+
+    /info/<id>.json       metadatos (título, duración, miniatura)
+    /manifest/<id>.mpd    manifiesto DASH con varias representaciones
+    /media/<id>/<rep>     los bytes de cada representación (admite Range)
+    /thumb/<id>.jpg       una miniatura
+
+Cada respuesta espera `latency` segundos antes del primer byte y el cuerpo se
+envía a `bandwidth` bytes/s por conexión, así se puede simular un CDN lento.
+Si hay ffmpeg se generan archivos MP4/M4A reales (el merge y la conversión
+funcionan de verdad); sin ffmpeg se sirven bytes sintéticos del tamaño
+correcto, suficientes para /inspect y para descargas de audio nativo.
+
+Para probar los reintentos, `faults` (solo desde `start_origin`) inyecta fallos
+en /media: `{'forbidden': {'a128'}}` responde 403 a esas representaciones y
+`{'drop_after': {'a128': 100000}}` corta la conexión de la primera respuesta de
+cada representación tras esos bytes, como un CDN que se cae a mitad.
+
+Con `--extra-formats N --fragments M` el extractor añade N formatos DASH de
+relleno con M fragmentos cada uno (como un directo grabado largo), para medir
+la memoria que ocupa un info dict grande; nunca se descargan.
+
+Uso independiente:
+    python loadtest/fake_origin.py --port 8090 --bandwidth 2M --latency 0.05
+"""
+
+import argparse
+import json
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Representaciones del manifiesto: (id, tipo mime, códecs, ancho, alto, kbit/s)
+REPRESENTATIONS = (
+    ('v360', 'video/mp4', 'avc1.4d401e', 640, 360, 700),
+    ('v720', 'video/mp4', 'avc1.4d401f', 1280, 720, 2500),
+    ('v1080', 'video/mp4', 'avc1.640028', 1920, 1080, 4500),
+    ('a128', 'audio/mp4', 'mp4a.40.2', None, None, 128),
+    ('a64', 'audio/mp4', 'mp4a.40.5', None, None, 64),
+)
+DEFAULT_DURATION = 60
+CHUNK_SIZE = 64 * 1024
+# Bloque repetido para los bytes sintéticos (generarlos cuesta CPU al origen, no a la app)
+SYNTHETIC_BLOCK = bytes(range(256)) * (CHUNK_SIZE // 256)
+
+# JPEG válido de 1x1 píxeles
+THUMBNAIL_JPEG = bytes.fromhex(
+    'ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c140d0c0b0b0c1912130f141d'
+    '1a1f1e1d1a1c1c20242e2720222c231c1c2837292c30313434341f27393d38323c2e333432ffc0000b080001000101011100ffc4'
+    '001f0000010501010101010100000000000000000102030405060708090a0bffc400b5100002010303020403050504040000017d'
+    '01020300041105122131410613516107227114328191a1082342b1c11552d1f02433627282090a161718191a25262728292a3435'
+    '363738393a434445464748494a535455565758595a636465666768696a737475767778797a838485868788898a92939495969798'
+    '999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2f3f4'
+    'f5f6f7f8f9faffda0008010100003f00fbd3ffd9'
+)
+
+
+def parse_rate(value: str) -> float:
+    """'2M' -> 2 MB/s, '500k' -> 500 kB/s, '0' -> sin límite"""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([kKmMgG]?)', value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"ancho de banda no válido: {value}")
+    number, unit = match.groups()
+    return float(number) * {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}[unit.lower()]
+
+
+class MediaStore:
+    """Contenido de cada representación: archivo real (ffmpeg) o tamaño sintético"""
+
+    def __init__(self, duration: int, use_ffmpeg: bool | None = None, extra_formats: int = 0, fragments: int = 0):
+        self.duration = duration
+        self.padding = {'formats': extra_formats, 'fragments': fragments}
+        self.use_ffmpeg = shutil.which('ffmpeg') is not None if use_ffmpeg is None else use_ffmpeg
+        self.directory = Path(tempfile.mkdtemp(prefix='fake_origin_'))
+        self._lock = threading.Lock()
+        self._files = {}
+
+    def size(self, rep_id: str) -> int:
+        path = self.path(rep_id)
+        if path:
+            return path.stat().st_size
+        kbps = next(rep[5] for rep in REPRESENTATIONS if rep[0] == rep_id)
+        return int(kbps * 125 * self.duration)
+
+    def path(self, rep_id: str) -> Path | None:
+        """Archivo generado con ffmpeg (el mismo para todos los ids de video)"""
+        if not self.use_ffmpeg:
+            return None
+        with self._lock:
+            if rep_id not in self._files:
+                self._files[rep_id] = self._generate(rep_id)
+            return self._files[rep_id]
+
+    def _generate(self, rep_id: str) -> Path:
+        _, mime, _, width, height, kbps = next(rep for rep in REPRESENTATIONS if rep[0] == rep_id)
+        output = self.directory / f"{rep_id}.{'mp4' if mime.startswith('video') else 'm4a'}"
+        if mime.startswith('video'):
+            source = ['-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate=30', '-c:v', 'libx264',
+                      '-preset', 'ultrafast', '-b:v', f'{kbps}k', '-an']
+        else:
+            source = ['-f', 'lavfi', '-i', 'sine=frequency=440', '-c:a', 'aac', '-b:a', f'{kbps}k', '-vn']
+        subprocess.run(
+            ['ffmpeg', '-y', '-loglevel', 'error', *source, '-t', str(self.duration),
+             '-movflags', '+faststart', str(output)],
+            check=True,
+        )
+        return output
+
+    def read(self, rep_id: str, start: int, end: int):
+        """Genera los bytes [start, end] en bloques"""
+        path = self.path(rep_id)
+        if path:
+            with open(path, 'rb') as handle:
+                handle.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = handle.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        return
+                    remaining -= len(chunk)
+                    yield chunk
+        else:
+            position = start
+            while position <= end:
+                length = min(CHUNK_SIZE, end - position + 1)
+                offset = position % len(SYNTHETIC_BLOCK)
+                yield (SYNTHETIC_BLOCK[offset:] + SYNTHETIC_BLOCK)[:length]
+                position += length
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def build_manifest(origin: str, video_id: str, store: MediaStore) -> str:
+    """MPD estático con una representación de un solo segmento por formato"""
+    adaptation_sets = []
+    for mime in ('video/mp4', 'audio/mp4'):
+        representations = []
+        for rep_id, rep_mime, codecs, width, height, kbps in REPRESENTATIONS:
+            if rep_mime != mime:
+                continue
+            size_attrs = f' width="{width}" height="{height}" frameRate="30"' if width else ' audioSamplingRate="44100"'
+            representations.append(
+                f'      <Representation id="{rep_id}" codecs="{codecs}" bandwidth="{kbps * 1000}"{size_attrs}>\n'
+                f'        <BaseURL>{origin}/media/{video_id}/{rep_id}</BaseURL>\n'
+                f'      </Representation>'
+            )
+        adaptation_sets.append(
+            f'    <AdaptationSet mimeType="{mime}">\n' + '\n'.join(representations) + '\n    </AdaptationSet>'
+        )
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" '
+        f'mediaPresentationDuration="PT{store.duration}S" minBufferTime="PT2S" '
+        'profiles="urn:mpeg:dash:profile:isoff-on-demand:2011">\n'
+        '  <Period>\n' + '\n'.join(adaptation_sets) + '\n  </Period>\n</MPD>\n'
+    )
+
+
+def make_handler(store: MediaStore, bandwidth: float, latency: float, stats: dict, faults: dict | None = None):
+    faults = faults or {}
+    # Cada corte se aplica una sola vez: el reintento reanuda y termina
+    pending_drops = dict(faults.get('drop_after') or {})
+    drops_lock = threading.Lock()
+
+    class FakeOriginHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def origin(self) -> str:
+            return f"http://{self.headers.get('Host') or '127.0.0.1'}"
+
+        def send_body(self, status: int, content_type: str, body: bytes):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def throttled_write(self, chunks):
+            started = time.monotonic()
+            sent = 0
+            for chunk in chunks:
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if bandwidth:
+                    ahead = sent / bandwidth - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+            stats['bytes_sent'] += sent
+
+        def do_GET(self):
+            stats['requests'] += 1
+            if latency:
+                time.sleep(latency)
+
+            if match := re.fullmatch(r'/info/([\w-]+)\.json', self.path):
+                video_id = match.group(1)
+                body = json.dumps({
+                    'id': video_id,
+                    'title': f"Prueba de carga {video_id}",
+                    'duration': store.duration,
+                    'uploader': 'fake-origin',
+                    'thumbnail': f"{self.origin()}/thumb/{video_id}.jpg",
+                    'padding': store.padding,
+                }).encode()
+                return self.send_body(200, 'application/json', body)
+
+            if match := re.fullmatch(r'/manifest/([\w-]+)\.mpd', self.path):
+                body = build_manifest(self.origin(), match.group(1), store).encode()
+                return self.send_body(200, 'application/dash+xml', body)
+
+            if re.fullmatch(r'/thumb/[\w-]+\.jpg', self.path):
+                return self.send_body(200, 'image/jpeg', THUMBNAIL_JPEG)
+
+            if match := re.fullmatch(r'/media/[\w-]+/(\w+)', self.path):
+                rep_id = match.group(1)
+                if rep_id not in {rep[0] for rep in REPRESENTATIONS}:
+                    return self.send_body(404, 'text/plain', b'no existe')
+
+                if rep_id in (faults.get('forbidden') or ()):
+                    stats['media'].append((rep_id, 403, None))
+                    return self.send_body(403, 'text/plain', b'prohibido')
+
+                total = store.size(rep_id)
+                start, end = 0, total - 1
+                range_match = re.fullmatch(r'bytes=(\d*)-(\d*)', self.headers.get('Range') or '')
+                if range_match:
+                    if range_match.group(1):
+                        start = int(range_match.group(1))
+                        end = int(range_match.group(2)) if range_match.group(2) else total - 1
+                    else:
+                        start = max(0, total - int(range_match.group(2)))
+                    end = min(end, total - 1)
+                    if start > end:
+                        self.send_response(416)
+                        self.send_header('Content-Range', f'bytes */{total}')
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+
+                stats['media'].append((rep_id, 206 if range_match else 200, start))
+                with drops_lock:
+                    drop_after = pending_drops.pop(rep_id, None)
+                if drop_after is not None:
+                    end_sent = min(end, start + drop_after - 1)
+                    # Content-Length completo pero el cuerpo se queda a medias
+                    self.close_connection = True
+                else:
+                    end_sent = end
+
+                self.send_response(206 if range_match else 200)
+                self.send_header('Content-Type', 'video/mp4' if rep_id.startswith('v') else 'audio/mp4')
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('Content-Length', str(end - start + 1))
+                if range_match:
+                    self.send_header('Content-Range', f'bytes {start}-{end}/{total}')
+                self.end_headers()
+                try:
+                    self.throttled_write(store.read(rep_id, start, end_sent))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                return
+
+            self.send_body(404, 'text/plain', b'no existe')
+
+    return FakeOriginHandler
+
+
+def start_origin(port: int = 0, bandwidth: float = 0, latency: float = 0, duration: int = DEFAULT_DURATION,
+                 use_ffmpeg: bool | None = None, extra_formats: int = 0, fragments: int = 0, faults: dict | None = None):
+    """Arranca el origen en un hilo; devuelve (servidor, url base, estadísticas)
+
+    `stats['media']` registra cada petición de /media como (representación, estado, byte inicial).
+    """
+    store = MediaStore(duration, use_ffmpeg, extra_formats, fragments)
+    stats = {'requests': 0, 'bytes_sent': 0, 'media': []}
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(store, bandwidth, latency, stats, faults))
+    server.daemon_threads = True
+    server.store = store
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Origen falso de YouTube para pruebas de carga")
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--bandwidth', type=parse_rate, default=parse_rate('0'), help="bytes/s por conexión (0 = sin límite)")
+    parser.add_argument('--latency', type=float, default=0.0, help="segundos antes del primer byte")
+    parser.add_argument('--duration', type=int, default=DEFAULT_DURATION, help="duración de los videos en segundos")
+    parser.add_argument('--extra-formats', type=int, default=0, help="formatos de relleno por video")
+    parser.add_argument('--fragments', type=int, default=0, help="fragmentos de cada formato de relleno")
+    args = parser.parse_args()
+
+    server, origin, _ = start_origin(args.port, args.bandwidth, args.latency, args.duration,
+                                     extra_formats=args.extra_formats, fragments=args.fragments)
+    print(f"Origen falso en {origin} (exporta FAKE_ORIGIN_URL={origin} para la app)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        server.store.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,381 @@
+"""Prueba de carga escalonada contra /inspect y /download.
+
+Arranca el origen falso (fake_origin.py) y una instancia de la app que lo usa
+a través del extractor de `yt_dlp_plugins/`, y después lanza escalones de
+concurrencia creciente. En cada escalón mide:
+
+- latencia y errores de cada endpoint
+- lag del event loop (latencia de /health, que no hace ningún trabajo)
+- CPU y memoria del proceso de la app y sus hijos (ffmpeg), leídos de /proc
+- espacio ocupado en TEMP_DIR y libre en su disco
+
+y marca el primer escalón saturado. El último escalón sano del barrido de
+/download es el valor recomendado para MAX_CONCURRENT_DOWNLOADS.
+
+Uso:
+    python loadtest/run.py --levels 1,2,4,8,16 --step-seconds 20 --bandwidth 4M
+    python loadtest/run.py --target http://localhost:8000 --pid 1234   # instancia ya arrancada
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from fake_origin import DEFAULT_DURATION, parse_rate, start_origin
+
+ROOT = Path(__file__).resolve().parent.parent
+LOADTEST_DIR = Path(__file__).resolve().parent
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+SAMPLE_INTERVAL = 0.5
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def process_tree(pid: int) -> list:
+    """El proceso y sus descendientes directos e indirectos (ffmpeg cuelga del worker)"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as handle:
+                fields = handle.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def read_usage(pid: int) -> tuple[float, int]:
+    """(segundos de CPU acumulados, bytes de RSS) del árbol de procesos"""
+    cpu_seconds, rss = 0.0, 0
+    for member in process_tree(pid):
+        try:
+            with open(f'/proc/{member}/stat') as handle:
+                fields = handle.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{member}/statm') as handle:
+                resident = int(handle.read().split()[1])
+        except OSError:
+            continue
+        # utime, stime, cutime, cstime (los hijos ya terminados cuentan en el padre)
+        ticks = sum(int(value) for value in fields[11:15])
+        cpu_seconds += ticks / CLOCK_TICKS
+        rss += resident * PAGE_SIZE
+    return cpu_seconds, rss
+
+
+def directory_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def post_json(url: str, body: dict, timeout: float) -> tuple[int, int]:
+    """Hace la petición y lee la respuesta entera; devuelve (estado, bytes)"""
+    request = urllib.request.Request(
+        url, data=json.dumps(body).encode(), headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            received = 0
+            while chunk := response.read(256 * 1024):
+                received += len(chunk)
+            return response.status, received
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code, 0
+
+
+class Sampler(threading.Thread):
+    """Muestrea /health, CPU, memoria y disco mientras dura un escalón"""
+
+    def __init__(self, target: str, pid: int | None, temp_dir: Path | None):
+        super().__init__(daemon=True)
+        self.target = target
+        self.pid = pid
+        self.temp_dir = temp_dir
+        self.running = True
+        self.health_latencies = []
+        self.cpu_percent = []
+        self.rss = []
+        self.temp_bytes = []
+        self.disk_free = []
+
+    def run(self):
+        previous = read_usage(self.pid) if self.pid else None
+        previous_time = time.monotonic()
+        while self.running:
+            started = time.monotonic()
+            try:
+                with urllib.request.urlopen(f'{self.target}/health', timeout=30) as response:
+                    response.read()
+                self.health_latencies.append(time.monotonic() - started)
+            except OSError:
+                self.health_latencies.append(30.0)
+
+            if self.pid:
+                now = time.monotonic()
+                usage = read_usage(self.pid)
+                # Un hijo reaped entre muestras puede hacer retroceder la suma: se descarta
+                self.cpu_percent.append(max(0.0, (usage[0] - previous[0]) / (now - previous_time) * 100))
+                self.rss.append(usage[1])
+                previous, previous_time = usage, now
+            if self.temp_dir:
+                self.temp_bytes.append(directory_size(self.temp_dir))
+                self.disk_free.append(shutil.disk_usage(self.temp_dir).free)
+
+            time.sleep(max(0.0, SAMPLE_INTERVAL - (time.monotonic() - started)))
+
+    def stop(self):
+        self.running = False
+        self.join()
+
+
+def run_step(args, endpoint: str, concurrency: int, step_index: int, temp_dir: Path | None) -> dict:
+    results = []
+    results_lock = threading.Lock()
+    deadline = time.monotonic() + args.step_seconds
+    counter = iter(range(10 ** 9))
+
+    def worker():
+        while time.monotonic() < deadline:
+            number = next(counter)
+            # Con --videos N las peticiones se reparten entre N videos (aciertos en la caché
+            # de metadatos); cada escalón de cada endpoint usa ids distintos para empezar en
+            # frío: /download no hereda los metadatos que dejó el barrido de /inspect
+            video_id = f"{endpoint[0]}{step_index:02d}{number % args.videos:08d}"
+            body = {'url': f"https://www.youtube.com/watch?v={video_id}"}
+            if endpoint == 'download':
+                body.update(format=args.format, quality=args.quality)
+
+            started = time.monotonic()
+            try:
+                status, received = post_json(f'{args.target}/{endpoint}', body, args.timeout)
+            except OSError:
+                status, received = 0, 0
+            with results_lock:
+                results.append((time.monotonic() - started, status, received))
+
+    sampler = Sampler(args.target, args.pid, temp_dir)
+    sampler.start()
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    sampler.stop()
+
+    latencies = [latency for latency, status, _ in results if status == 200]
+    errors = sum(1 for _, status, _ in results if status != 200)
+    return {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': len(results),
+        'errors': errors,
+        'error_rate': errors / len(results) if results else 1.0,
+        'rps': len(results) / elapsed,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'mb_per_second': sum(received for _, _, received in results) / elapsed / (1024 * 1024),
+        'loop_lag_p95': percentile(sampler.health_latencies, 0.95),
+        'cpu_avg': statistics.mean(sampler.cpu_percent) if sampler.cpu_percent else None,
+        'cpu_max': max(sampler.cpu_percent) if sampler.cpu_percent else None,
+        'rss_max_mb': max(sampler.rss) / (1024 * 1024) if sampler.rss else None,
+        'temp_max_mb': max(sampler.temp_bytes) / (1024 * 1024) if sampler.temp_bytes else None,
+        'disk_free_min_mb': min(sampler.disk_free) / (1024 * 1024) if sampler.disk_free else None,
+    }
+
+
+def saturation_reasons(args, step: dict, best_rps: float) -> list:
+    reasons = []
+    if step['error_rate'] > args.max_error_rate:
+        reasons.append(f"errores {step['error_rate']:.1%}")
+    if step['loop_lag_p95'] is not None and step['loop_lag_p95'] > args.max_loop_lag:
+        reasons.append(f"lag del event loop {step['loop_lag_p95'] * 1000:.0f} ms")
+    if step['cpu_avg'] is not None and step['cpu_avg'] > args.max_cpu * (os.cpu_count() or 1):
+        reasons.append(f"CPU {step['cpu_avg']:.0f}%")
+    if args.max_rss_mb and step['rss_max_mb'] and step['rss_max_mb'] > args.max_rss_mb:
+        reasons.append(f"memoria {step['rss_max_mb']:.0f} MB")
+    if step['disk_free_min_mb'] is not None and step['disk_free_min_mb'] < args.min_disk_free_mb:
+        reasons.append(f"disco libre {step['disk_free_min_mb']:.0f} MB")
+    if best_rps and step['rps'] < best_rps * 1.1:
+        reasons.append("el rendimiento ya no crece")
+    return reasons
+
+
+def print_step(step: dict):
+    def fmt(value, pattern, scale=1):
+        return pattern.format(value * scale) if value is not None else '-'
+
+    print(
+        f"  {step['concurrency']:>4} | {step['requests']:>6} | {step['rps']:>7.2f} | "
+        f"{fmt(step['p50'], '{:>7.0f}', 1000)} | {fmt(step['p95'], '{:>7.0f}', 1000)} | "
+        f"{step['error_rate']:>6.1%} | {fmt(step['loop_lag_p95'], '{:>7.0f}', 1000)} | "
+        f"{fmt(step['cpu_avg'], '{:>5.0f}')} | {fmt(step['rss_max_mb'], '{:>6.0f}')} | "
+        f"{fmt(step['temp_max_mb'], '{:>7.0f}')} | {step['mb_per_second']:>6.1f}"
+        + (f"  <- {', '.join(step['saturated'])}" if step['saturated'] else '')
+    )
+
+
+def sweep(args, endpoint: str, temp_dir: Path | None) -> dict:
+    print(f"\n/{endpoint}")
+    print("  conc | peticiones | req/s | p50 ms | p95 ms | errores | lag ms | CPU% | RSS MB | temp MB | MB/s")
+    steps = []
+    best_rps = 0.0
+    healthy = None
+    for index, concurrency in enumerate(args.levels):
+        step = run_step(args, endpoint, concurrency, index, temp_dir)
+        step['saturated'] = saturation_reasons(args, step, best_rps)
+        print_step(step)
+        steps.append(step)
+        if step['saturated']:
+            break
+        healthy = concurrency
+        best_rps = max(best_rps, step['rps'])
+
+    return {'endpoint': endpoint, 'steps': steps, 'max_healthy_concurrency': healthy}
+
+
+def start_app(args, origin: str, temp_dir: Path, cache_dir: Path, log_path: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        'PYTHONPATH': os.pathsep.join([str(LOADTEST_DIR), str(ROOT), os.environ.get('PYTHONPATH', '')]),
+        'FAKE_ORIGIN_URL': origin,
+        'TEMP_DIR': str(temp_dir),
+        'CACHE_DIR': str(cache_dir),
+        'PREWARM': 'blocking',
+        # El watchdog bajaría el límite y marcaría la instancia como no lista: se mide sin él
+        'WATCHDOG': '0',
+        # Sin límite propio: se trata de encontrar dónde satura la instancia
+        'MAX_CONCURRENT_DOWNLOADS': str(max(args.levels) * 2),
+    }
+    log = open(log_path, 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'downloader.app:app', '--host', '127.0.0.1', '--port', str(args.port),
+         '--log-level', 'warning'],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"La app terminó al arrancar; revisa {log_path}")
+        try:
+            with urllib.request.urlopen(f'{args.target}/health', timeout=2):
+                return process
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"La app no respondió en 60 s; revisa {log_path}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Prueba de carga escalonada de la API")
+    parser.add_argument('--target', help="URL de una instancia ya arrancada (por defecto se arranca una)")
+    parser.add_argument('--pid', type=int, help="PID de la instancia de --target, para medir CPU y memoria")
+    parser.add_argument('--port', type=int, default=8765, help="puerto de la instancia que se arranca")
+    parser.add_argument('--endpoints', default='inspect,download')
+    parser.add_argument('--levels', default='1,2,4,8,16,32', help="concurrencias de cada escalón")
+    parser.add_argument('--step-seconds', type=float, default=20)
+    parser.add_argument('--videos', type=int, default=10 ** 6, help="videos distintos por escalón (menos = más aciertos de caché)")
+    parser.add_argument('--format', default='audio', choices=('audio', 'mp3', 'mp4'),
+                        help="formato de /download (mp3 y mp4 necesitan ffmpeg)")
+    parser.add_argument('--quality', help="calidad de /download (por defecto 720p o medium)")
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--bandwidth', type=parse_rate, default=parse_rate('4M'), help="ancho de banda del origen por conexión")
+    parser.add_argument('--latency', type=float, default=0.05, help="latencia del origen en segundos")
+    parser.add_argument('--duration', type=int, default=DEFAULT_DURATION, help="duración de los videos falsos")
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--max-loop-lag', type=float, default=0.1, help="segundos de latencia de /health tolerados (p95)")
+    parser.add_argument('--max-cpu', type=float, default=85, help="porcentaje de CPU por núcleo")
+    parser.add_argument('--max-rss-mb', type=float, default=0)
+    parser.add_argument('--min-disk-free-mb', type=float, default=1024)
+    parser.add_argument('--json', help="guarda el informe completo en este archivo")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    args.levels = sorted({int(level) for level in args.levels.split(',')})
+    args.quality = args.quality or ('720p' if args.format == 'mp4' else 'medium')
+    endpoints = [endpoint.strip() for endpoint in args.endpoints.split(',') if endpoint.strip()]
+
+    origin_server = process = None
+    work_dir = None
+    temp_dir = None
+    if args.target:
+        args.target = args.target.rstrip('/')
+    else:
+        work_dir = Path(tempfile.mkdtemp(prefix='loadtest_'))
+        temp_dir = work_dir / 'temp_downloads'
+        temp_dir.mkdir()
+        origin_server, origin, _ = start_origin(bandwidth=args.bandwidth, latency=args.latency, duration=args.duration)
+        args.target = f'http://127.0.0.1:{args.port}'
+        print(f"Origen falso en {origin}; app en {args.target} (log en {work_dir / 'app.log'})")
+        process = start_app(args, origin, temp_dir, work_dir / 'cache', work_dir / 'app.log')
+        args.pid = process.pid
+
+    try:
+        report = {'levels': args.levels, 'cpus': os.cpu_count(), 'sweeps': []}
+        for endpoint in endpoints:
+            report['sweeps'].append(sweep(args, endpoint, temp_dir))
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+        if origin_server:
+            origin_server.shutdown()
+            origin_server.store.cleanup()
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print()
+    for result in report['sweeps']:
+        healthy = result['max_healthy_concurrency']
+        if healthy is None:
+            print(f"/{result['endpoint']}: saturado ya con concurrencia {args.levels[0]}")
+        elif len(result['steps']) == len(args.levels) and not result['steps'][-1]['saturated']:
+            print(f"/{result['endpoint']}: sin saturar hasta {healthy}; prueba escalones más altos")
+        else:
+            print(f"/{result['endpoint']}: concurrencia sana máxima {healthy}")
+        if result['endpoint'] == 'download' and healthy:
+            report['recommended_max_concurrent_downloads'] = healthy
+            print(f"  -> MAX_CONCURRENT_DOWNLOADS={healthy}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
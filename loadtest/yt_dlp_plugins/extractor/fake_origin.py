@@ -0,0 +1,60 @@
+"""Extractor de yt-dlp que resuelve URLs de YouTube contra el origen falso.
+
+Solo se activa si está definida FAKE_ORIGIN_URL y `loadtest/` está en el
+PYTHONPATH (yt-dlp carga los plugins del paquete `yt_dlp_plugins`). Hace lo
+mismo que el extractor real a grandes rasgos: una petición de metadatos y otra
+del manifiesto DASH.
+"""
+
+import os
+
+from yt_dlp.extractor.common import InfoExtractor
+
+
+class FakeOriginIE(InfoExtractor):
+    IE_NAME = 'loadtest:fake_origin'
+    _VALID_URL = r'https?://(?:www\.)?youtube\.com/watch\?v=(?P<id>[0-9A-Za-z_-]{11})'
+
+    @classmethod
+    def suitable(cls, url):
+        return bool(os.environ.get('FAKE_ORIGIN_URL')) and super().suitable(url)
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        origin = os.environ['FAKE_ORIGIN_URL'].rstrip('/')
+
+        info = self._download_json(f'{origin}/info/{video_id}.json', video_id, note='Descargando metadatos falsos')
+        formats = self._extract_mpd_formats(f'{origin}/manifest/{video_id}.mpd', video_id, mpd_id='dash')
+        formats.extend(self._padding_formats(origin, video_id, info.get('padding') or {}))
+
+        return {
+            'id': video_id,
+            'title': info['title'],
+            'duration': info['duration'],
+            'uploader': info.get('uploader'),
+            'thumbnail': info.get('thumbnail'),
+            'webpage_url': url,
+            'formats': formats,
+        }
+
+    @staticmethod
+    def _padding_formats(origin, video_id, padding):
+        """Formatos DASH de relleno con URL firmada y lista de fragmentos, como los de un directo largo"""
+        for index in range(padding.get('formats', 0)):
+            base_url = f'{origin}/media/{video_id}/pad{index}/'
+            yield {
+                'format_id': f'pad{index}',
+                'ext': 'mp4',
+                'protocol': 'http_dash_segments',
+                'url': f"{base_url}?expire=1700000000&sig={'S' * 200}{index}",
+                'fragment_base_url': base_url,
+                'fragments': [
+                    {'path': f'sq/{sequence}/lmt/{1700000000000 + sequence}', 'duration': 2.0}
+                    for sequence in range(padding.get('fragments', 0))
+                ],
+                'vcodec': 'avc1.4d400c',
+                'acodec': 'none',
+                'width': 256,
+                'height': 144,
+                'tbr': 100.0,
+            }
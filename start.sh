@@ -33,7 +33,7 @@ cleanup() {
 trap cleanup SIGINT SIGTERM
 
 # Verificar que estamos en el directorio correcto
-if [ ! -f "requirements.txt" ] || [ ! -d "frontend" ] || [ ! -d "backend" ]; then
+if [ ! -f "requirements.txt" ] || [ ! -d "frontend" ] || [ ! -d "downloader" ]; then
     echo -e "${RED}❌ Error: Ejecuta este script desde el directorio raíz del proyecto${NC}"
     exit 1
 fi
@@ -77,10 +77,8 @@ echo -e "${GREEN}✅ Certificados SSL configurados${NC}"
 
 # Iniciar backend en segundo plano
 echo -e "${BLUE}🖥️  Iniciando backend en puerto 8000...${NC}"
-cd backend
-uvicorn main:app --host 0.0.0.0 --port 8000 --reload > ../backend.log 2>&1 &
+uvicorn backend.main:app --host 0.0.0.0 --port 8000 --reload --reload-dir downloader > backend.log 2>&1 &
 BACKEND_PID=$!
-cd ..
 
 # Esperar un momento para que el backend se inicie
 sleep 3
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los tests importan `downloader` desde la raíz del repositorio sin instalarlo
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,40 @@
+"""Manifiesto de la CLI por lotes ante fallos de cada trabajo"""
+
+import json
+
+import pytest
+
+from downloader import cli
+from downloader.engine import DownloadError
+
+
+def run_batch(tmp_path, monkeypatch, download):
+    monkeypatch.setattr(cli, 'download_video', download)
+    runner = cli.BatchRunner(tmp_path, 'mp3', 'high', tmp_path / 'manifest.jsonl')
+    results = runner.run(['https://youtu.be/aaaaaaaaaaa', 'https://youtu.be/bbbbbbbbbbb'], workers=2)
+    lines = [json.loads(line) for line in (tmp_path / 'manifest.jsonl').read_text().splitlines()]
+    return results, lines
+
+
+@pytest.mark.parametrize('error, error_class', [
+    (DownloadError("HTTP Error 429: Too Many Requests", 'throttled'), 'throttled'),
+    (OSError(28, "No space left on device"), 'unknown'),
+    (RuntimeError("ffmpeg terminó con código 1"), 'unknown'),
+])
+def test_failed_job_is_recorded_and_the_batch_continues(tmp_path, monkeypatch, error, error_class):
+    def download(url, format, quality, output_path, **kwargs):
+        if 'aaaaaaaaaaa' in url:
+            raise error
+        path = f"{output_path}/ok.mp3"
+        with open(path, 'wb') as handle:
+            handle.write(b'mp3')
+        return path, 'ok.mp3', {'chain': [{'format_id': '140'}], 'fallback': 'bestaudio/best'}
+
+    results, lines = run_batch(tmp_path, monkeypatch, download)
+
+    assert sorted(entry['status'] for entry in results) == ['error', 'ok']
+    failed = next(entry for entry in lines if entry['status'] == 'error')
+    assert failed['url'] == 'https://youtu.be/aaaaaaaaaaa'
+    assert failed['error_class'] == error_class
+    assert str(error) in failed['error']
+    assert (tmp_path / 'ok.mp3').read_bytes() == b'mp3'
@@ -0,0 +1,115 @@
+"""DeliveryFileResponse a través de Starlette: sobrescribe internos de FileResponse"""
+
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from downloader.delivery import DeliveryFileResponse
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch):
+    # Bloques pequeños para que el archivo de prueba ocupe varios y se note la lectura adelantada
+    monkeypatch.setattr(DeliveryFileResponse, 'chunk_size', 1000)
+    data = os.urandom(10_500)
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(data)
+
+    app = FastAPI()
+
+    @app.api_route('/file', methods=['GET', 'HEAD'])
+    def get_file():
+        return DeliveryFileResponse(str(path), media_type='video/mp4', filename='video.mp4')
+
+    @app.get('/empty')
+    def get_empty():
+        empty = tmp_path / 'vacio.mp4'
+        empty.write_bytes(b'')
+        return DeliveryFileResponse(str(empty), media_type='video/mp4')
+
+    return TestClient(app), data
+
+
+def test_full_response(served):
+    client, data = served
+    response = client.get('/file')
+    assert response.status_code == 200
+    assert response.content == data
+    assert response.headers['content-length'] == str(len(data))
+    assert response.headers['accept-ranges'] == 'bytes'
+    assert 'etag' in response.headers
+    assert 'video.mp4' in response.headers['content-disposition']
+
+
+@pytest.mark.parametrize('header, start, end', [
+    ('bytes=0-99', 0, 100),
+    ('bytes=999-2001', 999, 2002),
+    ('bytes=10000-', 10000, 10500),
+    ('bytes=-250', 10250, 10500),
+    ('bytes=5000-99999', 5000, 10500),
+])
+def test_single_range(served, header, start, end):
+    client, data = served
+    response = client.get('/file', headers={'Range': header})
+    assert response.status_code == 206
+    assert response.content == data[start:end]
+    assert response.headers['content-range'] == f"bytes {start}-{end - 1}/{len(data)}"
+    assert response.headers['content-length'] == str(end - start)
+
+
+def test_unsatisfiable_range(served):
+    client, data = served
+    response = client.get('/file', headers={'Range': f'bytes={len(data) + 10}-'})
+    assert response.status_code == 416
+
+
+def test_multiple_ranges_still_work(served):
+    # Starlette las sirve con su propio camino (multipart): no se sobrescribe
+    client, data = served
+    response = client.get('/file', headers={'Range': 'bytes=0-9,100-109'})
+    assert response.status_code == 206
+    assert data[:10] in response.content and data[100:110] in response.content
+
+
+def test_header_only(served):
+    client, data = served
+    response = client.head('/file')
+    assert response.status_code == 200
+    assert response.content == b''
+    assert response.headers['content-length'] == str(len(data))
+
+    ranged = client.head('/file', headers={'Range': 'bytes=0-99'})
+    assert ranged.status_code == 206
+    assert ranged.content == b''
+    assert ranged.headers['content-length'] == '100'
+
+
+def test_empty_file(served):
+    client, _ = served
+    response = client.get('/empty')
+    assert response.status_code == 200
+    assert response.content == b''
+
+
+
+@pytest.mark.parametrize('headers, status', [
+    ({}, 200),
+    ({'Range': 'bytes=0-99'}, 206),
+    ({'Range': 'bytes=20000-'}, 416),
+])
+def test_on_close_runs_after_every_response(tmp_path, headers, status):
+    # Suelta la entrada fijada de la caché de salida también cuando no se envía el archivo
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(os.urandom(10_500))
+    closed = []
+
+    app = FastAPI()
+
+    @app.get('/file')
+    def get_file():
+        return DeliveryFileResponse(str(path), media_type='video/mp4', on_close=lambda: closed.append(True))
+
+    assert TestClient(app).get('/file', headers=headers).status_code == status
+    assert closed == [True]
@@ -0,0 +1,87 @@
+"""download_video de punta a punta contra el origen falso de loadtest con fallos inyectados.
+
+yt-dlp resuelve las URLs de YouTube con el extractor de `loadtest/yt_dlp_plugins/`
+y descarga de verdad; el origen corta conexiones o responde 403 según `faults`.
+Las descargas son de audio nativo para no depender de ffmpeg.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('yt_dlp')
+
+LOADTEST_DIR = Path(__file__).resolve().parent.parent / 'loadtest'
+if str(LOADTEST_DIR) not in sys.path:
+    # yt-dlp busca los plugins del paquete `yt_dlp_plugins` en sys.path
+    sys.path.insert(0, str(LOADTEST_DIR))
+
+from fake_origin import SYNTHETIC_BLOCK, start_origin  # noqa: E402
+
+from downloader import engine, metadata, metrics, retry  # noqa: E402
+
+DURATION = 20
+
+
+@pytest.fixture
+def origin(monkeypatch, tmp_path):
+    """Arranca un origen con los fallos indicados y lo deja como FAKE_ORIGIN_URL"""
+    servers = []
+
+    def start(faults):
+        server, url, stats = start_origin(duration=DURATION, use_ffmpeg=False, faults=faults)
+        servers.append(server)
+        monkeypatch.setenv('FAKE_ORIGIN_URL', url)
+        return server.store, stats
+
+    monkeypatch.setattr(metadata, 'CACHE_DIR', tmp_path / 'cache')
+    monkeypatch.setattr(metadata, '_disk_index', None)
+    # Sin esperas entre intentos: el test mide qué se reintenta, no cuánto se espera
+    monkeypatch.setattr(retry, 'backoff_delay', lambda policy, attempt: 0)
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.store.cleanup()
+
+
+def expected_bytes(size: int) -> bytes:
+    return (SYNTHETIC_BLOCK * (size // len(SYNTHETIC_BLOCK) + 1))[:size]
+
+
+def download(video_id: str, tmp_path: Path) -> tuple[Path, dict]:
+    output = tmp_path / 'out'
+    output.mkdir()
+    filepath, _, selection = engine.download_video(
+        f'https://www.youtube.com/watch?v={video_id}', 'audio', 'high', str(output),
+    )
+    return Path(filepath), selection
+
+
+def test_dropped_connection_resumes_the_part_file(origin, tmp_path):
+    store, stats = origin({'drop_after': {'a128': 100_000}})
+
+    filepath, selection = download('dropconn001', tmp_path)
+
+    assert selection['chain'][0]['format_id'] == 'dash-a128'
+    assert filepath.read_bytes() == expected_bytes(store.size('a128'))
+    assert not list(filepath.parent.glob('*.part'))
+
+    requests = [(status, start) for rep_id, status, start in stats['media'] if rep_id == 'a128']
+    assert requests[0][1] == 0
+    # La segunda petición sigue donde se cortó la primera en vez de empezar de cero
+    assert requests[1] == (206, 100_000)
+
+
+def test_forbidden_format_falls_back_to_the_next_in_the_chain(origin, tmp_path):
+    store, stats = origin({'forbidden': {'a128'}})
+    fallbacks = metrics.get('download_format_fallbacks_total')
+
+    filepath, selection = download('forbidden01', tmp_path)
+
+    assert [entry['format_id'] for entry in selection['chain']] == ['dash-a64']
+    assert selection['attempts'] == 2
+    assert filepath.read_bytes() == expected_bytes(store.size('a64'))
+    assert [rep_id for rep_id, _, _ in stats['media']] == ['a128', 'a64']
+    assert metrics.get('download_format_fallbacks_total') == fallbacks + 1
@@ -0,0 +1,63 @@
+"""Validación de los parámetros de filtro y proyección de /inspect"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from downloader.app import app
+from downloader.format_index import (
+    DEFAULT_VIDEO_FIELDS,
+    VIDEO_FIELDS,
+    build_format_index,
+    parse_fields,
+    parse_text_filter,
+    query_video_formats,
+)
+
+INFO = {'formats': [
+    {'format_id': '137', 'ext': 'mp4', 'vcodec': 'avc1.640028', 'acodec': 'none', 'height': 1080, 'width': 1920},
+    {'format_id': '248', 'ext': 'webm', 'vcodec': 'vp9', 'acodec': 'none', 'height': 1080, 'width': 1920},
+    {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 129},
+]}
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, DEFAULT_VIDEO_FIELDS),
+    ('', DEFAULT_VIDEO_FIELDS),
+    ('format_id, height', ('format_id', 'height')),
+    (['format_id', 'vcodec'], ('format_id', 'vcodec')),
+])
+def test_parse_fields(value, expected):
+    assert parse_fields(value, VIDEO_FIELDS, DEFAULT_VIDEO_FIELDS) == expected
+
+
+@pytest.mark.parametrize('value', [5, ['format_id', 5], {'format_id': True}, 'format_id,nope'])
+def test_parse_fields_rejects_bad_input(value):
+    with pytest.raises(ValueError):
+        parse_fields(value, VIDEO_FIELDS, DEFAULT_VIDEO_FIELDS)
+
+
+def test_parse_text_filter():
+    assert parse_text_filter(None, 'vcodec') is None
+    assert parse_text_filter('', 'vcodec') is None
+    assert parse_text_filter('avc1', 'vcodec') == 'avc1'
+    for value in (5, ['avc1'], {'x': 1}, True):
+        with pytest.raises(ValueError, match='vcodec debe ser un texto'):
+            parse_text_filter(value, 'vcodec')
+
+
+def test_vcodec_filter_matches_by_prefix():
+    rows, total = query_video_formats(build_format_index(INFO), ('format_id',), vcodec='AVC1')
+    assert rows == [{'format_id': '137'}]
+    assert total == 1
+
+
+@pytest.mark.parametrize('body', [
+    {'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'vcodec': 5},
+    {'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'ext': ['mp4']},
+    {'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'audio_ext': 1},
+    {'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'fields': [1, 2]},
+])
+def test_inspect_rejects_non_text_filters_before_extracting(body):
+    response = TestClient(app).post('/inspect', json=body)
+    assert response.status_code == 400
+    assert response.json()['detail'].startswith('Parámetros no válidos')
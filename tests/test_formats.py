@@ -0,0 +1,93 @@
+"""Selección de formatos contra info dicts grabados (tests/fixtures/formats/)"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from downloader.formats import (
+    AUDIO_QUALITY_KBPS,
+    VIDEO_QUALITY_HEIGHTS,
+    codec_rank,
+    select_audio_format,
+    select_video_format,
+)
+
+FIXTURES = sorted((Path(__file__).parent / 'fixtures' / 'formats').glob('*.json'))
+
+
+def load(name: str) -> dict:
+    return json.loads((Path(__file__).parent / 'fixtures' / 'formats' / f'{name}.json').read_text())
+
+
+def chain_ids(selection: dict) -> list:
+    return [entry['format_id'] for entry in selection['chain']]
+
+
+@pytest.fixture(params=FIXTURES, ids=lambda path: path.stem)
+def recorded(request):
+    return json.loads(request.param.read_text())
+
+
+def test_video_chains(recorded):
+    for quality in VIDEO_QUALITY_HEIGHTS:
+        selection = select_video_format(recorded, quality)
+        assert chain_ids(selection) == recorded['expected']['mp4'][quality], quality
+        # El selector estático cierra siempre la cadena
+        assert selection['format'].endswith(selection['fallback'])
+        for entry in selection['chain']:
+            assert entry['height'] <= VIDEO_QUALITY_HEIGHTS[quality]
+
+
+def test_audio_chains(recorded):
+    for quality in AUDIO_QUALITY_KBPS:
+        assert chain_ids(select_audio_format(recorded, quality)) == recorded['expected']['mp3'][quality], quality
+        native = select_audio_format(recorded, quality, ['m4a', 'webm'])
+        assert chain_ids(native) == recorded['expected']['audio'][quality], quality
+        assert all(entry['cost'] == 'native' for entry in native['chain'])
+
+
+def test_codec_preference_override(recorded):
+    for preference, expected in recorded['expected']['mp4_codec_preference'].items():
+        selection = select_video_format(recorded, '1080p', tuple(preference.split(',')))
+        assert chain_ids(selection) == expected
+
+
+def test_avc1_beats_smaller_av1_and_vp9_by_default():
+    info = load('modern_2160p')
+    chain = select_video_format(info, '1080p')['chain']
+    assert [entry['vcodec'] for entry in chain] == ['avc1', 'vp9', 'av01']
+    # AV1 es el más ligero: sin preferencia de códec ganaría por bytes
+    assert chain[2]['filesize'] < chain[1]['filesize'] < chain[0]['filesize']
+    assert chain_ids(select_video_format(info, '1080p', ()))[0] == '399+140'
+
+
+def test_no_avc1_at_the_top_height_keeps_the_height():
+    # En 1440p y 2160p solo hay VP9 y AV1: la altura pesa más que el códec
+    info = load('modern_2160p')
+    assert select_video_format(info, '2160p')['chain'][0]['height'] == 2160
+
+
+def test_native_progressive_wins_over_remux():
+    chain = select_video_format(load('legacy_progressive'), '1080p')['chain']
+    assert chain[0]['format_id'] == '22'
+    assert chain[0]['cost'] == 'native'
+
+
+def test_opus_only_pairs_need_transcoding():
+    chain = select_video_format(load('opus_only'), '1080p')['chain']
+    assert all(entry['cost'] == 'transcode' and entry['acodec'] == 'opus' for entry in chain)
+
+
+def test_storyboards_are_never_selected(recorded):
+    selections = [select_video_format(recorded, quality) for quality in VIDEO_QUALITY_HEIGHTS]
+    selections += [select_audio_format(recorded, quality) for quality in AUDIO_QUALITY_KBPS]
+    for selection in selections:
+        assert not any(part.startswith('sb') for entry in selection['chain'] for part in entry['format_id'].split('+'))
+
+
+def test_codec_rank_puts_unlisted_codecs_last():
+    preference = ('avc1', 'vp09')
+    assert codec_rank('avc1', preference) < codec_rank('vp09', preference) < codec_rank('av01', preference)
+    assert codec_rank('av01', preference) == codec_rank('theora', preference)
+    assert codec_rank('av01', ()) == codec_rank('avc1', ())
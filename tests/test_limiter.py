@@ -0,0 +1,41 @@
+"""Cola del limitador de descargas ante esperas canceladas"""
+
+import asyncio
+
+from downloader.limiter import DownloadLimiter
+
+
+async def notified_waiter_cancelled():
+    limiter = DownloadLimiter(1)
+    await limiter.acquire()
+    first = asyncio.create_task(limiter.acquire())
+    second = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.waiting == 2
+
+    # El hueco se libera y, antes de que el primero despierte, su cliente se va
+    await limiter.release()
+    first.cancel()
+    await asyncio.wait_for(second, timeout=1)
+
+    assert first.cancelled()
+    assert limiter.active == 1
+    assert limiter.waiting == 0
+
+
+def test_cancelled_waiter_does_not_swallow_the_free_slot():
+    asyncio.run(notified_waiter_cancelled())
+
+
+async def slot_accounting():
+    limiter = DownloadLimiter(2)
+    async with limiter.slot():
+        async with limiter.slot():
+            assert limiter.free_slots() == 0
+        assert limiter.free_slots() == 1
+    assert limiter.active == 0
+    assert limiter.completed == 2
+
+
+def test_slot_releases_and_records_service_time():
+    asyncio.run(slot_accounting())
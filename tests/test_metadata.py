@@ -0,0 +1,109 @@
+"""Extracción coalescida por URL y límite de disco de los directorios de video"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pytest
+
+yt_dlp = pytest.importorskip('yt_dlp')
+
+from downloader import metadata  # noqa: E402
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metadata, 'CACHE_DIR', tmp_path / 'cache')
+    monkeypatch.setattr(metadata, '_cache', OrderedDict())
+    monkeypatch.setattr(metadata, '_disk_index', None)
+    return tmp_path / 'cache'
+
+
+class SlowYoutubeDL:
+    """Sustituto de yt_dlp.YoutubeDL que tarda en extraer y cuenta las llamadas"""
+    calls = []
+
+    def __init__(self, opts):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def extract_info(self, url, download=False):
+        self.calls.append(url)
+        time.sleep(0.2)
+        video_id = url.rsplit('=', 1)[-1]
+        return {'id': video_id, 'title': f"Video {video_id}", 'duration': 60, 'formats': []}
+
+
+def test_concurrent_cold_misses_extract_once(cache_dir, monkeypatch):
+    monkeypatch.setattr(yt_dlp, 'YoutubeDL', SlowYoutubeDL)
+    SlowYoutubeDL.calls = []
+    url = 'https://www.youtube.com/watch?v=aaaaaaaaaaa'
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(metadata.get_video_info(url))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert SlowYoutubeDL.calls == [url]
+    assert len({id(record) for record in results}) == 1
+    assert not metadata._key_locks
+
+    # Otra URL no espera a la primera
+    metadata.get_video_info('https://www.youtube.com/watch?v=bbbbbbbbbbb')
+    assert len(SlowYoutubeDL.calls) == 2
+
+
+def fill(video_id: str, size: int):
+    directory = metadata.video_dir(video_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / 'thumb_large.jpg').write_bytes(b'x' * size)
+    metadata.record_video_dir(video_id)
+
+
+def test_video_dirs_are_evicted_least_recently_used_first(cache_dir, monkeypatch):
+    monkeypatch.setattr(metadata, 'METADATA_DISK_MAX_MB', 1)
+    fill('a', MB // 3)
+    fill('b', MB // 3)
+    fill('c', MB // 4)
+    metadata.touch_video('a')
+    fill('d', MB // 3)
+
+    assert metadata.video_dir('a').exists()
+    assert not metadata.video_dir('b').exists()
+    assert metadata.video_dir('c').exists()
+    assert metadata.video_dir('d').exists()
+    assert metadata.disk_snapshot()['videos'] == 3
+
+
+def test_disk_index_is_rebuilt_from_mtimes(cache_dir, monkeypatch):
+    monkeypatch.setattr(metadata, 'METADATA_DISK_MAX_MB', 1)
+    fill('a', MB // 2)
+    fill('b', MB // 3)
+    now = time.time()
+    os.utime(metadata.video_dir('b'), (now - 60, now - 60))
+    os.utime(metadata.video_dir('a'), (now - 30, now - 30))
+
+    # Reinicio: el orden LRU sale del mtime de cada directorio
+    monkeypatch.setattr(metadata, '_disk_index', None)
+    fill('c', MB // 3)
+
+    assert metadata.video_dir('a').exists()
+    assert not metadata.video_dir('b').exists()
+    assert metadata.video_dir('c').exists()
+
+
+def test_sidecar_write_is_counted(cache_dir):
+    metadata.write_sidecar({'id': 'abc', 'title': "Título", 'thumbnails': [{'url': 'https://i.ytimg.com/x.jpg'}]})
+
+    assert metadata.read_sidecar('abc')['title'] == "Título"
+    assert metadata.disk_snapshot()['videos'] == 1
@@ -0,0 +1,86 @@
+"""Entradas por (video, clase de error) de la caché negativa"""
+
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+
+from downloader import negcache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(negcache, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(negcache, '_entries', OrderedDict())
+    monkeypatch.setattr(negcache, 'NEGATIVE_CACHE_ENABLED', True)
+    monkeypatch.setattr(negcache, 'NEGATIVE_TTLS', {'unavailable': 900, 'throttled': 60, 'forbidden': 60, 'network': 15})
+    return now
+
+
+def test_short_lived_error_does_not_shorten_a_longer_one(clock):
+    negcache.remember('abc', 'unavailable', 404, "Video unavailable")
+    negcache.remember('abc', 'network', 503, "Read timed out")
+
+    hit = negcache.lookup('abc')
+    assert hit['error_class'] == 'unavailable'
+    assert hit['retry_after'] == 900
+
+    clock[0] += 30
+    hit = negcache.lookup('abc')
+    assert hit['error_class'] == 'unavailable'
+    assert hit['retry_after'] == 870
+
+
+def test_lookup_returns_the_most_severe_live_entry(clock):
+    negcache.remember('abc', 'network', 503, "Read timed out")
+    negcache.remember('abc', 'throttled', 429, "Too Many Requests")
+    assert negcache.lookup('abc')['error_class'] == 'throttled'
+
+    clock[0] += 61
+    # 'throttled' y 'network' ya caducaron
+    assert negcache.lookup('abc') is None
+    assert not negcache._entries
+
+
+def test_expired_severe_entry_falls_through_to_a_live_one(clock):
+    negcache.remember('abc', 'forbidden', 403, "Forbidden")
+    clock[0] += 50
+    negcache.remember('abc', 'network', 503, "Read timed out")
+    clock[0] += 12
+
+    hit = negcache.lookup('abc')
+    assert hit['error_class'] == 'network'
+    assert hit['status_code'] == 503
+    assert hit['retry_after'] == 3
+    assert list(negcache._entries) == [('abc', 'network')]
+
+
+def test_same_class_is_refreshed(clock):
+    negcache.remember('abc', 'network', 503, "primero")
+    clock[0] += 10
+    negcache.remember('abc', 'network', 502, "segundo")
+
+    hit = negcache.lookup('abc')
+    assert (hit['status_code'], hit['detail'], hit['retry_after']) == (502, "segundo", 15)
+
+
+def test_unstored_classes_and_other_videos(clock):
+    negcache.remember('abc', 'format', 400, "Requested format is not available")
+    negcache.remember('abc', 'unknown', 500, "algo raro")
+    assert negcache.lookup('abc') is None
+
+    negcache.remember('abc', 'unavailable', 404, "Private video")
+    assert negcache.lookup('xyz') is None
+
+
+def test_size_bound_evicts_least_recent_entries(clock, monkeypatch):
+    monkeypatch.setattr(negcache, 'NEGATIVE_CACHE_SIZE', 2)
+    negcache.remember('a', 'network', 503, "a")
+    negcache.remember('b', 'network', 503, "b")
+    negcache.lookup('a')
+    negcache.remember('c', 'network', 503, "c")
+
+    assert negcache.lookup('b') is None
+    assert negcache.lookup('a') is not None
+    assert negcache.lookup('c') is not None
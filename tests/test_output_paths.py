@@ -0,0 +1,71 @@
+"""Nombres de archivo: limpieza del título, plantilla de yt-dlp y ruta final"""
+
+import os
+
+import pytest
+
+from downloader.cli import unique_destination
+from downloader.engine import clean_filename, output_template, resolve_output_path
+
+
+@pytest.mark.parametrize('title, expected', [
+    ("100% real", "100%_real"),
+    ("Canción de cuna: versión 2", "Cancion_de_cuna_version_2"),
+    ("日本語のタイトル", "video"),
+    ("Ünïcödé 🎵 mix", "Unicode_mix"),
+    ('a/b\\c:d*e?f"g<h>i|j', "abcdefghij"),
+    ("...", "video"),
+])
+def test_clean_filename(title, expected):
+    assert clean_filename(title) == expected
+
+
+def test_clean_filename_is_bounded():
+    assert len(clean_filename("x" * 500)) == 100
+
+
+@pytest.mark.parametrize('title', [
+    "100% real",
+    "50%(id)s trick",
+    "%(title)s",
+    "%%d y %s",
+    "Canción 100%",
+])
+def test_output_template_keeps_percent_literal(tmp_path, title):
+    yt_dlp = pytest.importorskip('yt_dlp')
+    clean_title = clean_filename(title)
+    with yt_dlp.YoutubeDL({'outtmpl': output_template(str(tmp_path), clean_title), 'quiet': True}) as ydl:
+        filename = ydl.prepare_filename({'id': 'abcdefghijk', 'title': 'otro', 'ext': 'mp4'})
+    assert filename == os.path.join(str(tmp_path), f"{clean_title}.mp4")
+
+
+def test_resolve_output_path_prefers_last_requested_download(tmp_path):
+    video = tmp_path / "video.f137.mp4"
+    merged = tmp_path / "video.mp4"
+    video.write_bytes(b"v")
+    merged.write_bytes(b"m")
+    result = {'requested_downloads': [{'filepath': str(video)}, {'filepath': str(merged)}]}
+    assert resolve_output_path(result, []) == str(merged)
+
+
+def test_resolve_output_path_skips_missing_files(tmp_path):
+    # Tras la conversión el archivo intermedio ya no existe: manda el hook de postprocesado
+    converted = tmp_path / "100%_real.mp3"
+    converted.write_bytes(b"a")
+    result = {'requested_downloads': [{'filepath': str(tmp_path / "100%_real.webm")}]}
+    assert resolve_output_path(result, [str(tmp_path / "borrado.m4a"), str(converted)]) == str(converted)
+
+
+def test_resolve_output_path_without_result(tmp_path):
+    assert resolve_output_path(None, []) is None
+    assert resolve_output_path({'requested_downloads': None}, [str(tmp_path / "no_existe.mp4")]) is None
+
+
+def test_identical_titles_do_not_overwrite(tmp_path):
+    # Dos videos distintos con el mismo título limpio: el segundo lleva parte de su clave
+    first = unique_destination(tmp_path, "Mismo_titulo.mp4", "aaaaaaaa11111111")
+    first.write_bytes(b"1")
+    second = unique_destination(tmp_path, "Mismo_titulo.mp4", "bbbbbbbb22222222")
+    assert first.name == "Mismo_titulo.mp4"
+    assert second.name == "Mismo_titulo-bbbbbbbb.mp4"
+    assert clean_filename("Mismo título") == clean_filename("Mismo titulo")
@@ -0,0 +1,65 @@
+"""Entradas fijadas de la caché de salida: no se expulsan mientras se envían"""
+
+import pytest
+
+from downloader import outputs, sources
+
+SELECTION = {'chain': [{'format_id': '140'}], 'fallback': 'bestaudio'}
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(outputs, 'OUTPUT_CACHE_DIR', tmp_path / 'outputs')
+    monkeypatch.setattr(outputs, 'OUTPUT_CACHE_MAX_MB', 2)
+    monkeypatch.setattr(outputs, '_index', None)
+    monkeypatch.setattr(outputs, '_pins', {})
+    monkeypatch.setattr(sources, 'touch', lambda video_id: None)
+    monkeypatch.setattr(sources, 'drop_video', lambda video_id: None)
+
+    def add(key, pin=False):
+        source = tmp_path / f'{key}.m4a'
+        source.write_bytes(b'x' * MB)
+        return outputs.store(key, str(source), f'{key}.m4a', SELECTION, video_id=key, pin=pin)
+
+    return add
+
+
+def test_pinned_hit_survives_eviction(cache):
+    cache('a')
+    cache('b')
+    hit = outputs.lookup('a')
+
+    # 'a' es la menos usada tras el acierto de 'b'... salvo que está fijada
+    outputs.lookup('b')
+    outputs.release('b')
+    cache('c')
+
+    assert open(hit['path'], 'rb').read() == b'x' * MB
+    assert outputs.contains('a')
+    assert not outputs.contains('b')
+
+    outputs.release('a')
+    assert outputs.snapshot()['in_use'] == 0
+    cache('d')
+    assert not outputs.contains('a')
+
+
+def test_store_with_pin_protects_the_new_entry(cache):
+    path = cache('a', pin=True)
+    cache('b')
+    cache('c')
+
+    assert outputs.contains('a')
+    assert open(path, 'rb').read() == b'x' * MB
+    outputs.release('a')
+    assert outputs.snapshot()['in_use'] == 0
+
+
+def test_broken_entry_releases_its_pin(cache):
+    cache('a')
+    outputs.OUTPUT_CACHE_DIR.joinpath('a', 'a.m4a').unlink()
+
+    assert outputs.lookup('a') is None
+    assert not outputs.contains('a')
+    assert outputs.snapshot()['in_use'] == 0
@@ -0,0 +1,232 @@
+"""Clasificación de errores, backoff y presupuesto de intentos de retry.py"""
+
+import random
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from downloader.cancel import CancelToken
+from downloader.retry import (
+    RETRY_POLICIES,
+    SOURCE_RETRY_POLICIES,
+    RetryError,
+    RetryPolicy,
+    backoff_delay,
+    classify_error,
+    run_with_retry,
+)
+
+
+class FakeYtDlpError(Exception):
+    """Como yt_dlp.utils.DownloadError: el error original va en exc_info"""
+
+    def __init__(self, message, cause=None):
+        super().__init__(message)
+        self.exc_info = (type(cause), cause, None) if cause is not None else None
+
+
+@pytest.mark.parametrize('message, expected', [
+    ("ERROR: [youtube] abc: Private video. Sign in if you've been granted access", 'unavailable'),
+    ("ERROR: [youtube] abc: Video unavailable. This video has been removed by the uploader", 'unavailable'),
+    ("ERROR: [youtube] abc: The uploader has not made this video available in your country", 'unavailable'),
+    ("ERROR: unable to download video data: HTTP Error 404: Not Found", 'unavailable'),
+    ("ERROR: unable to download video data: HTTP Error 429: Too Many Requests", 'throttled'),
+    ("ERROR: unable to download video data: HTTP Error 403: Forbidden", 'forbidden'),
+    ("ERROR: [youtube] abc: Requested format is not available", 'format'),
+    ("ERROR: fragment 12 not found, unable to continue", 'network'),
+    ("ERROR: Read timed out.", 'network'),
+    ("ERROR: HTTP Error 503: Service Unavailable", 'network'),
+    ("ERROR: Postprocessing: Conversion failed!", 'unknown'),
+])
+def test_classify_error_by_message(message, expected):
+    assert classify_error(Exception(message)) == expected
+
+
+def test_classify_error_looks_at_the_cause():
+    wrapped = FakeYtDlpError("ERROR: unable to download", ConnectionResetError("Connection reset by peer"))
+    assert classify_error(wrapped) == 'network'
+
+    try:
+        try:
+            raise TimeoutError("timed out")
+        except TimeoutError as e:
+            raise RuntimeError("descarga fallida") from e
+    except RuntimeError as e:
+        assert classify_error(e) == 'network'
+
+
+def test_unavailable_wins_over_later_classes():
+    # "Video unavailable" con un 403 en el mismo mensaje es permanente
+    assert classify_error(Exception("HTTP Error 403: Forbidden | Video unavailable")) == 'unavailable'
+
+
+@pytest.mark.parametrize('error_class', sorted(RETRY_POLICIES))
+def test_backoff_delay_stays_within_bounds(error_class):
+    policy = RETRY_POLICIES[error_class]
+    rng = random.Random(1234)
+    for attempt in range(1, 12):
+        ceiling = min(policy.max_delay, policy.base_delay * 2 ** (attempt - 1))
+        for _ in range(50):
+            delay = backoff_delay(policy, attempt, rng)
+            assert ceiling / 2 <= delay <= ceiling
+            assert delay <= policy.max_delay
+
+
+def test_backoff_delay_grows_until_max_delay():
+    policy = RetryPolicy(attempts=10, base_delay=1, max_delay=8)
+
+    class Top:
+        @staticmethod
+        def uniform(low, high):
+            return high
+
+    assert [backoff_delay(policy, attempt, Top) for attempt in range(1, 7)] == [1, 2, 4, 8, 8, 8]
+
+
+def failing(errors):
+    """Operación que lanza los errores en orden y después devuelve el número de intento"""
+    calls = []
+
+    def operation(attempt):
+        calls.append(attempt)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return attempt
+
+    return operation, calls
+
+
+@pytest.mark.parametrize('error_class, message', [
+    ('unavailable', "Private video"),
+    ('throttled', "HTTP Error 429: Too Many Requests"),
+    ('forbidden', "HTTP Error 403: Forbidden"),
+    ('format', "Requested format is not available"),
+    ('network', "Read timed out"),
+    ('unknown', "algo raro"),
+])
+def test_run_with_retry_spends_the_attempt_budget(error_class, message):
+    budget = RETRY_POLICIES[error_class].attempts
+    operation, calls = failing([Exception(message)] * 20)
+    delays = []
+
+    with pytest.raises(RetryError) as raised:
+        run_with_retry(operation, sleep=delays.append)
+
+    assert raised.value.error_class == error_class
+    assert raised.value.attempts == budget
+    assert calls == list(range(1, budget + 1))
+    assert len(delays) == budget - 1
+
+
+def test_run_with_retry_recovers_from_transient_errors():
+    operation, calls = failing([Exception("Read timed out"), Exception("HTTP Error 429: Too Many Requests")])
+    assert run_with_retry(operation, sleep=lambda delay: None) == 3
+    assert calls == [1, 2, 3]
+
+
+def test_format_errors_are_not_retried_by_the_selector_path():
+    # El selector de yt-dlp ya recorrió la cadena entera: un reintento repetiría lo mismo
+    operation, calls = failing([Exception("Requested format is not available")] * 3)
+    retried = []
+    with pytest.raises(RetryError):
+        run_with_retry(operation, on_retry=lambda *args: retried.append(args), sleep=lambda delay: None)
+    assert calls == [1]
+    assert retried == []
+
+
+def test_source_path_falls_back_to_the_next_format():
+    chain = ['137', '136', '135']
+
+    def operation(attempt):
+        if chain[0] != '135':
+            raise Exception(f"Requested format is not available ({chain[0]})")
+        return chain[0]
+
+    def next_format(error_class, policy):
+        assert policy.next_format
+        chain.pop(0)
+
+    result = run_with_retry(operation, on_retry=next_format, sleep=lambda delay: None, policies=SOURCE_RETRY_POLICIES)
+    assert result == '135'
+
+
+def test_cancel_during_backoff_stops_retrying():
+    cancel = CancelToken()
+    operation, calls = failing([Exception("HTTP Error 429: Too Many Requests")] * 5)
+    timer = threading.Timer(0.05, cancel.cancel, args=("cliente desconectado",))
+    timer.start()
+    try:
+        with pytest.raises(RetryError) as raised:
+            # El primer backoff de 'throttled' son varios segundos: la cancelación lo corta
+            run_with_retry(operation, cancel=cancel)
+    finally:
+        timer.cancel()
+
+    assert raised.value.error_class == 'cancelled'
+    assert calls == [1]
+
+
+def test_error_after_cancel_is_reported_as_cancelled():
+    cancel = CancelToken()
+
+    def operation(attempt):
+        cancel.cancel("apagando")
+        raise Exception("Conversion failed! (ffmpeg muerto)")
+
+    with pytest.raises(RetryError) as raised:
+        run_with_retry(operation, cancel=cancel)
+    assert raised.value.error_class == 'cancelled'
+
+
+@pytest.fixture
+def flaky_server():
+    """Servidor HTTP local que responde 503 a las primeras peticiones y luego 200"""
+    state = {'failures': 0, 'requests': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state['requests'] += 1
+            status = 503 if state['requests'] <= state['failures'] else 200
+            body = b'ok' if status == 200 else b'no disponible'
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/video", state
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(url):
+    def operation(attempt):
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.read()
+    return operation
+
+
+def test_flaky_server_succeeds_within_the_network_budget(flaky_server):
+    url, state = flaky_server
+    state['failures'] = RETRY_POLICIES['network'].attempts - 1
+    delays = []
+
+    assert run_with_retry(fetch(url), sleep=delays.append) == b'ok'
+    assert state['requests'] == RETRY_POLICIES['network'].attempts
+    assert len(delays) == state['failures']
+
+
+def test_flaky_server_exhausts_the_network_budget(flaky_server):
+    url, state = flaky_server
+    state['failures'] = 100
+
+    with pytest.raises(RetryError) as raised:
+        run_with_retry(fetch(url), sleep=lambda delay: None)
+    assert raised.value.error_class == 'network'
+    assert state['requests'] == RETRY_POLICIES['network'].attempts
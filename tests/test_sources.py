@@ -0,0 +1,61 @@
+"""Comandos de ffmpeg para generar variantes desde la caché de streams (sources.py)"""
+
+import json
+from pathlib import Path
+
+from downloader.formats import select_audio_format, select_video_format
+from downloader.sources import derive_command
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'formats'
+
+
+def load(name: str) -> dict:
+    return json.loads((FIXTURES / f'{name}.json').read_text())
+
+
+def stream_paths(entry: dict, exts: dict) -> list:
+    return [f"/cache/sources/vid/{stream_id}.{exts[stream_id]}" for stream_id in entry['format_id'].split('+')]
+
+
+def test_opus_merge_copies_streams_like_yt_dlp():
+    info = load('opus_only')
+    entry = select_video_format(info, '1080p')['chain'][0]
+    assert entry['format_id'] == '248+251' and entry['cost'] == 'transcode'
+
+    command, output = derive_command('mp4', '1080p', entry, stream_paths(entry, {'248': 'webm', '251': 'webm'}), '/tmp/out')
+
+    assert output == '/tmp/out.mp4'
+    assert command[-1] == output
+    assert command[command.index('-c') + 1] == 'copy'
+    assert ['-map', '0:v:0', '-map', '1:a:0'] == command[command.index('-map'):command.index('-map') + 4]
+    assert not any(codec in command for codec in ('libx264', 'aac', '-c:v', '-c:a'))
+
+
+def test_remux_merge_copies_streams():
+    entry = select_video_format(load('modern_2160p'), '1080p')['chain'][0]
+    command, _ = derive_command('mp4', '1080p', entry, stream_paths(entry, {'137': 'mp4', '140': 'm4a'}), '/tmp/out')
+    assert command[command.index('-c') + 1] == 'copy'
+
+
+def test_progressive_mp4_is_linked():
+    entry = select_video_format(load('legacy_progressive'), '720p')['chain'][0]
+    assert entry['format_id'] == '22'
+    assert derive_command('mp4', '720p', entry, ['/cache/sources/vid/22.mp4'], '/tmp/out') == (None, '/tmp/out.mp4')
+
+
+def test_progressive_webm_is_reencoded():
+    entry = {'format_id': '43', 'cost': 'transcode'}
+    command, output = derive_command('mp4', '720p', entry, ['/cache/sources/vid/43.webm'], '/tmp/out')
+    assert output == '/tmp/out.mp4'
+    assert '-c' not in command
+
+
+def test_audio_variants():
+    info = load('modern_2160p')
+    entry = select_audio_format(info, 'highest')['chain'][0]
+    command, output = derive_command('mp3', 'highest', entry, ['/cache/sources/vid/251.webm'], '/tmp/out')
+    assert output == '/tmp/out.mp3'
+    assert command[command.index('-b:a') + 1] == '320k'
+
+    native = select_audio_format(info, 'medium', ['m4a'])['chain'][0]
+    assert derive_command('audio', 'medium', native, ['/cache/sources/vid/140.m4a'], '/tmp/out') == (None, '/tmp/out.m4a')
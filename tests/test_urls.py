@@ -0,0 +1,94 @@
+"""Propiedades del canonicalizador de URLs (urls.py) con hypothesis"""
+
+import string
+
+from hypothesis import given, strategies as st
+
+from downloader.engine import clean_youtube_url
+from downloader.urls import canonical_url, canonical_video_id, is_video_id
+
+ID_ALPHABET = string.ascii_letters + string.digits + '-_'
+
+video_ids = st.text(ID_ALPHABET, min_size=11, max_size=11)
+# Parámetros sin separadores de query ni fragmento
+junk = st.text(string.ascii_letters + string.digits + '-_.~%', min_size=1, max_size=30)
+hosts = st.sampled_from(['youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com'])
+schemes = st.sampled_from(['https://', 'http://', '//', ''])
+path_kinds = st.sampled_from(['shorts', 'embed', 'live', 'v', 'e'])
+extra_params = st.lists(st.tuples(st.sampled_from(['list', 'index', 'si', 't', 'feature', 'pp', 'xv']), junk), max_size=4)
+
+
+def upper_or_lower(value: str, upper: bool) -> str:
+    return value.upper() if upper else value
+
+
+@given(video_ids, schemes, hosts, extra_params, st.integers(min_value=0, max_value=4), st.booleans(), st.booleans())
+def test_watch_urls_with_any_query(video_id, scheme, host, params, position, trailing_slash, upper_host):
+    params = list(params)
+    params.insert(min(position, len(params)), ('v', video_id))
+    query = '&'.join(f"{key}={value}" for key, value in params)
+    path = 'watch/' if trailing_slash else 'watch'
+    url = f"{scheme}{upper_or_lower(host, upper_host)}/{path}?{query}"
+    assert canonical_video_id(url) == video_id
+
+
+@given(video_ids, schemes, hosts, path_kinds, st.sampled_from(['', '/', '?si=x', '?feature=share&t=10', '#t=5', '&x=1']))
+def test_path_forms(video_id, scheme, host, kind, suffix):
+    assert canonical_video_id(f"{scheme}{host}/{kind}/{video_id}{suffix}") == video_id
+
+
+@given(video_ids, schemes, st.sampled_from(['', '?si=abc', '?si=abc&t=30', '#t=1m']), st.sampled_from(['', ' ', '\n']))
+def test_short_and_nocookie_forms(video_id, scheme, suffix, padding):
+    assert canonical_video_id(f"{padding}{scheme}youtu.be/{video_id}{suffix}{padding}") == video_id
+    assert canonical_video_id(f"{scheme}www.youtube-nocookie.com/embed/{video_id}{suffix}") == video_id
+
+
+@given(video_ids, st.sampled_from(['#t=42', '#v=otra', '&v=duplicado']))
+def test_first_v_param_in_query_wins(video_id, suffix):
+    assert canonical_video_id(f"https://www.youtube.com/watch?v={video_id}{suffix}") == video_id
+
+
+@given(video_ids)
+def test_canonical_url_round_trip(video_id):
+    url = canonical_url(video_id)
+    assert canonical_video_id(url) == video_id
+    assert clean_youtube_url(url) == url
+    assert is_video_id(video_id)
+
+
+@given(video_ids, st.text(ID_ALPHABET, min_size=1, max_size=3))
+def test_ids_of_the_wrong_length_are_rejected(video_id, extra):
+    assert canonical_video_id(f"https://www.youtube.com/watch?v={video_id[:10]}") is None
+    assert canonical_video_id(f"https://www.youtube.com/shorts/{video_id}{extra}") is None
+    assert canonical_video_id(f"https://youtu.be/{video_id}{extra}") is None
+    assert not is_video_id(video_id[:10])
+    assert not is_video_id(video_id + extra)
+
+
+@given(video_ids, junk)
+def test_non_video_urls(video_id, noise):
+    for url in (
+        f"https://www.youtube.com/playlist?list=PL{noise}",
+        f"https://www.youtube.com/watch?xv={video_id}",
+        f"https://www.youtube.com/watch?{noise}={video_id}" if noise != 'v' else "https://www.youtube.com/watch",
+        "https://youtu.be/",
+        f"https://notyoutube.com/watch?v={video_id}",
+        f"https://www.youtube.com.evil.example/watch?v={video_id}",
+        f"https://vimeo.com/{video_id}",
+        f"https://www.youtube.com/channel/{video_id}",
+    ):
+        assert canonical_video_id(url) is None, url
+
+
+@given(st.text(max_size=40))
+def test_arbitrary_text_never_raises(text):
+    video_id = canonical_video_id(text)
+    assert video_id is None or is_video_id(video_id)
+    assert not is_video_id(text) or len(text) == 11
+
+
+def test_empty_values():
+    assert canonical_video_id('') is None
+    assert canonical_video_id(None) is None
+    assert not is_video_id('')
+    assert not is_video_id(None)